@@ -32,3 +32,7 @@ specialites = {
     "Gériatre",
     "Médecin rééducateur"
 }
+
+# Horaires de consultation (heure d'ouverture, heure de fermeture) et jours ouvrés (0 = lundi)
+horaires_consultation = (8, 18)
+jours_ouvres = {0, 1, 2, 3, 4}
@@ -1,53 +1,105 @@
 from bson import ObjectId
-from flask import Blueprint, jsonify, request
-from werkzeug.security import generate_password_hash
+from flask import Blueprint, Response, g, jsonify, request, current_app, stream_with_context
 
 from BackEnd.Services.AdminService import create_admin
+from BackEnd.Services.AuthService import PasswordHashTimeout
 from BackEnd.Services import db as db_services
 from BackEnd.Services.DocteurService import create_doctor, create_doctor_nohash
+from BackEnd.Services.pagination import parse_page_args, find_page, iter_documents
+from BackEnd.Services.streaming import wants_ndjson, ndjson_response
+from BackEnd.Services.IdentityService import unregister_identity
+from BackEnd.Services.OutboxService import insert_entity, outbox_event
+from BackEnd.Services.ExportService import export_stream, EXPORT_FORMATS
+from BackEnd.Services.DocteurService import parse_date_range
+from BackEnd.Services.slow_queries import top_slow_queries, slow_query_log
+from BackEnd.Services.versions import conditional_get, collection_scope
+from BackEnd.Services.projection import parse_fields, mongo_projection
+from BackEnd.Services.TokenService import check_access
 from datetime import datetime
 
 admin_bp = Blueprint('admin', __name__, url_prefix='/admin')
 
 
+@admin_bp.before_request
+def require_admin():
+    # Rôle lu dans le jeton vérifié par l'app : aucune lecture de la collection admins
+    if request.method == "OPTIONS":
+        return None
+    denied = check_access(g.get("principal"))
+    if denied:
+        return jsonify({'error': denied[0]}), denied[1]
+
+
+def page_response(items, next_cursor):
+    # Listings stay plain arrays; the next page cursor travels in a header
+    response = jsonify(items)
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return response
+
+
+def format_patient(patient):
+    patient['_id'] = str(patient['_id'])
+    if 'doctor_id' in patient:
+        patient['doctor_id'] = str(patient['doctor_id'])
+    return patient
+
+
+def format_doctor(doctor):
+    doctor['_id'] = str(doctor['_id'])
+    if 'patient_ids' in doctor:
+        doctor['patient_ids'] = [str(pid) for pid in doctor['patient_ids']]
+    return doctor
+
+
+def format_pending_doctor(doc):
+    doc['_id'] = str(doc['_id'])
+    return doc
+
+
+def stream_collection(collection, formatter, after, projection):
+    # NDJSON mode: read the Mongo cursor lazily, one line per document
+    return ndjson_response(formatter(doc) for doc in iter_documents(collection, after=after, projection=projection))
+
+
 @admin_bp.route('/patients', methods=['GET'])
+@conditional_get(collection_scope("patients"))
 def get_all_patients():
 
     try:
-        # In a real implementation, you would check admin privileges here
-        # For example: if not current_user.is_admin: return forbidden()
+        limit, after = parse_page_args(request.args, current_app.config)
+        projection = mongo_projection("patient", parse_fields(request.args, "patient"))
+        if wants_ndjson(request):
+            return stream_collection(db_services.mongo.db.patients, format_patient, after, projection)
 
-        patients = list(db_services.mongo.db.patients.find({}))
+        patients, next_cursor = find_page(db_services.mongo.db.patients, limit=limit, after=after, projection=projection)
 
         # Convert ObjectId to string and format the response
-        formatted_patients = []
-        for patient in patients:
-            patient['_id'] = str(patient['_id'])
-            if 'doctor_id' in patient:
-                patient['doctor_id'] = str(patient['doctor_id'])
-            formatted_patients.append(patient)
-
-        return jsonify(formatted_patients), 200
+        formatted_patients = [format_patient(patient) for patient in patients]
+
+        return page_response(formatted_patients, next_cursor), 200
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 
 @admin_bp.route('/doctors', methods=['GET'])
+@conditional_get(collection_scope("doctors"))
 def get_all_doctors():
 
     try:
-        # Check admin privileges here
-
-        doctors = list(db_services.mongo.db.doctors.find({}))
+        limit, after = parse_page_args(request.args, current_app.config)
+        projection = mongo_projection("doctor", parse_fields(request.args, "doctor"))
+        if wants_ndjson(request):
+            return stream_collection(db_services.mongo.db.doctors, format_doctor, after, projection)
 
-        formatted_doctors = []
-        for doctor in doctors:
-            doctor['_id'] = str(doctor['_id'])
-            if 'patient_ids' in doctor:
-                doctor['patient_ids'] = [str(pid) for pid in doctor['patient_ids']]
-            formatted_doctors.append(doctor)
+        doctors, next_cursor = find_page(db_services.mongo.db.doctors, limit=limit, after=after, projection=projection)
+        formatted_doctors = [format_doctor(doctor) for doctor in doctors]
 
-        return jsonify(formatted_doctors), 200
+        return page_response(formatted_doctors, next_cursor), 200
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -56,28 +108,71 @@ def get_all_doctors():
 @admin_bp.route('/pending-doctors', methods=['GET'])
 def get_pending_doctors():
     try:
-        pending = list(db_services.mongo.db.pending_doctors.find({}))
-        for doc in pending:
-            doc['_id'] = str(doc['_id'])
-        return jsonify(pending), 200
+        limit, after = parse_page_args(request.args, current_app.config)
+        projection = mongo_projection("pending_doctor", parse_fields(request.args, "pending_doctor"))
+        if wants_ndjson(request):
+            return stream_collection(db_services.mongo.db.pending_doctors, format_pending_doctor, after, projection)
+
+        pending, next_cursor = find_page(db_services.mongo.db.pending_doctors, limit=limit, after=after, projection=projection)
+        pending = [format_pending_doctor(doc) for doc in pending]
+        return page_response(pending, next_cursor), 200
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@admin_bp.route('/export/<kind>', methods=['GET'])
+def export_data(kind):
+    # Export complet en flux : ?format=jsonl|csv|parquet, et pour les consultations ?etat=&from=&to=
+    try:
+        fmt = request.args.get("format", "jsonl")
+        date_from, date_to = parse_date_range(request.args.get("from"), request.args.get("to"))
+        chunks = export_stream(kind, fmt, etat=request.args.get("etat"), date_from=date_from, date_to=date_to)
+        return Response(
+            stream_with_context(chunks),
+            mimetype=EXPORT_FORMATS[fmt],
+            headers={"Content-Disposition": f"attachment; filename={kind}.{fmt}"}
+        )
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+
+@admin_bp.route('/slow-queries', methods=['GET'])
+def get_slow_queries():
+    # Pires requêtes Mongo/Cypher depuis le démarrage du worker : ?limit=&sort=max_ms|total_ms|mean_ms|count
+    try:
+        limit = request.args.get("limit", type=int)
+        queries = top_slow_queries(limit=limit, sort=request.args.get("sort", "max_ms"))
+        return jsonify({"count": len(queries), "queries": queries}), 200
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+
+@admin_bp.route('/slow-queries', methods=['DELETE'])
+def reset_slow_queries():
+    slow_query_log.reset()
+    return jsonify({"message": "Journal des requêtes lentes vidé"}), 200
+
+
 @admin_bp.route('/review-doctor/<doctor_id>', methods=['POST'])
 def review_doctor(doctor_id):
     try:
         action = request.json.get("action")
-        admin_id = request.json.get("admin_id")
         reason = request.json.get("reason", "No reason provided")
 
-        # Validate admin
+        # The reviewing admin is the token holder; admin_id in the body is only
+        # trusted (and looked up) when tokens are not required
+        principal = g.get("principal")
+        admin_id = principal.user_id if principal is not None else request.json.get("admin_id")
         if not admin_id:
             return jsonify({"error": "Admin ID is required"}), 400
         try:
             admin_obj_id = ObjectId(admin_id)
         except:
             return jsonify({"error": "Invalid admin ID format"}), 400
-        if not db_services.mongo.db.admins.find_one({"_id": admin_obj_id}):
+        if principal is None and not db_services.mongo.db.admins.find_one({"_id": admin_obj_id}, {"_id": 1}):
             return jsonify({"error": "Admin not found"}), 404
 
         # Get doctor request
@@ -93,29 +188,13 @@ def review_doctor(doctor_id):
 
         if action == "approve":
 
-            # Check email uniqueness
-            if db_services.mongo.db.doctors.find_one({"email": doctor['email']}):
-                return jsonify({"error": "Email already in use by a doctor"}), 400
-            if db_services.mongo.db.patients.find_one({"email": doctor['email']}):
-                return jsonify({"error": "Email already in use by a patient"}), 400
-            print(doctor)
-
-
-
-            new_id = create_doctor_nohash(doctor)
-
-            # Neo4j relationship
-            with db_services.neo4j_driver.session() as session:
-                session.run("""
-                    MERGE (a:Admin {id: $admin_id})
-                    WITH a
-                    MATCH (d:Doctor {email: $email})
-                    CREATE (a)-[:APPROVED {at: datetime($timestamp)}]->(d)
-                """, {
-                    "admin_id": admin_id_str,
-                    "email": doctor['email'],
-                    "timestamp": timestamp
-                })
+            # The identity reserved by the request is re-keyed to the new doctor: the email stays taken;
+            # the Neo4j relationship is written with the doctor and applied after its node by the outbox worker
+            try:
+                new_id = create_doctor_nohash(doctor, request_id=doctor_id,
+                                              approved_by=admin_id_str, approved_at=timestamp)
+            except ValueError as e:
+                return jsonify({"error": str(e)}), 400
 
             message = f"Doctor approved with id {new_id}"
 
@@ -124,21 +203,17 @@ def review_doctor(doctor_id):
             doctor['rejected_by'] = admin_id_str
             doctor['rejected_at'] = timestamp
             doctor['rejection_reason'] = reason
-            db_services.mongo.db.rejected_doctors.insert_one(doctor)
-
-            with db_services.neo4j_driver.session() as session:
-                session.run("""
-                    MERGE (a:Admin {id: $admin_id})
-                    CREATE (d:RejectedDoctor {email: $email, nom: $nom, prenom: $prenom})
-                    CREATE (a)-[:REJECTED {at: datetime($timestamp), reason: $reason}]->(d)
-                """, {
-                    "admin_id": admin_id_str,
-                    "email": doctor['email'],
-                    "nom": doctor['nom'],
-                    "prenom": doctor['prenom'],
-                    "timestamp": timestamp,
-                    "reason": reason
-                })
+            insert_entity(db_services.mongo.db.rejected_doctors, doctor, outbox_event(
+                "doctor_request.rejected",
+                doctor_id,
+                admin_id=admin_id_str,
+                email=doctor['email'],
+                nom=doctor['nom'],
+                prenom=doctor['prenom'],
+                at=timestamp,
+                reason=reason
+            ))
+            unregister_identity(doctor_id)
 
             message = "Doctor rejected and logged"
         else:
@@ -156,10 +231,6 @@ def add_admin():
         # Get JSON data from request
         data = request.get_json()
 
-        # Verify admin privileges (uncomment when auth is implemented)
-        # if not current_user.is_admin:
-        #     return jsonify({"error": "Unauthorized"}), 403
-
         # Create admin using your service function
         admin_id = create_admin(data)
 
@@ -171,6 +242,8 @@ def add_admin():
     except ValueError as e:
         # Handle validation errors from create_admin
         return jsonify({"error": str(e)}), 400
+    except PasswordHashTimeout as e:
+        return jsonify({"error": str(e)}), 503
     except Exception as e:
         # Handle unexpected errors
         return jsonify({"error": f"An error occurred: {str(e)}"}), 500
\ No newline at end of file
@@ -0,0 +1,161 @@
+# Routes de lecture servies nativement en asynchrone (mode ASGI, voir asgi.py).
+# Mêmes URLs et mêmes réponses que DocteurRoute / PatientRoute, ETags compris.
+
+from functools import wraps
+
+from quart import Blueprint, current_app, g, jsonify, make_response, request
+
+from BackEnd.Services import AsyncService
+from BackEnd.Services.DocteurService import parse_consultation_filters
+from BackEnd.Services.projection import parse_fields, select_fields
+from BackEnd.Services.TokenService import allow, view_access
+from BackEnd.Services.versions import (
+    consultations_scope,
+    entity_scope,
+    make_etag,
+    set_revalidation,
+    versions_blocking,
+    view_scopes
+)
+
+async_doctor_bp = Blueprint('async_doctor', __name__)
+async_patient_bp = Blueprint('async_patient', __name__)
+
+
+def handle_service_errors(f):
+    """Décorateur pour la gestion centralisée des erreurs"""
+
+    @wraps(f)
+    async def wrapper(*args, **kwargs):
+        try:
+            return await f(*args, **kwargs)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        except Exception as e:
+            return jsonify({"error": f"Erreur serveur: {str(e)}"}), 500
+
+    return wrapper
+
+
+def conditional_get(*scope_functions):
+    """versions.conditional_get pour les vues Quart"""
+    def decorator(view):
+        @wraps(view)
+        async def wrapper(*args, **kwargs):
+            etag = await AsyncService.off_loop(versions_blocking(), make_etag,
+                                               view_scopes(scope_functions, kwargs), request._get_current_object())
+            if request.if_none_match.contains_weak(etag):
+                response = current_app.response_class("", status=304)
+            else:
+                response = await make_response(await view(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+            return set_revalidation(response, etag)
+
+        return wrapper
+
+    return decorator
+
+
+def authorize(owner_role, owner_arg):
+    # Mêmes règles que les blueprints Flask : propriétaire de l'URL, admin ou rôles @allow
+    async def hook():
+        denied = request.method != "OPTIONS" and view_access(
+            current_app.view_functions.get(request.endpoint),
+            g.get("principal"),
+            owner_role,
+            (request.view_args or {}).get(owner_arg)
+        )
+        if denied:
+            return jsonify({"error": denied[0]}), denied[1]
+
+    return hook
+
+
+async_doctor_bp.before_request(authorize("doctor", "doctor_id"))
+async_patient_bp.before_request(authorize("patient", "patient_id"))
+
+
+@async_doctor_bp.route('/<string:doctor_id>', methods=['GET'])
+@allow("doctor", "patient")
+@conditional_get(entity_scope("doctor", "doctor_id"))
+@handle_service_errors
+async def get_doctor_route(doctor_id: str):
+    fields = parse_fields(request.args, "doctor", listing=False)
+    doctor = await AsyncService.get_doctor(doctor_id)
+    return jsonify(select_fields(doctor, fields))
+
+
+@async_doctor_bp.route('/<string:doctor_id>/patients', methods=['GET'])
+@handle_service_errors
+async def list_doctor_patients(doctor_id: str):
+    fields = parse_fields(request.args, "patient")
+    doctor = await AsyncService.get_doctor(doctor_id)
+    patients = await AsyncService.get_patients_bulk(doctor.get("patient_ids", []), fields=fields)
+    return jsonify({
+        "count": len(patients),
+        "patients": patients
+    })
+
+
+@async_doctor_bp.route('/<string:doctor_id>/consultations', methods=['GET'])
+@conditional_get(consultations_scope("doctor", "doctor_id"))
+@handle_service_errors
+async def list_doctor_consultations(doctor_id: str):
+    filters = parse_consultation_filters(request.args)
+    fields = parse_fields(request.args, "consultation")
+    consultations = await AsyncService.get_consultations_by_doctor(doctor_id, fields=fields, **filters)
+    return jsonify({
+        "count": len(consultations),
+        "consultations": consultations
+    })
+
+
+@async_doctor_bp.route('/<string:doctor_id>/consultations/pending', methods=['GET'])
+@conditional_get(consultations_scope("doctor", "doctor_id"))
+@handle_service_errors
+async def list_pending_consultations(doctor_id: str):
+    filters = parse_consultation_filters(request.args)
+    filters["etat"] = "demandée"
+    fields = parse_fields(request.args, "consultation")
+    pending = await AsyncService.get_consultations_by_doctor(doctor_id, fields=fields, **filters)
+    return jsonify({
+        "count": len(pending),
+        "consultations": pending
+    })
+
+
+@async_patient_bp.route('/<string:patient_id>', methods=['GET'])
+@allow("doctor")
+@conditional_get(entity_scope("patient", "patient_id"))
+@handle_service_errors
+async def get_patient_route(patient_id: str):
+    fields = parse_fields(request.args, "patient", listing=False)
+    patient = await AsyncService.get_patient(patient_id)
+    return jsonify(select_fields(patient, fields))
+
+
+@async_patient_bp.route('/<string:patient_id>/consultations', methods=['GET'])
+@conditional_get(consultations_scope("patient", "patient_id"))
+@handle_service_errors
+async def get_patient_consultations(patient_id: str):
+    filters = parse_consultation_filters(request.args)
+    fields = parse_fields(request.args, "consultation")
+    consultations = await AsyncService.get_consultations_by_patient(patient_id, fields=fields, **filters)
+    return jsonify({
+        "count": len(consultations),
+        "consultations": consultations
+    })
+
+
+@async_patient_bp.route('/<string:patient_id>/doctor', methods=['GET'])
+@handle_service_errors
+async def get_patient_doctor(patient_id: str):
+    fields = parse_fields(request.args, "doctor", listing=False)
+    patient = await AsyncService.get_patient(patient_id)
+
+    if not patient.get("doctor_id"):
+        return jsonify({"message": "Aucun docteur assigné"}), 200
+
+    doctor = await AsyncService.get_doctor(str(patient["doctor_id"]))
+    return jsonify(select_fields(doctor, fields))
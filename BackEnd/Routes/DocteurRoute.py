@@ -1,25 +1,36 @@
 from datetime import datetime
 
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, g, request, jsonify, current_app
 from bson import ObjectId
 from functools import wraps
 from typing import Dict, List, Any
 
-from werkzeug.security import generate_password_hash
+from BackEnd.Services.AuthService import hash_password, PasswordHashTimeout
 
 from BackEnd.Services.db import  mongo
 
 # Import des services
 from BackEnd.Services.DocteurService import (
+    ConsultationNotFound,
     create_doctor,
     get_doctor,
     update_doctor,
     delete_doctor,
     list_doctors,
+    iter_doctors,
     get_consultations_by_doctor,
-    update_consultation_status
+    parse_consultation_filters,
+    update_consultation_status,
+    get_availability
 )
-from BackEnd.Services.PatientServices import get_patient
+from BackEnd.Services.PatientServices import get_patients_bulk
+from BackEnd.Services.pagination import parse_page_args
+from BackEnd.Services.streaming import wants_ndjson, ndjson_response
+from BackEnd.Services.IdentityService import insert_with_identity, PENDING_DOCTOR_ROLE
+from BackEnd.Services.OutboxService import OutboxTimeout, read_your_writes
+from BackEnd.Services.versions import conditional_get, entity_scope, consultations_scope
+from BackEnd.Services.projection import parse_fields, select_fields
+from BackEnd.Services.TokenService import allow, public, view_access
 
 
 doctor_bp = Blueprint('doctor', __name__)
@@ -32,14 +43,33 @@ def handle_service_errors(f):
     def wrapper(*args, **kwargs):
         try:
             return f(*args, **kwargs)
+        except ConsultationNotFound as e:
+            return jsonify({"error": str(e)}), 404
         except ValueError as e:
             return jsonify({"error": str(e)}), 400
+        except (PasswordHashTimeout, OutboxTimeout) as e:
+            return jsonify({"error": str(e)}), 503
         except Exception as e:
             return jsonify({"error": f"Erreur serveur: {str(e)}"}), 500
 
     return wrapper
 
 
+@doctor_bp.before_request
+def authorize_request():
+    # Le docteur de l'URL, un admin, ou les rôles déclarés par @allow (jeton vérifié par l'app)
+    if request.method == "OPTIONS":
+        return None
+    denied = view_access(
+        current_app.view_functions.get(request.endpoint),
+        g.get("principal"),
+        "doctor",
+        (request.view_args or {}).get("doctor_id")
+    )
+    if denied:
+        return jsonify({"error": denied[0]}), denied[1]
+
+
 @doctor_bp.route('', methods=['POST'])
 @handle_service_errors
 def add_doctor():
@@ -57,12 +87,15 @@ def add_doctor():
 
 
 @doctor_bp.route('/<string:doctor_id>', methods=['GET'])
+@allow("doctor", "patient")
+@conditional_get(entity_scope("doctor", "doctor_id"))
 @handle_service_errors
 def get_doctor_route(doctor_id: str):
+    fields = parse_fields(request.args, "doctor", listing=False)
     doctor = get_doctor(doctor_id)
     if not doctor:
         return jsonify({"error": "Docteur non trouvé"}), 404
-    return jsonify(doctor)
+    return jsonify(select_fields(doctor, fields))
 
 
 @doctor_bp.route('/<string:doctor_id>', methods=['PUT'])
@@ -87,10 +120,37 @@ def delete_doctor_route(doctor_id: str):
 
 
 @doctor_bp.route('', methods=['GET'])
+@allow("doctor", "patient")
 @handle_service_errors
 def list_doctors_route():
-    doctors = list_doctors()
+    limit, after = parse_page_args(request.args, current_app.config)
+    fields = parse_fields(request.args, "doctor")
+    if wants_ndjson(request):
+        return ndjson_response(iter_doctors(after=after, fields=fields))
+
+    doctors, next_cursor = list_doctors(limit=limit, after=after, fields=fields)
+    return jsonify({
+        "count": len(doctors),
+        "doctors": doctors,
+        "next_cursor": next_cursor
+    })
+
+
+@doctor_bp.route('/availability', methods=['GET'])
+@allow("doctor", "patient")
+@handle_service_errors
+def doctor_availability():
+    specialite = request.args.get("specialite")
+    date_from = request.args.get("from")
+    date_to = request.args.get("to")
+    if not specialite or not date_from or not date_to:
+        return jsonify({"error": "specialite, from et to requis"}), 400
+
+    duration = request.args.get("duration", 60)
+    doctors = get_availability(specialite, date_from, date_to, duration)
     return jsonify({
+        "specialite": specialite,
+        "duration": int(duration),
         "count": len(doctors),
         "doctors": doctors
     })
@@ -99,15 +159,12 @@ def list_doctors_route():
 @doctor_bp.route('/<string:doctor_id>/patients', methods=['GET'])
 @handle_service_errors
 def list_doctor_patients(doctor_id: str):
+    fields = parse_fields(request.args, "patient")
     doctor = get_doctor(doctor_id)
     if not doctor:
         return jsonify({"error": "Docteur non trouvé"}), 404
 
-    patients = []
-    for patient_id in doctor.get("patient_ids", []):
-        patient = get_patient(str(patient_id))
-        if patient:
-            patients.append(patient)
+    patients = get_patients_bulk([str(pid) for pid in doctor.get("patient_ids", [])], fields=fields)
 
     return jsonify({
         "count": len(patients),
@@ -116,9 +173,12 @@ def list_doctor_patients(doctor_id: str):
 
 
 @doctor_bp.route('/<string:doctor_id>/consultations', methods=['GET'])
+@conditional_get(consultations_scope("doctor", "doctor_id"))
 @handle_service_errors
 def list_doctor_consultations(doctor_id: str):
-    consultations = get_consultations_by_doctor(doctor_id)
+    filters = parse_consultation_filters(request.args)
+    fields = parse_fields(request.args, "consultation")
+    consultations = get_consultations_by_doctor(doctor_id, fields=fields, **filters)
     return jsonify({
         "count": len(consultations),
         "consultations": consultations
@@ -126,10 +186,13 @@ def list_doctor_consultations(doctor_id: str):
 
 
 @doctor_bp.route('/<string:doctor_id>/consultations/pending', methods=['GET'])
+@conditional_get(consultations_scope("doctor", "doctor_id"))
 @handle_service_errors
 def list_pending_consultations(doctor_id: str):
-    consultations = get_consultations_by_doctor(doctor_id)
-    pending = [c for c in consultations if c.get("etat") == "demandée"]
+    filters = parse_consultation_filters(request.args)
+    filters["etat"] = "demandée"
+    fields = parse_fields(request.args, "consultation")
+    pending = get_consultations_by_doctor(doctor_id, fields=fields, **filters)
     return jsonify({
         "count": len(pending),
         "consultations": pending
@@ -137,9 +200,10 @@ def list_pending_consultations(doctor_id: str):
 
 
 @doctor_bp.route('/<string:doctor_id>/consultations/<string:consultation_id>/accept', methods=['POST'])
+@read_your_writes  # the pending list is read back from Neo4j right after
 @handle_service_errors
 def accept_consultation(doctor_id: str, consultation_id: str):
-    updated = update_consultation_status(consultation_id, "acceptée")
+    updated = update_consultation_status(consultation_id, "acceptée", doctor_id=doctor_id)
     return jsonify({
         "message": "Consultation acceptée",
         "consultation": updated
@@ -147,15 +211,17 @@ def accept_consultation(doctor_id: str, consultation_id: str):
 
 
 @doctor_bp.route('/<string:doctor_id>/consultations/<string:consultation_id>/reject', methods=['POST'])
+@read_your_writes
 @handle_service_errors
 def reject_consultation(doctor_id: str, consultation_id: str):
-    updated = update_consultation_status(consultation_id, "rejetée")
+    updated = update_consultation_status(consultation_id, "rejetée", doctor_id=doctor_id)
     return jsonify({
         "message": "Consultation rejetée",
         "consultation": updated
     })
 
 @doctor_bp.route('/admin/request', methods=['POST'])
+@public
 def submit_doctor_request():
     try:
         data = request.get_json()
@@ -166,25 +232,28 @@ def submit_doctor_request():
             if field not in data:
                 return jsonify({"error": f"Missing required field: {field}"}), 400
 
-        # Check if email exists
-        existing_doctor = mongo.db.doctors.find_one({"email": data["email"]})
-        existing_pending = mongo.db.pending_doctors.find_one({"email": data["email"]})
-        if existing_doctor or existing_pending:
-            return jsonify({"error": "Email already exists in the system"}), 400
-
         # Hash password and create request
         doctor_request = {
             **data,
             "status": "pending",
             "created_at": datetime.utcnow(),
-            "mot_de_passe": generate_password_hash(data["mot_de_passe"])  # Hashing here
+            "mot_de_passe": hash_password(data["mot_de_passe"])  # Hashing here
         }
 
-        result = mongo.db.pending_doctors.insert_one(doctor_request)
+        # The pending request reserves the email in the identities index
+        try:
+            request_id = insert_with_identity(
+                mongo.db.pending_doctors, doctor_request, PENDING_DOCTOR_ROLE, doctor_request["mot_de_passe"]
+            )
+        except ValueError:
+            return jsonify({"error": "Email already exists in the system"}), 400
+
         return jsonify({
             "message": "Registration submitted for admin approval",
-            "request_id": str(result.inserted_id)
+            "request_id": request_id
         }), 201
 
+    except PasswordHashTimeout as e:
+        return jsonify({"error": str(e)}), 503
     except Exception as e:
         return jsonify({"error": str(e)}), 500
\ No newline at end of file
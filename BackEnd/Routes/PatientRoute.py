@@ -1,4 +1,4 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, g, request, jsonify, current_app
 from bson import ObjectId
 from functools import wraps
 from typing import Dict, Any
@@ -10,10 +10,18 @@ from BackEnd.Services.PatientServices import (
     update_patient,
     delete_patient,
     list_patients,
+    iter_patients,
     assign_patient_to_doctor,
     create_consultation
 )
-from BackEnd.Services.DocteurService import get_consultations_by_patient, get_doctor
+from BackEnd.Services.DocteurService import get_consultations_by_patient, get_doctor, parse_consultation_filters
+from BackEnd.Services.AuthService import PasswordHashTimeout
+from BackEnd.Services.OutboxService import OutboxTimeout
+from BackEnd.Services.pagination import parse_page_args
+from BackEnd.Services.streaming import wants_ndjson, ndjson_response
+from BackEnd.Services.versions import conditional_get, entity_scope, consultations_scope
+from BackEnd.Services.projection import parse_fields, select_fields
+from BackEnd.Services.TokenService import allow, public, view_access
 
 patient_bp = Blueprint('patient', __name__)
 
@@ -27,13 +35,31 @@ def handle_service_errors(f):
             return f(*args, **kwargs)
         except ValueError as e:
             return jsonify({"error": str(e)}), 400
+        except (PasswordHashTimeout, OutboxTimeout) as e:
+            return jsonify({"error": str(e)}), 503
         except Exception as e:
             return jsonify({"error": f"Erreur serveur: {str(e)}"}), 500
 
     return wrapper
 
 
+@patient_bp.before_request
+def authorize_request():
+    # Le patient de l'URL, un admin, ou les rôles déclarés par @allow (jeton vérifié par l'app)
+    if request.method == "OPTIONS":
+        return None
+    denied = view_access(
+        current_app.view_functions.get(request.endpoint),
+        g.get("principal"),
+        "patient",
+        (request.view_args or {}).get("patient_id")
+    )
+    if denied:
+        return jsonify({"error": denied[0]}), denied[1]
+
+
 @patient_bp.route('', methods=['POST'])
+@public
 @handle_service_errors
 def add_patient():
     data: Dict[str, Any] = request.json
@@ -50,12 +76,15 @@ def add_patient():
 
 
 @patient_bp.route('/<string:patient_id>', methods=['GET'])
+@allow("doctor")
+@conditional_get(entity_scope("patient", "patient_id"))
 @handle_service_errors
 def get_patient_route(patient_id: str):
+    fields = parse_fields(request.args, "patient", listing=False)
     patient = get_patient(patient_id)
     if not patient:
         return jsonify({"error": "Patient non trouvé"}), 404
-    return jsonify(patient)
+    return jsonify(select_fields(patient, fields))
 
 
 @patient_bp.route('/<string:patient_id>', methods=['PUT'])
@@ -80,19 +109,29 @@ def delete_patient_route(patient_id: str):
 
 
 @patient_bp.route('', methods=['GET'])
+@allow("doctor")
 @handle_service_errors
 def list_patients_route():
-    patients = list_patients()
+    limit, after = parse_page_args(request.args, current_app.config)
+    fields = parse_fields(request.args, "patient")
+    if wants_ndjson(request):
+        return ndjson_response(iter_patients(after=after, fields=fields))
+
+    patients, next_cursor = list_patients(limit=limit, after=after, fields=fields)
     return jsonify({
         "count": len(patients),
-            "patients": patients
+        "patients": patients,
+        "next_cursor": next_cursor
     })
 
 
 @patient_bp.route('/<string:patient_id>/consultations', methods=['GET'])
+@conditional_get(consultations_scope("patient", "patient_id"))
 @handle_service_errors
 def get_patient_consultations(patient_id: str):
-    consultations = get_consultations_by_patient(patient_id)
+    filters = parse_consultation_filters(request.args)
+    fields = parse_fields(request.args, "consultation")
+    consultations = get_consultations_by_patient(patient_id, fields=fields, **filters)
     return jsonify({
         "count": len(consultations),
         "consultations": consultations
@@ -102,6 +141,7 @@ def get_patient_consultations(patient_id: str):
 @patient_bp.route('/<string:patient_id>/doctor', methods=['GET'])
 @handle_service_errors
 def get_patient_doctor(patient_id: str):
+    fields = parse_fields(request.args, "doctor", listing=False)
     patient = get_patient(patient_id)
     if not patient:
         return jsonify({"error": "Patient non trouvé"}), 404
@@ -113,7 +153,7 @@ def get_patient_doctor(patient_id: str):
     if not doctor:
         return jsonify({"error": "Docteur non trouvé"}), 404
 
-    return jsonify(doctor)
+    return jsonify(select_fields(doctor, fields))
 
 
 @patient_bp.route('/<string:patient_id>/assign-doctor/<string:doctor_id>', methods=['POST'])
@@ -1,7 +1,17 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, g, request, jsonify
 from werkzeug.exceptions import Unauthorized, BadRequest
-from BackEnd.Services.AuthService import hash_password,verify_password  # Assuming you have this
-from BackEnd.Services.db import mongo
+from BackEnd.Services.AuthService import hash_password, verify_password, needs_rehash, PasswordHashTimeout
+from BackEnd.Services import db as db_services
+from BackEnd.Services.IdentityService import find_identity_by_email, update_identity, USER_COLLECTIONS
+from BackEnd.Services.projection import mongo_projection
+from BackEnd.Services.TokenService import (
+    InvalidToken,
+    decode_token,
+    issue_tokens,
+    refresh_tokens,
+    revoke_token,
+    REFRESH
+)
 
 auth_route = Blueprint('auth', __name__)
 
@@ -16,33 +26,29 @@ def login():
         if not email or not password:
             raise BadRequest("Email and password are required")
 
-        # Check all user collections
-        user_collections = [
-            ('patient', mongo.db.patients),
-            ('doctor', mongo.db.doctors),
-            ('admin', mongo.db.admins)
-        ]
+        # One indexed lookup in the identities collection
+        identity = find_identity_by_email(email)
+        if identity and identity['role'] in USER_COLLECTIONS:
 
-        for role, collection in user_collections:
-            user = collection.find_one({"email": email})
-            if user:
+            # Verify the hashed password
+            if verify_password(identity.get('mot_de_passe'), password):
+                collection = db_services.mongo.db[USER_COLLECTIONS[identity['role']]]
+                # The hash is checked against the identity: the user document is read without secrets
+                user = collection.find_one({"_id": identity['user_id']}, mongo_projection(identity['role']))
+                if user:
+                    # Transparent upgrade when the hashing parameters changed
+                    password_hash = identity.get('mot_de_passe')
+                    if needs_rehash(password_hash):
+                        password_hash = hash_password(password)
+                        update_identity(identity['user_id'], password_hash=password_hash)
+                        collection.update_one({"_id": identity['user_id']}, {"$set": {"mot_de_passe": password_hash}})
 
-
-                # Verify the hashed password
-
-                print(user)
-                print(password)
-                print(verify_password(user.get('mot_de_passe'), password))
-                if verify_password(user.get('mot_de_passe'), password):
                     # Convert ObjectId to string and prepare response
                     user['_id'] = str(user['_id'])
-                    user['role'] = role
-
-                    # Remove sensitive data before returning
-                    user.pop('mot_de_passe', None)
-                    user.pop('password', None)
+                    user['role'] = identity['role']
 
-                    return jsonify(user)
+                    # Signed tokens: later requests are authorized without any lookup
+                    return jsonify({**user, **issue_tokens(user['_id'], identity['role'], password_hash)})
 
         # If we get here, no valid user was found
         raise Unauthorized("Invalid email or password")
@@ -51,5 +57,38 @@ def login():
         return jsonify({"error": str(e)}), 400
     except Unauthorized as e:
         return jsonify({"error": str(e)}), 401
+    except PasswordHashTimeout as e:
+        return jsonify({"error": str(e)}), 503
+    except Exception as e:
+        return jsonify({"error": "An unexpected error occurred"}), 500
+
+
+@auth_route.route('/refresh', methods=['POST'])
+def refresh():
+    # New token pair; the refresh token sent is revoked (rotation)
+    try:
+        data = request.get_json(silent=True) or {}
+        if not data.get('refresh_token'):
+            raise BadRequest("refresh_token is required")
+        return jsonify(refresh_tokens(data['refresh_token']))
+    except BadRequest as e:
+        return jsonify({"error": str(e)}), 400
+    except InvalidToken as e:
+        return jsonify({"error": str(e)}), 401
     except Exception as e:
-        return jsonify({"error": "An unexpected error occurred"}), 500
\ No newline at end of file
+        return jsonify({"error": "An unexpected error occurred"}), 500
+
+
+@auth_route.route('/logout', methods=['POST'])
+def logout():
+    # Revokes the access token of the request and the refresh token of the body, when valid
+    data = request.get_json(silent=True) or {}
+    principal = g.get('principal')
+    if principal is not None:
+        revoke_token(principal.claims)
+    if data.get('refresh_token'):
+        try:
+            revoke_token(decode_token(data['refresh_token'], REFRESH))
+        except InvalidToken:
+            pass
+    return jsonify({"message": "Logged out"}), 200
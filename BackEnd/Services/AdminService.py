@@ -1,19 +1,10 @@
 from flask_pymongo import PyMongo
 from bson import ObjectId
-from werkzeug.security import generate_password_hash
+from BackEnd.Services.AuthService import hash_password
 
 from .db import mongo
+from .IdentityService import insert_with_identity
 def create_admin(data):
-    email = data.get("email")
-
-    # Check if email is already used by any user (admin, patient, or doctor)
-    existing_admin = mongo.db.admins.find_one({"email": email})
-    existing_patient = mongo.db.patients.find_one({"email": email})
-    existing_doctor = mongo.db.doctors.find_one({"email": email})
-
-    if existing_admin or existing_patient or existing_doctor:
-        raise ValueError("Cet email est déjà utilisé par un autre utilisateur.")
-
     # Validate required fields
     required_fields = ["nom", "prenom", "email", "mot_de_passe"]
     for field in required_fields:
@@ -21,11 +12,10 @@ def create_admin(data):
             raise ValueError(f"Le champ {field} est obligatoire.")
 
     # Hash the password
-    data["mot_de_passe"] = generate_password_hash(data["mot_de_passe"])
+    data["mot_de_passe"] = hash_password(data["mot_de_passe"])
 
-    # Insert the admin into MongoDB
-    result = mongo.db.admins.insert_one(data)
-    admin_id = str(result.inserted_id)
+    # Insert the admin into MongoDB (email uniqueness enforced by the identities index)
+    admin_id = insert_with_identity(mongo.db.admins, data, "admin", data["mot_de_passe"])
 
     return admin_id
 
@@ -0,0 +1,143 @@
+# services/AsyncService.py
+# Versions asynchrones des lectures chaudes (mode ASGI), mêmes réponses que
+# DocteurService / PatientServices ; les lookups indépendants tournent en parallèle.
+# Cache et versions Redis (clients synchrones) sont appelés dans un thread, hors de la boucle.
+
+import asyncio
+
+from bson import ObjectId
+
+from BackEnd.Services import db as db_services
+from BackEnd.Services.db import chunked
+from BackEnd.Services.cache import doctor_cache, patient_cache
+from BackEnd.Services.DocteurService import (
+    DOCTOR_CONSULTATIONS,
+    DOCTOR_PATIENT_IDS,
+    PATIENT_CONSULTATIONS,
+    consultation_filters,
+    merge_consultations
+)
+from BackEnd.Services.PatientServices import PATIENT_DOCTOR_ID, PATIENTS_DOCTOR_IDS
+from BackEnd.Services.projection import mongo_projection, wants
+
+
+async def off_loop(blocking, fn, *args):
+    # Appels bloquants (backend Redis) exécutés dans un thread ; mémoire : appel direct
+    if blocking:
+        return await asyncio.to_thread(fn, *args)
+    return fn(*args)
+
+
+async def _cypher(query, **params):
+    async with db_services.async_neo4j_driver.session() as session:
+        result = await session.run(query, **params)
+        return [record async for record in result]
+
+
+async def get_doctor(doctor_id):
+    if not ObjectId.is_valid(doctor_id):
+        raise ValueError("ID docteur invalide")
+
+    cached = await off_loop(doctor_cache.blocking, doctor_cache.get, doctor_id)
+    if cached is not None:
+        return cached
+
+    # Mongo document and Neo4j relationships fetched concurrently
+    doc, records = await asyncio.gather(
+        db_services.async_mongo_db.doctors.find_one({"_id": ObjectId(doctor_id)}, mongo_projection("doctor")),
+        _cypher(DOCTOR_PATIENT_IDS, id=doctor_id)
+    )
+    if not doc:
+        raise ValueError("Docteur non trouvé")
+
+    doc["_id"] = str(doc["_id"])
+    doc["patient_ids"] = [record["patient_id"] for record in records]
+
+    await off_loop(doctor_cache.blocking, doctor_cache.set, doctor_id, doc)
+    return doc
+
+
+async def get_patient(patient_id):
+    if not ObjectId.is_valid(patient_id):
+        raise ValueError("ID patient invalide")
+
+    cached = await off_loop(patient_cache.blocking, patient_cache.get, patient_id)
+    if cached is not None:
+        return cached
+
+    pat, records = await asyncio.gather(
+        db_services.async_mongo_db.patients.find_one({"_id": ObjectId(patient_id)}, mongo_projection("patient")),
+        _cypher(PATIENT_DOCTOR_ID, id=patient_id)
+    )
+    if not pat:
+        raise ValueError("Patient non trouvé")
+
+    pat["_id"] = str(pat["_id"])
+    if records:
+        pat["doctor_id"] = records[0]["doctor_id"]
+
+    await off_loop(patient_cache.blocking, patient_cache.set, patient_id, pat)
+    return pat
+
+
+async def _find_in(collection, object_ids, extra_filter=None, projection=None):
+    # One $in query per batch, all batches in flight together
+    batches = await asyncio.gather(*(
+        collection.find({**(extra_filter or {}), "_id": {"$in": ids}}, projection).to_list(None)
+        for ids in chunked(object_ids)
+    ))
+    return [doc for batch in batches for doc in batch]
+
+
+async def get_patients_bulk(patient_ids, fields=None):
+    object_ids = [ObjectId(pid) for pid in patient_ids if ObjectId.is_valid(pid)]
+
+    # Mongo documents and Neo4j doctor ids fetched concurrently
+    docs, *record_batches = await asyncio.gather(
+        _find_in(db_services.async_mongo_db.patients, object_ids, projection=mongo_projection("patient", fields)),
+        *(_cypher(PATIENTS_DOCTOR_IDS, ids=[str(oid) for oid in ids])
+          for ids in chunked(object_ids) if wants(fields, "doctor_id"))
+    )
+    doctor_ids = {record["patient_id"]: record["doctor_id"] for batch in record_batches for record in batch}
+
+    pats = {}
+    for pat in docs:
+        pat["_id"] = str(pat["_id"])
+        if pat["_id"] in doctor_ids:
+            pat["doctor_id"] = doctor_ids[pat["_id"]]
+        pats[pat["_id"]] = pat
+
+    return [pats[pid] for pid in map(str, patient_ids) if pid in pats]
+
+
+async def _hydrate_consultations(records, mongo_filter, owner, fields=None):
+    object_ids = [ObjectId(r["consultation_id"]) for r in records if ObjectId.is_valid(r["consultation_id"])]
+    docs = await _find_in(
+        db_services.async_mongo_db.consultations, object_ids, mongo_filter, mongo_projection("consultation", fields)
+    )
+    mongo_consults = {str(doc["_id"]): doc for doc in docs}
+    return merge_consultations(records, mongo_consults, owner, fields)
+
+
+async def get_consultations_by_doctor(doctor_id, etat=None, date_from=None, date_to=None, limit=None, fields=None):
+    if not ObjectId.is_valid(doctor_id):
+        raise ValueError("ID docteur invalide")
+
+    where, params, mongo_filter = consultation_filters(etat, date_from, date_to)
+    limit_clause = "LIMIT $limit" if limit else ""
+    records = await _cypher(DOCTOR_CONSULTATIONS.format(where=where, limit_clause=limit_clause),
+                            did=doctor_id, limit=limit, **params)
+
+    return await _hydrate_consultations([dict(r) for r in records], mongo_filter, {"doctor_id": doctor_id}, fields)
+
+
+async def get_consultations_by_patient(patient_id, etat=None, date_from=None, date_to=None, limit=None, fields=None):
+    if not ObjectId.is_valid(patient_id):
+        raise ValueError("ID patient invalide")
+
+    where, params, mongo_filter = consultation_filters(etat, date_from, date_to)
+    limit_clause = "LIMIT $limit" if limit else ""
+    records = await _cypher(PATIENT_CONSULTATIONS.format(where=where, limit_clause=limit_clause),
+                            pid=patient_id, limit=limit, **params)
+
+    return await _hydrate_consultations([dict(r) for r in records], mongo_filter, {"patient_id": patient_id}, fields)
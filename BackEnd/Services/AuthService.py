@@ -1,23 +1,116 @@
-from werkzeug.security import generate_password_hash, check_password_hash
-from bson import ObjectId
+import multiprocessing
+import threading
+import time
+from itertools import repeat
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeoutError
+
+from werkzeug.security import generate_password_hash, check_password_hash, DEFAULT_PBKDF2_ITERATIONS
 # supposés définis quelque part
 from flask_pymongo import PyMongo
+from BackEnd.Services.IdentityService import find_identity_by_user_id, USER_COLLECTIONS
 mongo = PyMongo()  # sera initialisé avec app plus tard
 
+
+class PasswordHashTimeout(RuntimeError):
+    """Le hachage n'a pas pu être fait dans le délai imparti (pool saturé)"""
+
+
+# Hachage dans un pool de processus pour ne pas bloquer les threads WSGI
+_hashing = {
+    "method": "scrypt:32768:8:1",
+    "workers": 2,
+    "timeout": 5.0,
+    "pool": None,
+    "slots": None,
+}
+_pool_lock = threading.Lock()
+
+
+def configure_hashing(method=None, workers=None, timeout=None):
+    with _pool_lock:
+        if method:
+            _hashing["method"] = method
+        if workers:
+            _hashing["workers"] = workers
+        if timeout:
+            _hashing["timeout"] = timeout
+        if _hashing["pool"] is not None:
+            _hashing["pool"].shutdown(wait=False)
+        _hashing["pool"] = None
+        _hashing["slots"] = None
+
+
+def _pool_context():
+    # Pool created lazily, once the driver / outbox threads run: fork would copy their locks
+    methods = multiprocessing.get_all_start_methods()
+    return multiprocessing.get_context("forkserver" if "forkserver" in methods else "spawn")
+
+
+def _get_pool():
+    with _pool_lock:
+        if _hashing["pool"] is None:
+            _hashing["pool"] = ProcessPoolExecutor(max_workers=_hashing["workers"], mp_context=_pool_context())
+            # Bounded queue: at most 4 pending or running jobs per worker
+            _hashing["slots"] = threading.BoundedSemaphore(_hashing["workers"] * 4)
+        return _hashing["pool"], _hashing["slots"]
+
+
+def _run_in_pool(fn, *args):
+    pool, slots = _get_pool()
+    # One deadline for the wait in the queue and the hashing itself
+    deadline = time.monotonic() + _hashing["timeout"]
+    if not slots.acquire(timeout=_hashing["timeout"]):
+        raise PasswordHashTimeout("Service de hachage saturé, réessayez plus tard")
+    try:
+        future = pool.submit(fn, *args)
+    except Exception:
+        slots.release()
+        raise
+    # The slot is given back when the job is really over (done or cancelled), not when we stop waiting
+    future.add_done_callback(lambda _: slots.release())
+    try:
+        return future.result(timeout=max(deadline - time.monotonic(), 0))
+    except FutureTimeoutError:
+        future.cancel()
+        raise PasswordHashTimeout("Délai de hachage du mot de passe dépassé")
+
+
 def hash_password(password):
-    return generate_password_hash(password)
+    return _run_in_pool(generate_password_hash, password, _hashing["method"])
+
+def hash_passwords(passwords, method=None):
+    # Bulk hashing (import): spread over every process of the pool, no per-call slot
+    if not passwords:
+        return []
+    pool, _ = _get_pool()
+    method = method or _hashing["method"]
+    chunksize = max(1, len(passwords) // (_hashing["workers"] * 4))
+    return list(pool.map(generate_password_hash, passwords, repeat(method, len(passwords)), chunksize=chunksize))
 
 def verify_password(hashed_password, password):
-    return check_password_hash(hashed_password, password)
+    if not hashed_password:
+        return False
+    return _run_in_pool(check_password_hash, hashed_password, password)
+
+def _canonical_method(method):
+    # Same defaults as werkzeug: "scrypt" is stored as "scrypt:32768:8:1", "pbkdf2" as "pbkdf2:sha256:<n>"
+    name, *args = method.split(":")
+    if name == "scrypt" and not args:
+        return "scrypt:32768:8:1"
+    if name == "pbkdf2" and len(args) < 2:
+        return f"pbkdf2:{args[0] if args else 'sha256'}:{DEFAULT_PBKDF2_ITERATIONS}"
+    return method
+
+
+def needs_rehash(hashed_password):
+    # Werkzeug hashes are "method$salt$hash"; rehash when the configured method changed
+    if not hashed_password:
+        return False
+    return _canonical_method(hashed_password.split("$", 1)[0]) != _canonical_method(_hashing["method"])
 
 def get_role(user_id):
-    # Check in doctors
-    if mongo.db.doctors.find_one({"_id": ObjectId(user_id)}):
-        return "doctor"
-    # Check in patients
-    if mongo.db.patients.find_one({"_id": ObjectId(user_id)}):
-        return "patient"
-    # Check in admins
-    if mongo.db.admins.find_one({"_id": ObjectId(user_id)}):
-        return "admin"
+    # Single indexed lookup in the identities collection
+    identity = find_identity_by_user_id(user_id)
+    if identity and identity["role"] in USER_COLLECTIONS:
+        return identity["role"]
     return None
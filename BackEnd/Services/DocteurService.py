@@ -1,35 +1,34 @@
+from bisect import bisect_left, bisect_right
 from bson import ObjectId
-from datetime import datetime
-from BackEnd.Constantes import specialites
+from datetime import datetime, timedelta
+from BackEnd.Constantes import specialites, horaires_consultation, jours_ouvres
 from BackEnd.Modules.Docteur import Docteur
 from neo4j import GraphDatabase
 from BackEnd.Services.AuthService import hash_password
-from BackEnd.Services.db import neo4j_driver, mongo
+from BackEnd.Services.IdentityService import (
+    insert_with_identity,
+    update_identity,
+    unregister_identity
+)
+from BackEnd.Services.db import neo4j_driver, mongo, chunked
+from BackEnd.Services.pagination import find_page, iter_documents
+from BackEnd.Services.ScheduleIndex import schedule_index, FREEING_STATES
+from BackEnd.Services.PatientServices import CONSULTATION_DURATION
+from BackEnd.Services.cache import read_through, doctor_cache, patient_cache
+from BackEnd.Services.OutboxService import (
+    delete_entity,
+    entity_key,
+    outbox_event,
+    require_sync,
+    update_entity
+)
+from BackEnd.Services.versions import entities_changed, consultations_changed
+from BackEnd.Services.projection import mongo_projection, select_fields, wants
+from BackEnd.Services.TokenService import revoke_user
 
 
 # ---------------------- Neo4j Helpers ----------------------
 
-def create_doctor_node(tx, doctor_id, nom, prenom, specialite, email):
-    tx.run("""
-        CREATE (d:Doctor {id: $id, nom: $nom, prenom: $prenom, specialite: $specialite, email: $email})
-    """, id=doctor_id, nom=nom, prenom=prenom, specialite=specialite, email=email)
-
-
-def update_doctor_node(tx, doctor_id, fields):
-    set_clause = ", ".join([f"d.{key} = ${key}" for key in fields])
-    query = f"""
-        MATCH (d:Doctor {{id: $id}})
-        SET {set_clause}
-    """
-    tx.run(query, id=doctor_id, **fields)
-
-
-def delete_doctor_node(tx, doctor_id):
-    tx.run("""
-        MATCH (d:Doctor {id: $id}) DETACH DELETE d
-    """, id=doctor_id)
-
-
 def create_patient_relationship(tx, doctor_id, patient_id):
     tx.run("""
         MATCH (d:Doctor {id: $did}), (p:Patient {id: $pid})
@@ -44,21 +43,13 @@ def delete_patient_relationship(tx, doctor_id, patient_id):
     """, pid=patient_id, did=doctor_id)
 
 
-def create_consultation_relationship(tx, consultation_id, patient_id, doctor_id, date, etat, description):
-    tx.run("""
-        MATCH (p:Patient {id: $pid}), (d:Doctor {id: $did})
-        CREATE (c:Consultation {id: $cid, date: $date, etat: $etat, description: $description})
-        CREATE (p)-[:A_CONSULTATION]->(c)
-        CREATE (d)-[:A_CONSULTATION]->(c)
-    """, pid=patient_id, did=doctor_id, cid=consultation_id,
-           date=date, etat=etat, description=description)
-
-
-def update_consultation_status_in_neo4j(tx, consultation_id, new_status):
-    tx.run("""
-        MATCH (c:Consultation {id: $cid})
-        SET c.etat = $status
-    """, cid=consultation_id, status=new_status)
+def count_patients_by_doctor(tx, doctor_ids):
+    result = tx.run("""
+        UNWIND $ids AS did
+        OPTIONAL MATCH (p:Patient)-[:EST_SUIVI_PAR]->(d:Doctor {id: did})
+        RETURN did AS doctor_id, count(p) AS patient_count
+    """, ids=doctor_ids)
+    return {record["doctor_id"]: record["patient_count"] for record in result}
 
 
 # ---------------------- Mongo + Neo4j Logic ----------------------
@@ -74,14 +65,6 @@ def create_doctor(data):
     if data["specialite"] not in specialites:
         raise ValueError(f"Spécialité invalide. Options valides: {', '.join(specialites)}")
 
-    # Check email uniqueness across both doctors and patients
-    email = data["email"]
-    existing_doctor = mongo.db.doctors.find_one({"email": email})
-    existing_patient = mongo.db.patients.find_one({"email": email})
-
-    if existing_doctor or existing_patient:
-        raise ValueError("Cet email est déjà utilisé par un autre utilisateur.")
-
     # Hash password and create doctor
     data["mot_de_passe"] = hash_password(data["mot_de_passe"])
     doctor = Docteur(**data)
@@ -90,24 +73,29 @@ def create_doctor(data):
     # Remove patient_ids as relationships are stored in Neo4j
     doctor_dict.pop('patient_ids', None)
 
-    # MongoDB insertion
-    result = mongo.db.doctors.insert_one(doctor_dict)
-    doctor_id = str(result.inserted_id)
-
-    # Neo4j insertion
-    with neo4j_driver.session() as session:
-        session.write_transaction(
-            create_doctor_node,
-            doctor_id,
-            data["nom"],
-            data["prenom"],
-            data["specialite"],
-            data["email"]
-        )
+    # MongoDB insertion (email uniqueness enforced by the identities index),
+    # with the Neo4j insertion replayed by the outbox worker
+    doctor_id = str(ObjectId())
+    insert_with_identity(
+        mongo.db.doctors, {**doctor_dict, "_id": ObjectId(doctor_id)}, "doctor", doctor_dict["mot_de_passe"],
+        events=[doctor_created_event(doctor_id, data)]
+    )
+    entities_changed("doctor", doctor_id)
 
     return doctor_id
 
-def create_doctor_nohash(data):
+def doctor_created_event(doctor_id, data):
+    return outbox_event(
+        "doctor.create",
+        doctor_id,
+        nom=data["nom"],
+        prenom=data["prenom"],
+        specialite=data["specialite"],
+        email=data["email"]
+    )
+
+
+def create_doctor_nohash(data, request_id=None, approved_by=None, approved_at=None):
     # Validate required fields
     required_fields = ["nom", "prenom", "email", "mot_de_passe", "specialite"]
     for field in required_fields:
@@ -118,14 +106,6 @@ def create_doctor_nohash(data):
     if data["specialite"] not in specialites:
         raise ValueError(f"Spécialité invalide. Options valides: {', '.join(specialites)}")
 
-    # Check email uniqueness across both doctors and patients
-    email = data["email"]
-    existing_doctor = mongo.db.doctors.find_one({"email": email})
-    existing_patient = mongo.db.patients.find_one({"email": email})
-
-    if existing_doctor or existing_patient:
-        raise ValueError("Cet email est déjà utilisé par un autre utilisateur.")
-
     # Hash password and create doctor
 
     doctor = Docteur(**data)
@@ -134,29 +114,36 @@ def create_doctor_nohash(data):
     # Remove patient_ids as relationships are stored in Neo4j
     doctor_dict.pop('patient_ids', None)
 
-    # MongoDB insertion
-    result = mongo.db.doctors.insert_one(doctor_dict)
-    doctor_id = str(result.inserted_id)
-
-    # Neo4j insertion
-    with neo4j_driver.session() as session:
-        session.write_transaction(
-            create_doctor_node,
-            doctor_id,
-            data["nom"],
-            data["prenom"],
-            data["specialite"],
-            data["email"]
-        )
+    # MongoDB insertion (email uniqueness enforced by the identities index);
+    # an approved request (request_id) hands its reserved email over to the doctor.
+    # Neo4j node, then the admin's APPROVED relationship, replayed by the outbox worker
+    doctor_id = str(ObjectId())
+    events = [doctor_created_event(doctor_id, data)]
+    if approved_by:
+        events.append(outbox_event("doctor.approved", doctor_id, admin_id=approved_by, at=approved_at))
+    insert_with_identity(
+        mongo.db.doctors, {**doctor_dict, "_id": ObjectId(doctor_id)}, "doctor", doctor_dict["mot_de_passe"],
+        transfer_from=request_id, events=events
+    )
+    entities_changed("doctor", doctor_id)
 
     return doctor_id
 
 
+# Requêtes partagées avec AsyncService (mode ASGI)
+DOCTOR_PATIENT_IDS = """
+    MATCH (p:Patient)-[:EST_SUIVI_PAR]->(d:Doctor {id: $id})
+    RETURN p.id as patient_id
+"""
+
+
+@read_through(doctor_cache)
 def get_doctor(doctor_id):
     if not ObjectId.is_valid(doctor_id):
         raise ValueError("ID docteur invalide")
 
-    doc = mongo.db.doctors.find_one({"_id": ObjectId(doctor_id)})
+    # Document complet sans les secrets : c'est lui que garde le cache
+    doc = mongo.db.doctors.find_one({"_id": ObjectId(doctor_id)}, mongo_projection("doctor"))
     if not doc:
         raise ValueError("Docteur non trouvé")
 
@@ -164,10 +151,7 @@ def get_doctor(doctor_id):
 
     # Get patient relationships from Neo4j
     with neo4j_driver.session() as session:
-        result = session.run("""
-            MATCH (p:Patient)-[:EST_SUIVI_PAR]->(d:Doctor {id: $id})
-            RETURN p.id as patient_id
-        """, id=doctor_id)
+        result = session.run(DOCTOR_PATIENT_IDS, id=doctor_id)
         doc["patient_ids"] = [record["patient_id"] for record in result]
 
     return doc
@@ -186,27 +170,18 @@ def update_doctor(doctor_id, data):
     if "specialite" in data and data["specialite"] not in specialites:
         raise ValueError(f"Spécialité invalide. Options valides: {', '.join(specialites)}")
 
-    # Check email uniqueness if being updated
-    if "email" in data:
-        existing_with_email = mongo.db.doctors.find_one({
-            "email": data["email"],
-            "_id": {"$ne": ObjectId(doctor_id)}
-        })
-        if existing_with_email:
-            raise ValueError("Cet email est déjà utilisé par un autre docteur.")
-
     # Hash password if being updated
     if "mot_de_passe" in data:
         data["mot_de_passe"] = hash_password(data["mot_de_passe"])
 
-    # MongoDB update
-    mongo.db.doctors.update_one({"_id": ObjectId(doctor_id)}, {"$set": data})
+    # Email uniqueness is enforced by the identities index
+    update_identity(doctor_id, email=data.get("email"), password_hash=data.get("mot_de_passe"))
 
-    # Sync Neo4j for relevant fields
+    # MongoDB update, with the Neo4j sync of the relevant fields
     fields_to_update = {k: v for k, v in data.items() if k in ["nom", "prenom", "specialite", "email"]}
-    if fields_to_update:
-        with neo4j_driver.session() as session:
-            session.write_transaction(update_doctor_node, doctor_id, fields_to_update)
+    events = [outbox_event("doctor.update", doctor_id, fields=fields_to_update)] if fields_to_update else []
+    update_entity(mongo.db.doctors, {"_id": ObjectId(doctor_id)}, {"$set": data}, *events)
+    doctor_cache.invalidate(doctor_id)
 
     return get_doctor(doctor_id)
 
@@ -215,8 +190,8 @@ def delete_doctor(doctor_id):
     if not ObjectId.is_valid(doctor_id):
         raise ValueError("ID docteur invalide")
 
-    # Check if doctor exists
-    doctor = get_doctor(doctor_id)
+    # Check if doctor exists (bypass the cache: the patient check below must be fresh)
+    doctor = get_doctor.__wrapped__(doctor_id)
     if not doctor:
         raise ValueError("Docteur non trouvé")
 
@@ -234,30 +209,47 @@ def delete_doctor(doctor_id):
         if result.single()["has_upcoming"]:
             raise ValueError("Impossible de supprimer un docteur avec des consultations à venir")
 
-    # MongoDB deletion
-    mongo.db.doctors.delete_one({"_id": ObjectId(doctor_id)})
-
-    # Neo4j deletion
-    with neo4j_driver.session() as session:
-        session.write_transaction(delete_doctor_node, doctor_id)
+    # MongoDB deletion, with the Neo4j deletion
+    delete_entity(mongo.db.doctors, {"_id": ObjectId(doctor_id)}, outbox_event("doctor.delete", doctor_id))
+    unregister_identity(doctor_id)
+    revoke_user(doctor_id)
+    doctor_cache.invalidate(doctor_id)
 
     return True
 
 
-def list_doctors():
-    docs = mongo.db.doctors.find()
+def list_doctors(limit=None, after=None, fields=None):
+    docs, next_cursor = find_page(
+        mongo.db.doctors, limit=limit, after=after, projection=mongo_projection("doctor", fields)
+    )
     doctors_list = [{**doc, "_id": str(doc["_id"])} for doc in docs]
 
-    # Optionally add patient counts from Neo4j
+    # Patient counts from Neo4j for the current page only
+    if wants(fields, "patient_count"):
+        add_patient_counts(doctors_list)
+
+    return doctors_list, next_cursor
+
+
+def iter_doctors(after=None, fields=None):
+    # Streaming variant of list_doctors: enrich and yield one batch at a time
+    documents = iter_documents(mongo.db.doctors, after=after, projection=mongo_projection("doctor", fields))
+    for docs in chunked(documents):
+        doctors_list = [{**doc, "_id": str(doc["_id"])} for doc in docs]
+        if wants(fields, "patient_count"):
+            add_patient_counts(doctors_list)
+        yield from doctors_list
+
+
+def add_patient_counts(doctors_list):
+    # One UNWIND query per batch of ids
+    patient_counts = {}
     with neo4j_driver.session() as session:
-        for doctor in doctors_list:
-            result = session.run("""
-                MATCH (p:Patient)-[:EST_SUIVI_PAR]->(d:Doctor {id: $id})
-                RETURN count(p) as patient_count
-            """, id=doctor["_id"])
-            doctor["patient_count"] = result.single()["patient_count"]
+        for ids in chunked([doctor["_id"] for doctor in doctors_list]):
+            patient_counts.update(count_patients_by_doctor(session, ids))
 
-    return doctors_list
+    for doctor in doctors_list:
+        doctor["patient_count"] = patient_counts.get(doctor["_id"], 0)
 
 
 def assign_patient_to_doctor(doctor_id, patient_id):
@@ -265,11 +257,14 @@ def assign_patient_to_doctor(doctor_id, patient_id):
         raise ValueError("ID invalide")
 
     # Check if both doctor and patient exist
-    if not mongo.db.doctors.find_one({"_id": ObjectId(doctor_id)}):
+    if not mongo.db.doctors.find_one({"_id": ObjectId(doctor_id)}, {"_id": 1}):
         raise ValueError("Docteur non trouvé")
-    if not mongo.db.patients.find_one({"_id": ObjectId(patient_id)}):
+    if not mongo.db.patients.find_one({"_id": ObjectId(patient_id)}, {"_id": 1}):
         raise ValueError("Patient non trouvé")
 
+    # Both nodes may still be waiting in the outbox
+    require_sync(entity_key("doctor", doctor_id), entity_key("patient", patient_id))
+
     # Create relationship in Neo4j only
     with neo4j_driver.session() as session:
         # Remove any existing relationship first
@@ -277,72 +272,26 @@ def assign_patient_to_doctor(doctor_id, patient_id):
         # Create new relationship
         session.write_transaction(create_patient_relationship, doctor_id, patient_id)
 
-    return True
-
+    doctor_cache.invalidate(doctor_id)
+    patient_cache.invalidate(patient_id)
 
-def create_consultation(patient_id, doctor_id, date, etat="prévue", description=None):
-    if not ObjectId.is_valid(patient_id) or not ObjectId.is_valid(doctor_id):
-        raise ValueError("ID invalide")
+    return True
 
-    # Check if both exist
-    if not mongo.db.patients.find_one({"_id": ObjectId(patient_id)}):
-        raise ValueError("Patient non trouvé")
-    if not mongo.db.doctors.find_one({"_id": ObjectId(doctor_id)}):
-        raise ValueError("Docteur non trouvé")
 
-    # Parse and validate date
-    try:
-        consultation_date = datetime.strptime(date, "%Y-%m-%d %H:%M")
-        if consultation_date < datetime.now():
-            raise ValueError("La date de consultation ne peut pas être dans le passé")
-    except ValueError:
-        raise ValueError("Format de date invalide. Utilisez le format YYYY-MM-DD HH:MM")
+class ConsultationNotFound(LookupError):
+    """Consultation absente ou rattachée à un autre docteur"""
 
-    # Check for scheduling conflicts in Neo4j
-    with neo4j_driver.session() as session:
-        # Doctor availability check
-        result = session.run("""
-            MATCH (d:Doctor {id: $did})-[:A_CONSULTATION]->(c:Consultation {date: $date})
-            WHERE c.etat <> 'annulée'
-            RETURN count(c) > 0 as has_conflict
-        """, did=doctor_id, date=date)
-        if result.single()["has_conflict"]:
-            raise ValueError("Le docteur a déjà une consultation prévue à cette heure")
-
-        # Patient availability check
-        result = session.run("""
-            MATCH (p:Patient {id: $pid})-[:A_CONSULTATION]->(c:Consultation {date: $date})
-            WHERE c.etat <> 'annulée'
-            RETURN count(c) > 0 as has_conflict
-        """, pid=patient_id, date=date)
-        if result.single()["has_conflict"]:
-            raise ValueError("Le patient a déjà une consultation prévue à cette heure")
-
-    # Create minimal consultation document in MongoDB
-    consultation_data = {
-        "date": date,
-        "etat": etat,
-        "description": description
-    }
-    result = mongo.db.consultations.insert_one(consultation_data)
-    consultation_id = str(result.inserted_id)
 
-    # Create relationships in Neo4j
+def doctor_has_consultation(doctor_id, consultation_id):
     with neo4j_driver.session() as session:
-        session.write_transaction(
-            create_consultation_relationship,
-            consultation_id,
-            patient_id,
-            doctor_id,
-            date,
-            etat,
-            description
-        )
+        record = session.run("""
+            MATCH (d:Doctor {id: $doctor_id})-[:A_CONSULTATION]->(c:Consultation {id: $cid})
+            RETURN count(c) > 0 AS owned
+        """, doctor_id=doctor_id, cid=consultation_id).single()
+    return bool(record and record["owned"])
 
-    return consultation_id
 
-
-def update_consultation_status(consultation_id, new_status):
+def update_consultation_status(consultation_id, new_status, doctor_id=None):
     if not ObjectId.is_valid(consultation_id):
         raise ValueError("ID consultation invalide")
 
@@ -350,30 +299,36 @@ def update_consultation_status(consultation_id, new_status):
     if new_status not in valid_statuses:
         raise ValueError(f"Statut de consultation invalide. Options valides: {', '.join(valid_statuses)}")
 
+    # Docteur de l'URL : seulement ses consultations (celles d'un autre répondent comme inexistantes)
+    if doctor_id is not None and not doctor_has_consultation(doctor_id, consultation_id):
+        raise ConsultationNotFound("Consultation non trouvée")
+
     # Check if consultation exists
-    consultation = mongo.db.consultations.find_one({"_id": ObjectId(consultation_id)})
-    if not consultation:
-        raise ValueError("Consultation introuvable")
+    consultation = get_consultation(consultation_id)
 
     # Prevent modifying completed consultations
     if consultation.get("etat") == "terminée" and new_status != "terminée":
         raise ValueError("Impossible de modifier une consultation terminée")
 
-    # MongoDB update
-    mongo.db.consultations.update_one(
+    # MongoDB update, with the Neo4j update ; docteur et patient joints pour que le worker
+    # change aussi la version de leurs listes
+    update_entity(
+        mongo.db.consultations,
         {"_id": ObjectId(consultation_id)},
-        {"$set": {"etat": new_status}}
-    )
-
-    # Neo4j update
-    with neo4j_driver.session() as session:
-        session.write_transaction(
-            update_consultation_status_in_neo4j,
+        {"$set": {"etat": new_status}},
+        outbox_event(
+            "consultation.status",
             consultation_id,
-            new_status
+            etat=new_status,
+            doctor_id=consultation.get("doctor_id"),
+            patient_id=consultation.get("patient_id")
         )
+    )
+    updated = {**consultation, "etat": new_status}
+    schedule_index.update_status(consultation_id, new_status)
+    consultations_changed(updated.get("doctor_id"), updated.get("patient_id"))
 
-    return get_consultation(consultation_id)
+    return updated
 
 
 def get_consultation(consultation_id):
@@ -413,75 +368,253 @@ def get_consultation(consultation_id):
     return result
 
 
-def get_consultations_by_doctor(doctor_id):
+def parse_date_param(value, field):
+    for fmt in ("%Y-%m-%d %H:%M", "%Y-%m-%d"):
+        try:
+            return datetime.strptime(value, fmt)
+        except (TypeError, ValueError):
+            continue
+    raise ValueError(f"Format de date invalide pour {field}. Utilisez YYYY-MM-DD ou YYYY-MM-DD HH:MM")
+
+
+def parse_date_range(date_from, date_to):
+    # "to" given as a plain day is inclusive
+    start = parse_date_param(date_from, "from") if date_from else None
+    end = parse_date_param(date_to, "to") if date_to else None
+    if end is not None and len(date_to) == len("YYYY-MM-DD"):
+        end += timedelta(days=1)
+    return start, end
+
+
+def parse_consultation_filters(args):
+    # Query params etat / from / to / limit of the consultation listings
+    date_from, date_to = parse_date_range(args.get("from"), args.get("to"))
+    limit = args.get("limit")
+    if limit is not None:
+        if not limit.isdigit() or int(limit) < 1:
+            raise ValueError("Paramètre limit invalide")
+        limit = int(limit)
+    return {"etat": args.get("etat"), "date_from": date_from, "date_to": date_to, "limit": limit}
+
+
+CONSULTATION_STATES = ["demandée", "prévue", "acceptée", "rejetée", "annulée", "terminée"]
+
+
+def consultation_filters(etat=None, date_from=None, date_to=None):
+    # Same filters for the Cypher query (WHERE clauses + params) and the Mongo hydration
+    if etat is not None and etat not in CONSULTATION_STATES:
+        raise ValueError(f"Statut de consultation invalide. Options valides: {', '.join(CONSULTATION_STATES)}")
+
+    clauses, params, mongo_filter = [], {}, {}
+    if etat is not None:
+        clauses.append("c.etat = $etat")
+        params["etat"] = etat
+        mongo_filter["etat"] = etat
+    if date_from is not None:
+        clauses.append("c.start_time >= datetime($date_from)")
+        params["date_from"] = date_from.isoformat()
+        mongo_filter.setdefault("date", {})["$gte"] = date_from
+    if date_to is not None:
+        clauses.append("c.start_time < datetime($date_to)")
+        params["date_to"] = date_to.isoformat()
+        mongo_filter.setdefault("date", {})["$lt"] = date_to
+
+    where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+    return where, params, mongo_filter
+
+
+# Listings Neo4j ({where} et {limit_clause} viennent de consultation_filters), partagés avec AsyncService
+DOCTOR_CONSULTATIONS = """
+    MATCH (d:Doctor {{id: $did}})-[:A_CONSULTATION]->(c:Consultation)
+    {where}
+    MATCH (p:Patient)-[:A_CONSULTATION]->(c)
+    RETURN c.id as consultation_id, p.id as patient_id,
+           c.date as date, c.etat as etat, c.description as description
+    ORDER BY coalesce(c.start_time, c.date)
+    {limit_clause}
+"""
+PATIENT_CONSULTATIONS = """
+    MATCH (p:Patient {{id: $pid}})-[:A_CONSULTATION]->(c:Consultation)
+    {where}
+    MATCH (d:Doctor)-[:A_CONSULTATION]->(c)
+    RETURN c.id as consultation_id, d.id as doctor_id,
+           c.date as date, c.etat as etat, c.description as description
+    ORDER BY coalesce(c.start_time, c.date)
+    {limit_clause}
+"""
+
+
+def merge_consultations(records, mongo_consults, owner, fields=None):
+    # Neo4j rows (listing order) + Mongo documents keyed by id; owner is the id the listing
+    # was run for ({"doctor_id": ...} or {"patient_id": ...}); rows without a document are dropped
+    consultations = []
+    for record in records:
+        mongo_consult = mongo_consults.get(record["consultation_id"])
+        if mongo_consult:
+            consultation = {
+                "_id": record["consultation_id"],
+                "patient_id": owner.get("patient_id") or record["patient_id"],
+                "doctor_id": owner.get("doctor_id") or record["doctor_id"],
+                "date": record["date"],
+                "etat": record["etat"],
+                "description": record["description"],
+                # Add any additional fields from MongoDB
+                **{k: v for k, v in mongo_consult.items()
+                   if k not in ["_id", "date", "etat", "description"]}
+            }
+            consultations.append(select_fields(consultation, fields) if fields else consultation)
+
+    return consultations
+
+
+def get_consultation_documents(consultation_ids, mongo_filter=None, projection=None):
+    # Load consultation documents with one $in query per batch, keyed by string id
+    documents = {}
+    object_ids = [ObjectId(cid) for cid in consultation_ids if ObjectId.is_valid(cid)]
+    for ids in chunked(object_ids):
+        for doc in mongo.db.consultations.find({**(mongo_filter or {}), "_id": {"$in": ids}}, projection):
+            documents[str(doc["_id"])] = doc
+
+    return documents
+
+
+def get_consultations_by_doctor(doctor_id, etat=None, date_from=None, date_to=None, limit=None, fields=None):
     if not ObjectId.is_valid(doctor_id):
         raise ValueError("ID docteur invalide")
 
-    # Get consultations from Neo4j
+    where, params, mongo_filter = consultation_filters(etat, date_from, date_to)
+    limit_clause = "LIMIT $limit" if limit else ""
+
+    # Get consultations from Neo4j, filtered in the query
     with neo4j_driver.session() as session:
-        result = session.run("""
-            MATCH (d:Doctor {id: $did})-[:A_CONSULTATION]->(c:Consultation)
-            MATCH (p:Patient)-[:A_CONSULTATION]->(c)
-            RETURN c.id as consultation_id, p.id as patient_id, 
-                   c.date as date, c.etat as etat, c.description as description
-            ORDER BY c.date
-        """, did=doctor_id)
-
-        consultations = []
-        for record in result:
-            # Get additional details from MongoDB if needed
-            mongo_consult = mongo.db.consultations.find_one(
-                {"_id": ObjectId(record["consultation_id"])}
-            )
-            if mongo_consult:
-                consultation = {
-                    "_id": record["consultation_id"],
-                    "patient_id": record["patient_id"],
-                    "doctor_id": doctor_id,
-                    "date": record["date"],
-                    "etat": record["etat"],
-                    "description": record["description"],
-                    # Add any additional fields from MongoDB
-                    **{k: v for k, v in mongo_consult.items()
-                       if k not in ["_id", "date", "etat", "description"]}
-                }
-                consultations.append(consultation)
+        result = session.run(DOCTOR_CONSULTATIONS.format(where=where, limit_clause=limit_clause),
+                             did=doctor_id, limit=limit, **params)
+        records = list(result)
 
-    return consultations
+    # Get additional details from MongoDB in bulk
+    mongo_consults = get_consultation_documents(
+        [record["consultation_id"] for record in records], mongo_filter, mongo_projection("consultation", fields)
+    )
 
+    return merge_consultations(records, mongo_consults, {"doctor_id": doctor_id}, fields)
 
-def get_consultations_by_patient(patient_id):
+
+def get_consultations_by_patient(patient_id, etat=None, date_from=None, date_to=None, limit=None, fields=None):
     if not ObjectId.is_valid(patient_id):
         raise ValueError("ID patient invalide")
 
-    # Get consultations from Neo4j
+    where, params, mongo_filter = consultation_filters(etat, date_from, date_to)
+    limit_clause = "LIMIT $limit" if limit else ""
+
+    # Get consultations from Neo4j, filtered in the query
     with neo4j_driver.session() as session:
-        result = session.run("""
-            MATCH (p:Patient {id: $pid})-[:A_CONSULTATION]->(c:Consultation)
-            MATCH (d:Doctor)-[:A_CONSULTATION]->(c)
-            RETURN c.id as consultation_id, d.id as doctor_id, 
-                   c.date as date, c.etat as etat, c.description as description
-            ORDER BY c.date
-        """, pid=patient_id)
-
-        consultations = []
-        for record in result:
-            # Get additional details from MongoDB if needed
-            mongo_consult = mongo.db.consultations.find_one(
-                {"_id": ObjectId(record["consultation_id"])}
-            )
-            if mongo_consult:
-                consultation = {
-                    "_id": record["consultation_id"],
-                    "patient_id": patient_id,
-                    "doctor_id": record["doctor_id"],
-                    "date": record["date"],
-                    "etat": record["etat"],
-                    "description": record["description"],
-                    # Add any additional fields from MongoDB
-                    **{k: v for k, v in mongo_consult.items()
-                       if k not in ["_id", "date", "etat", "description"]}
-                }
-                consultations.append(consultation)
+        result = session.run(PATIENT_CONSULTATIONS.format(where=where, limit_clause=limit_clause),
+                             pid=patient_id, limit=limit, **params)
+        records = list(result)
 
-    return consultations
+    # Get additional details from MongoDB in bulk
+    mongo_consults = get_consultation_documents(
+        [record["consultation_id"] for record in records], mongo_filter, mongo_projection("consultation", fields)
+    )
+
+    return merge_consultations(records, mongo_consults, {"patient_id": patient_id}, fields)
+
+
+# ---------------------- Availability ----------------------
+
+AVAILABILITY_MAX_DAYS = 31
+EPOCH = datetime(1970, 1, 1)
+
+
+def epoch_seconds(value):
+    # Naive datetimes are stored by datetime($iso) as UTC, so this matches Cypher's epochSeconds
+    return (value - EPOCH) // timedelta(seconds=1)
+
+
+def get_booked_intervals(tx, doctor_ids, start, end):
+    # Busy intervals of many doctors in one query, driven by the start_time range index;
+    # one record per doctor, as epoch seconds (no DateTime to hydrate per consultation)
+    result = tx.run("""
+        MATCH (c:Consultation)
+        WHERE c.start_time >= datetime($window_start) AND c.start_time < datetime($end)
+          AND NOT c.etat IN $freeing
+        MATCH (d:Doctor)-[:A_CONSULTATION]->(c)
+        WHERE d.id IN $ids
+        RETURN d.id AS doctor_id, collect([c.start_time.epochSeconds, c.end_time.epochSeconds]) AS intervals
+    """, ids=doctor_ids, window_start=(start - timedelta(days=1)).isoformat(), end=end.isoformat(),
+           freeing=list(FREEING_STATES))
+
+    return {record["doctor_id"]: record["intervals"] for record in result}
+
+
+def slot_grid(start, end, duration, blocking):
+    # Candidate slot starts every `duration` inside working hours, shared by every doctor;
+    # the `blocking` time a booking holds must end by closing time
+    opening, closing = horaires_consultation
+    starts = []
+    day = start.replace(hour=0, minute=0, second=0, microsecond=0)
+    while day < end:
+        if day.weekday() in jours_ouvres:
+            slot_start = max(day.replace(hour=opening), start)
+            window_end = min(day.replace(hour=closing), end)
+            while slot_start + blocking <= window_end:
+                starts.append(slot_start)
+                slot_start += duration
+        day += timedelta(days=1)
+    return starts
+
+
+def free_slots(starts, labels, busy, duration):
+    # Mark the grid slots hit by each busy interval (two bisects each), keep the rest
+    blocked = bytearray(len(starts))
+    for busy_start, busy_end in busy:
+        first = bisect_right(starts, busy_start - duration)
+        last = bisect_left(starts, busy_end)
+        if first < last:
+            blocked[first:last] = b"\x01" * (last - first)
+    return [label for label, is_blocked in zip(labels, blocked) if not is_blocked]
+
+
+def get_availability(specialite, date_from, date_to, duration=60):
+    if specialite not in specialites:
+        raise ValueError(f"Spécialité invalide. Options valides: {', '.join(specialites)}")
+
+    start, end = parse_date_range(date_from, date_to)
+    # Never offer past slots; round "now" up to the next quarter hour
+    now = datetime.now().replace(second=0, microsecond=0)
+    now += timedelta(minutes=-now.minute % 15)
+    start = max(start, now)
+    if end <= start:
+        raise ValueError("La période demandée est vide ou passée")
+    if end - start > timedelta(days=AVAILABILITY_MAX_DAYS):
+        raise ValueError(f"La période ne peut pas dépasser {AVAILABILITY_MAX_DAYS} jours")
+
+    try:
+        duration = timedelta(minutes=int(duration))
+    except (TypeError, ValueError):
+        raise ValueError("Durée invalide")
+    if duration <= timedelta(0):
+        raise ValueError("Durée invalide")
+
+    doctors = list(mongo.db.doctors.find({"specialite": specialite}, {"nom": 1, "prenom": 1}))
+    doctor_ids = [str(doctor["_id"]) for doctor in doctors]
+
+    booked = {}
+    with neo4j_driver.session() as session:
+        for ids in chunked(doctor_ids):
+            booked.update(get_booked_intervals(session, ids, start, end))
+
+    # A booking holds CONSULTATION_DURATION, so a shorter slot needs that much free time
+    blocking = max(duration, CONSULTATION_DURATION)
+    starts = slot_grid(start, end, duration, blocking)
+    labels = [slot.strftime("%Y-%m-%d %H:%M") for slot in starts]
+    starts = [epoch_seconds(slot) for slot in starts]
+    return [
+        {
+            "doctor_id": str(doctor["_id"]),
+            "nom": doctor.get("nom"),
+            "prenom": doctor.get("prenom"),
+            "slots": free_slots(starts, labels, booked.get(str(doctor["_id"]), []), blocking // timedelta(seconds=1))
+        }
+        for doctor in doctors
+    ]
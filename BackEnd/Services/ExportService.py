@@ -0,0 +1,205 @@
+# services/ExportService.py
+# Export en flux des consultations (graphe Neo4j + documents Mongo) et des panels docteur/patients
+# vers JSONL, CSV ou Parquet. Lecture et écriture par lots bornés : mémoire constante.
+
+import csv
+import io
+import json
+from datetime import datetime
+
+from BackEnd.Services import db as db_services
+from BackEnd.Services.DocteurService import consultation_filters, get_consultation_documents
+
+EXPORT_FORMATS = {
+    "jsonl": "application/x-ndjson",
+    "csv": "text/csv",
+    "parquet": "application/vnd.apache.parquet",
+}
+
+# Colonnes exportées et leur type (pour Parquet)
+EXPORT_COLUMNS = {
+    "consultations": [
+        ("consultation_id", "string"),
+        ("patient_id", "string"),
+        ("doctor_id", "string"),
+        ("start_time", "timestamp"),
+        ("end_time", "timestamp"),
+        ("etat", "string"),
+        ("description", "string"),
+        ("created_at", "timestamp"),
+    ],
+    "panels": [
+        ("doctor_id", "string"),
+        ("doctor_nom", "string"),
+        ("doctor_prenom", "string"),
+        ("specialite", "string"),
+        ("patient_id", "string"),
+        ("patient_nom", "string"),
+        ("patient_prenom", "string"),
+    ],
+}
+
+EXPORT_BATCH_SIZE = 5000
+
+
+def _native(value):
+    # neo4j.time.DateTime -> datetime
+    return value.to_native() if hasattr(value, "to_native") else value
+
+
+def _consultation_batches(etat=None, date_from=None, date_to=None, batch_size=EXPORT_BATCH_SIZE):
+    where, params, mongo_filter = consultation_filters(etat, date_from, date_to)
+
+    # Le résultat Neo4j est consommé au fil de l'eau (fetch_size) ; chaque lot est complété
+    # par une requête $in sur Mongo, comme les listings
+    with db_services.neo4j_driver.session(fetch_size=batch_size) as session:
+        result = session.run(f"""
+            MATCH (c:Consultation)
+            {where}
+            MATCH (p:Patient)-[:A_CONSULTATION]->(c)
+            MATCH (d:Doctor)-[:A_CONSULTATION]->(c)
+            RETURN c.id as consultation_id, p.id as patient_id, d.id as doctor_id,
+                   c.start_time as start_time, c.end_time as end_time,
+                   c.etat as etat, c.description as description
+        """, **params)
+
+        for records in db_services.chunked(result, batch_size):
+            # Seul created_at vient de Mongo
+            documents = get_consultation_documents(
+                [record["consultation_id"] for record in records], mongo_filter, {"created_at": 1}
+            )
+            rows = []
+            for record in records:
+                document = documents.get(record["consultation_id"])
+                if document is None:
+                    continue
+                rows.append({
+                    **record.data(),
+                    "start_time": _native(record["start_time"]),
+                    "end_time": _native(record["end_time"]),
+                    "created_at": document.get("created_at"),
+                })
+            if rows:
+                yield rows
+
+
+def _panel_batches(batch_size=EXPORT_BATCH_SIZE):
+    with db_services.neo4j_driver.session(fetch_size=batch_size) as session:
+        result = session.run("""
+            MATCH (p:Patient)-[:EST_SUIVI_PAR]->(d:Doctor)
+            RETURN d.id as doctor_id, d.nom as doctor_nom, d.prenom as doctor_prenom,
+                   d.specialite as specialite,
+                   p.id as patient_id, p.nom as patient_nom, p.prenom as patient_prenom
+        """)
+        for records in db_services.chunked(result, batch_size):
+            yield [record.data() for record in records]
+
+
+# ---------------------- Encodage ----------------------
+
+def _json_default(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return str(value)
+
+
+def _encode_jsonl(batches, columns):
+    for rows in batches:
+        yield "".join(
+            json.dumps(row, ensure_ascii=False, default=_json_default) + "\n" for row in rows
+        ).encode("utf-8")
+
+
+def _encode_csv(batches, columns):
+    names = [name for name, _ in columns]
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=names, extrasaction="ignore")
+    writer.writeheader()
+    for rows in batches:
+        for row in rows:
+            writer.writerow({key: value.isoformat() if isinstance(value, datetime) else value
+                             for key, value in row.items()})
+        yield buffer.getvalue().encode("utf-8")
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode("utf-8")
+
+
+class _ByteSink:
+    # Fichier en écriture seule pour pyarrow : les octets sont récupérés après chaque row group
+    closed = False
+
+    def __init__(self):
+        self.parts = []
+
+    def write(self, data):
+        self.parts.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        data = b"".join(self.parts)
+        self.parts.clear()
+        return data
+
+
+def _encode_parquet(batches, columns):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    types = {"string": pa.string(), "timestamp": pa.timestamp("us")}
+    schema = pa.schema([(name, types[kind]) for name, kind in columns])
+    sink = _ByteSink()
+    writer = pq.ParquetWriter(pa.PythonFile(sink, mode="w"), schema)
+    try:
+        # Un row group par lot
+        for rows in batches:
+            writer.write_table(pa.Table.from_pylist(rows, schema=schema))
+            yield sink.drain()
+    finally:
+        writer.close()
+    yield sink.drain()
+
+
+ENCODERS = {"jsonl": _encode_jsonl, "csv": _encode_csv, "parquet": _encode_parquet}
+
+
+def check_export_format(fmt):
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"Format d'export invalide. Options valides: {', '.join(EXPORT_FORMATS)}")
+    if fmt == "parquet":
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError:
+            raise ValueError("L'export Parquet nécessite le paquet 'pyarrow'")
+
+
+def _counted(batches, stats):
+    for rows in batches:
+        stats["rows"] += len(rows)
+        yield rows
+
+
+def export_stream(kind, fmt, etat=None, date_from=None, date_to=None, batch_size=EXPORT_BATCH_SIZE, stats=None):
+    """Générateur d'octets du fichier exporté ; validé avant de produire le premier octet.
+    `stats` (dict optionnel) reçoit le nombre de lignes exportées dans stats["rows"]."""
+    if kind not in EXPORT_COLUMNS:
+        raise ValueError(f"Export invalide. Options valides: {', '.join(EXPORT_COLUMNS)}")
+    check_export_format(fmt)
+
+    if kind == "consultations":
+        # Filtres validés ici (le générateur ne démarre qu'à la première lecture)
+        consultation_filters(etat, date_from, date_to)
+        batches = _consultation_batches(etat, date_from, date_to, batch_size)
+    else:
+        if etat or date_from or date_to:
+            raise ValueError("Les filtres etat/from/to ne s'appliquent qu'à l'export des consultations")
+        batches = _panel_batches(batch_size)
+
+    if stats is not None:
+        stats["rows"] = 0
+        batches = _counted(batches, stats)
+    return ENCODERS[fmt](batches, EXPORT_COLUMNS[kind])
@@ -0,0 +1,138 @@
+# services/IdentityService.py
+# Index unifié des identités : email -> (role, user_id, hash du mot de passe)
+# L'unicité des emails est garantie par l'index unique de la collection `identities`.
+
+from bson import ObjectId
+from pymongo import ASCENDING, ReturnDocument
+from pymongo.errors import DuplicateKeyError
+
+from BackEnd.Services import db as db_services
+from BackEnd.Services.OutboxService import insert_entity
+
+# Rôles pouvant se connecter, et collection Mongo associée
+USER_COLLECTIONS = {
+    "patient": "patients",
+    "doctor": "doctors",
+    "admin": "admins",
+}
+# Une demande d'inscription docteur réserve aussi son email
+PENDING_DOCTOR_ROLE = "pending_doctor"
+ROLE_COLLECTIONS = {**USER_COLLECTIONS, PENDING_DOCTOR_ROLE: "pending_doctors"}
+
+
+def identities():
+    return db_services.mongo.db.identities
+
+
+def ensure_identity_indexes():
+    identities().create_index([("email", ASCENDING)], unique=True, name="email_unique")
+    identities().create_index([("user_id", ASCENDING)], name="user_id")
+
+
+def register_identity(email, role, user_id, password_hash):
+    try:
+        identities().insert_one({
+            "email": email,
+            "role": role,
+            "user_id": ObjectId(user_id),
+            "mot_de_passe": password_hash,
+        })
+    except DuplicateKeyError:
+        raise ValueError("Cet email est déjà utilisé par un autre utilisateur.")
+
+
+def unregister_identity(user_id):
+    identities().delete_one({"user_id": ObjectId(user_id)})
+
+
+def update_identity(user_id, email=None, password_hash=None):
+    fields = {}
+    if email is not None:
+        fields["email"] = email
+    if password_hash is not None:
+        fields["mot_de_passe"] = password_hash
+    if not fields:
+        return
+
+    try:
+        identities().update_one({"user_id": ObjectId(user_id)}, {"$set": fields})
+    except DuplicateKeyError:
+        raise ValueError("Cet email est déjà utilisé par un autre utilisateur.")
+
+
+def transfer_identity(from_user_id, to_user_id, role):
+    # Re-key sur place : l'email reste réservé pendant tout le transfert ; identité précédente ou None
+    return identities().find_one_and_update(
+        {"user_id": ObjectId(from_user_id)},
+        {"$set": {"role": role, "user_id": ObjectId(to_user_id)}},
+        return_document=ReturnDocument.BEFORE
+    )
+
+
+def find_identity_by_email(email):
+    return identities().find_one({"email": email})
+
+
+def find_identity_by_user_id(user_id):
+    return identities().find_one({"user_id": ObjectId(user_id)})
+
+
+def insert_with_identity(collection, document, role, password_hash, transfer_from=None, events=()):
+    # Réserve l'email (index unique) avant d'insérer le document utilisateur ;
+    # transfer_from reprend l'identité d'un autre compte (ex. demande docteur approuvée).
+    # events : écritures Neo4j de l'outbox, insérées avec le document (son _id est alors fourni)
+    user_id = document.get("_id") or ObjectId()
+    previous = transfer_identity(transfer_from, user_id, role) if transfer_from else None
+    if previous is None:
+        register_identity(document["email"], role, user_id, password_hash)
+    try:
+        insert_entity(collection, {**document, "_id": user_id}, *events)
+    except Exception:
+        if previous is None:
+            unregister_identity(user_id)
+        else:
+            transfer_identity(user_id, transfer_from, previous["role"])
+        raise
+    return str(user_id)
+
+
+def build_identities():
+    # Migration : construit `identities` depuis les collections existantes
+    ensure_identity_indexes()
+    report = {"created": 0, "existing": 0, "conflicts": []}
+
+    for role, collection_name in ROLE_COLLECTIONS.items():
+        collection = db_services.mongo.db[collection_name]
+        for user in collection.find({}, {"email": 1, "mot_de_passe": 1}):
+            if not user.get("email"):
+                continue
+
+            existing = find_identity_by_email(user["email"])
+            if existing:
+                if existing["user_id"] == user["_id"]:
+                    report["existing"] += 1
+                else:
+                    report["conflicts"].append({
+                        "email": user["email"],
+                        "role": role,
+                        "user_id": str(user["_id"]),
+                        "owner_role": existing["role"],
+                    })
+                continue
+
+            try:
+                register_identity(user["email"], role, user["_id"], user.get("mot_de_passe"))
+            except ValueError:
+                # Créée entre-temps (autre processus au démarrage)
+                report["existing"] += 1
+                continue
+            report["created"] += 1
+
+    return report
+
+
+def ensure_identities():
+    # Login et unicité des emails reposent sur `identities` : construite au démarrage si vide
+    if identities().find_one({}, {"_id": 1}) is not None:
+        return None
+    return build_identities()
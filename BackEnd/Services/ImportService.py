@@ -0,0 +1,381 @@
+# services/ImportService.py
+# Import en masse de patients, docteurs et consultations depuis un fichier CSV ou JSONL.
+# Lecture en flux par lots : validation (modèles + specialites), hachage parallèle,
+# insert_many dans Mongo, nœuds et relations Neo4j par UNWIND. Reprise sur checkpoint.
+
+import csv
+import inspect
+import json
+import os
+import re
+from datetime import datetime
+
+from bson import ObjectId
+from pymongo.errors import BulkWriteError
+
+from BackEnd.Constantes import specialites
+from BackEnd.Modules.Docteur import Docteur
+from BackEnd.Modules.Patient import Patient
+from BackEnd.Services import db as db_services
+from BackEnd.Services.AuthService import hash_passwords
+from BackEnd.Services.DocteurService import CONSULTATION_STATES
+from BackEnd.Services.IdentityService import identities
+from BackEnd.Services.OutboxService import SYNC_OPERATIONS
+from BackEnd.Services.PatientServices import CONSULTATION_DURATION
+from BackEnd.Services.cache import doctor_cache
+from BackEnd.Services.versions import bump, consultations_changed
+
+IMPORT_BATCH_SIZE = 5000
+
+# Hash werkzeug déjà calculé (export d'un autre système) : conservé tel quel
+PASSWORD_HASH_PATTERN = re.compile(r"^(scrypt|pbkdf2):[^$]+\$[^$]+\$[0-9a-f]+$")
+
+DUPLICATE_KEY = 11000
+
+ASSIGN_DOCTORS = """
+    UNWIND $rows AS row
+    MATCH (p:Patient {id: row.patient_id}), (d:Doctor {id: row.doctor_id})
+    MERGE (p)-[:EST_SUIVI_PAR]->(d)
+"""
+
+# Même forme que les consultations créées par PatientServices.book_consultation_tx
+CREATE_CONSULTATIONS = """
+    UNWIND $rows AS row
+    MATCH (p:Patient {id: row.patient_id}), (d:Doctor {id: row.doctor_id})
+    MERGE (c:Consultation {id: row.id})
+    SET c.start_time = datetime(row.start_time),
+        c.end_time = datetime(row.end_time),
+        c.etat = row.etat,
+        c.description = row.description,
+        c.mongo_id = row.id
+    MERGE (p)-[:A_CONSULTATION]->(c)
+    MERGE (d)-[:A_CONSULTATION]->(c)
+"""
+
+
+class ImportEntity:
+    """Description d'un type importable : collection, rôle, modèle et champs obligatoires"""
+
+    def __init__(self, collection, role, model, required_fields, node_operation):
+        self.collection = collection
+        self.role = role
+        self.model = model
+        self.required_fields = required_fields
+        self.node_operation = node_operation
+        self.model_fields = list(inspect.signature(model.__init__).parameters)[1:]
+
+
+USER_ENTITIES = {
+    "patients": ImportEntity(
+        "patients", "patient", Patient,
+        ["nom", "prenom", "email", "mot_de_passe", "date_naissance"],
+        "patient.create"
+    ),
+    "doctors": ImportEntity(
+        "doctors", "doctor", Docteur,
+        ["nom", "prenom", "email", "mot_de_passe", "specialite"],
+        "doctor.create"
+    ),
+}
+IMPORT_ENTITIES = (*USER_ENTITIES, "consultations")
+
+
+# ---------------------- Lecture ----------------------
+
+def read_records(path, fmt=None):
+    """Itère (numéro d'enregistrement, dict) sans charger le fichier en mémoire"""
+    fmt = fmt or ("csv" if path.lower().endswith(".csv") else "jsonl")
+    with open(path, newline="", encoding="utf-8-sig") as f:
+        if fmt == "csv":
+            for number, row in enumerate(csv.DictReader(f), start=1):
+                # Cellules vides = champ absent
+                yield number, {key: value for key, value in row.items() if key and value != ""}
+        else:
+            number = 0
+            for line in f:
+                if not line.strip():
+                    continue
+                number += 1
+                try:
+                    yield number, json.loads(line)
+                except json.JSONDecodeError as e:
+                    yield number, e
+
+
+def _load_checkpoint(path):
+    if path and os.path.exists(path):
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    return None
+
+
+def _save_checkpoint(path, state):
+    if not path:
+        return
+    # Écriture atomique : un arrêt brutal ne laisse jamais un checkpoint tronqué
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(state, f)
+    os.replace(tmp_path, path)
+
+
+# ---------------------- Validation ----------------------
+
+def _validate_user(entity, record):
+    for field in entity.required_fields:
+        if not record.get(field):
+            raise ValueError(f"Le champ {field} est obligatoire.")
+    if not isinstance(record["mot_de_passe"], str):
+        raise ValueError("Le mot de passe doit être une chaîne de caractères.")
+    if entity.role == "doctor":
+        if record["specialite"] not in specialites:
+            raise ValueError(f"Spécialité invalide: {record['specialite']}")
+        record.setdefault("created_at", datetime.utcnow())
+
+    # Colonnes inconnues ignorées ; les autres champs du modèle restent optionnels à l'import
+    values = {field: record.get(field) for field in entity.model_fields}
+    document = entity.model(**values).to_dict()
+
+    # Relations stockées dans Neo4j uniquement
+    document.pop("patient_ids", None)
+    document.pop("doctor_id", None)
+    return document
+
+
+def _validate_consultation(record):
+    if not record.get("date"):
+        raise ValueError("Le champ date est obligatoire.")
+    if not (record.get("patient_id") or record.get("patient_email")):
+        raise ValueError("Le champ patient_id ou patient_email est obligatoire.")
+    if not (record.get("doctor_id") or record.get("doctor_email")):
+        raise ValueError("Le champ doctor_id ou doctor_email est obligatoire.")
+
+    etat = record.get("etat", "prévue")
+    if etat not in CONSULTATION_STATES:
+        raise ValueError(f"Statut de consultation invalide: {etat}")
+    try:
+        start = datetime.strptime(record["date"], "%Y-%m-%d %H:%M")
+    except (TypeError, ValueError):
+        raise ValueError("Format de date invalide. Utilisez le format YYYY-MM-DD HH:MM")
+
+    return {"start": start, "etat": etat, "description": record.get("description")}
+
+
+def _resolve_users(role, records, id_field, email_field):
+    # Ids et emails -> user_id (str) en une requête identities par lot
+    emails = {record[email_field] for record in records if not record.get(id_field) and record.get(email_field)}
+    object_ids = [ObjectId(record[id_field]) for record in records
+                  if record.get(id_field) and ObjectId.is_valid(record[id_field])]
+
+    by_email, known_ids = {}, set()
+    if not emails and not object_ids:
+        return [None] * len(records)
+    query = {"role": role, "$or": [{"email": {"$in": list(emails)}}, {"user_id": {"$in": object_ids}}]}
+    for identity in identities().find(query, {"email": 1, "user_id": 1}):
+        by_email[identity["email"]] = str(identity["user_id"])
+        known_ids.add(str(identity["user_id"]))
+
+    resolved = []
+    for record in records:
+        user_id = record.get(id_field)
+        if user_id:
+            resolved.append(user_id if user_id in known_ids else None)
+        else:
+            resolved.append(by_email.get(record.get(email_field)))
+    return resolved
+
+
+# ---------------------- Écriture ----------------------
+
+def _write_nodes_tx(tx, runs):
+    for query, rows in runs:
+        if rows:
+            tx.run(query, rows=rows).consume()
+
+
+def _write_nodes(runs):
+    with db_services.neo4j_driver.session() as session:
+        session.execute_write(_write_nodes_tx, runs)
+
+
+def _duplicate_indexes(error):
+    # Index des documents refusés par un index unique ; les autres erreurs remontent
+    indexes = set()
+    for write_error in error.details.get("writeErrors", []):
+        if write_error["code"] != DUPLICATE_KEY:
+            raise error
+        indexes.add(write_error["index"])
+    return indexes
+
+
+def _import_users(entity, rows, ids, hash_method):
+    """rows: [(numéro, record, document)] validés ; retourne (importés, erreurs)"""
+    errors = []
+
+    # Hashes déjà calculés conservés, les autres répartis sur le pool de processus
+    to_hash = [i for i, (_, _, document) in enumerate(rows)
+               if not PASSWORD_HASH_PATTERN.match(document["mot_de_passe"])]
+    for i, password_hash in zip(to_hash, hash_passwords([rows[i][2]["mot_de_passe"] for i in to_hash], hash_method)):
+        rows[i][2]["mot_de_passe"] = password_hash
+
+    # Réservation des emails (index unique) ; en reprise, un email déjà réservé avec le même id est ignoré
+    identity_docs = [
+        {"email": document["email"], "role": entity.role, "user_id": ids[number], "mot_de_passe": document["mot_de_passe"]}
+        for number, _, document in rows
+    ]
+    rejected = set()
+    try:
+        identities().insert_many(identity_docs, ordered=False)
+    except BulkWriteError as e:
+        duplicates = _duplicate_indexes(e)
+        owners = {
+            identity["email"]: identity["user_id"]
+            for identity in identities().find(
+                {"email": {"$in": [identity_docs[i]["email"] for i in duplicates]}}, {"email": 1, "user_id": 1}
+            )
+        }
+        for i in duplicates:
+            if owners.get(identity_docs[i]["email"]) != identity_docs[i]["user_id"]:
+                rejected.add(i)
+                errors.append((rows[i][0], "Cet email est déjà utilisé par un autre utilisateur.", rows[i][1]))
+
+    accepted = [row for i, row in enumerate(rows) if i not in rejected]
+    documents = [{**document, "_id": ids[number]} for number, _, document in accepted]
+    if documents:
+        try:
+            db_services.mongo.db[entity.collection].insert_many(documents, ordered=False)
+        except BulkWriteError as e:
+            # Documents déjà présents : lot interrompu puis repris
+            _duplicate_indexes(e)
+
+    # Nœuds puis relations EST_SUIVI_PAR (colonne doctor_id ou doctor_email)
+    node_rows = [{"id": str(ids[number]), **{key: document.get(key) for key in ("nom", "prenom", "email", "specialite")}}
+                 for number, _, document in accepted]
+    runs = [(SYNC_OPERATIONS[entity.node_operation], node_rows)]
+    if entity.role == "patient":
+        with_doctor = [(number, record) for number, record, _ in accepted
+                       if record.get("doctor_id") or record.get("doctor_email")]
+        doctor_ids = _resolve_users("doctor", [record for _, record in with_doctor], "doctor_id", "doctor_email")
+        assignments = []
+        for (number, record), doctor_id in zip(with_doctor, doctor_ids):
+            if doctor_id:
+                assignments.append({"patient_id": str(ids[number]), "doctor_id": doctor_id})
+            else:
+                errors.append((number, "Docteur non trouvé (patient importé sans docteur)", record))
+        runs.append((ASSIGN_DOCTORS, assignments))
+    _write_nodes(runs)
+
+    # Listes admin et panels des docteurs assignés
+    bump(entity.collection)
+    if entity.role == "patient":
+        doctor_cache.invalidate(*{assignment["doctor_id"] for assignment in assignments})
+
+    return len(accepted), errors
+
+
+def _import_consultations(rows, ids):
+    errors = []
+    records = [record for _, record, _ in rows]
+    patient_ids = _resolve_users("patient", records, "patient_id", "patient_email")
+    doctor_ids = _resolve_users("doctor", records, "doctor_id", "doctor_email")
+
+    documents, node_rows = [], []
+    for (number, record, consultation), patient_id, doctor_id in zip(rows, patient_ids, doctor_ids):
+        if not patient_id:
+            errors.append((number, "Patient non trouvé", record))
+            continue
+        if not doctor_id:
+            errors.append((number, "Docteur non trouvé", record))
+            continue
+
+        start = consultation["start"]
+        documents.append({
+            "_id": ids[number],
+            "date_str": start.strftime("%Y-%m-%d %H:%M"),
+            "date": start,
+            "etat": consultation["etat"],
+            "description": consultation["description"],
+            "created_at": datetime.now()
+        })
+        node_rows.append({
+            "id": str(ids[number]),
+            "patient_id": patient_id,
+            "doctor_id": doctor_id,
+            "start_time": start.isoformat(),
+            "end_time": (start + CONSULTATION_DURATION).isoformat(),
+            "etat": consultation["etat"],
+            "description": consultation["description"]
+        })
+
+    if documents:
+        try:
+            db_services.mongo.db.consultations.insert_many(documents, ordered=False)
+        except BulkWriteError as e:
+            _duplicate_indexes(e)
+    _write_nodes([(CREATE_CONSULTATIONS, node_rows)])
+    if node_rows:
+        consultations_changed()
+
+    return len(documents), errors
+
+
+def import_file(entity_name, path, fmt=None, batch_size=IMPORT_BATCH_SIZE, checkpoint_path=None,
+                error_path=None, resume=False, hash_method=None, progress=None):
+    """Importe un fichier par lots ; chaque lot terminé est enregistré dans le checkpoint"""
+    if entity_name not in IMPORT_ENTITIES:
+        raise ValueError(f"Type d'import invalide. Options valides: {', '.join(IMPORT_ENTITIES)}")
+    entity = USER_ENTITIES.get(entity_name)
+
+    state = _load_checkpoint(checkpoint_path) if resume else None
+    if state and (state["entity"] != entity_name or state["source"] != os.path.abspath(path)):
+        raise ValueError("Le checkpoint ne correspond pas à ce fichier")
+    state = state or {"entity": entity_name, "source": os.path.abspath(path),
+                      "done": 0, "imported": 0, "errors": 0, "pending": None}
+
+    report_file = open(error_path, "a" if resume else "w", encoding="utf-8") if error_path else None
+    try:
+        records = ((number, record) for number, record in read_records(path, fmt) if number > state["done"])
+        for chunk in db_services.chunked(records, batch_size):
+            # Ids générés avant l'écriture et notés dans le checkpoint : un lot interrompu est rejoué à l'identique
+            pending = state["pending"] or {}
+            ids = {number: ObjectId(pending[str(number)]) if str(number) in pending else ObjectId()
+                   for number, _ in chunk}
+            state["pending"] = {str(number): str(oid) for number, oid in ids.items()}
+            _save_checkpoint(checkpoint_path, state)
+
+            rows, errors = [], []
+            for number, record in chunk:
+                try:
+                    if isinstance(record, Exception):
+                        raise ValueError(f"JSON invalide: {record}")
+                    if entity:
+                        rows.append((number, record, _validate_user(entity, dict(record))))
+                    else:
+                        rows.append((number, record, _validate_consultation(record)))
+                except (ValueError, TypeError) as e:
+                    errors.append((number, str(e), record))
+
+            if entity:
+                imported, write_errors = _import_users(entity, rows, ids, hash_method) if rows else (0, [])
+            else:
+                imported, write_errors = _import_consultations(rows, ids) if rows else (0, [])
+            errors.extend(write_errors)
+
+            if report_file:
+                for number, message, record in sorted(errors, key=lambda error: error[0]):
+                    record = record if isinstance(record, dict) else {}
+                    record = {key: value for key, value in record.items() if key != "mot_de_passe"}
+                    report_file.write(json.dumps({"record": number, "error": message, "data": record},
+                                                 ensure_ascii=False, default=str) + "\n")
+                report_file.flush()
+
+            state.update(done=chunk[-1][0], imported=state["imported"] + imported,
+                         errors=state["errors"] + len(errors), pending=None)
+            _save_checkpoint(checkpoint_path, state)
+            if progress:
+                progress(state)
+    finally:
+        if report_file:
+            report_file.close()
+
+    return state
@@ -0,0 +1,500 @@
+# services/OutboxService.py
+# Outbox des écritures Neo4j : chaque modification Mongo enregistre, dans la même étape, un
+# événement dans la collection outbox, qu'un worker en arrière-plan rejoue dans Neo4j par lots
+# (UNWIND), avec reprises et en respectant l'ordre des événements d'une même entité.
+# Écriture et événement : transaction Mongo sur replica set / mongos ; en standalone, les
+# événements sont écrits dans le document lui-même (champ _outbox) puis recopiés dans l'outbox.
+
+import logging
+import os
+import socket
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta
+from functools import wraps
+
+from flask import g, has_request_context
+from neo4j.exceptions import ServiceUnavailable, SessionExpired
+from bson import ObjectId
+from pymongo import ASCENDING
+from pymongo.errors import BulkWriteError, DuplicateKeyError
+
+from BackEnd.Services import db as db_services
+from BackEnd.Services.cache import doctor_cache, patient_cache
+from BackEnd.Services.versions import consultations_changed
+
+logger = logging.getLogger(__name__)
+
+PENDING = "pending"
+FAILED = "failed"
+
+# Un seul worker actif à la fois (tous processus confondus). Les événements sont rejoués par _id
+# (ObjectId créé à l'écriture) : seul l'ordre des événements d'une même entité compte
+LEASE_TTL = 10
+
+DUPLICATE_KEY = 11000
+
+# Sans transaction, événements portés par le document écrit jusqu'à leur copie dans l'outbox
+OUTBOX_FIELD = "_outbox"
+EMBEDDED_COLLECTIONS = ("doctors", "patients", "consultations", "rejected_doctors")
+# Au-delà, la requête qui a écrit l'événement s'est arrêtée avant de le recopier (voir collect_embedded),
+# ou la suppression écrite avant son document n'a jamais eu lieu (voir _unapplied_deletes)
+ORPHAN_DELAY = timedelta(seconds=30)
+# Suppressions : collection du document supprimé
+DELETE_OPS = {"doctor.delete": "doctors", "patient.delete": "patients"}
+
+# Une requête UNWIND par type d'opération ; chaque ligne contient `id` et les données de l'événement.
+# Toutes sont idempotentes (MERGE / SET / DETACH DELETE) : rejouer un lot ne duplique rien.
+SYNC_OPERATIONS = {
+    "doctor.create": """
+        UNWIND $rows AS row
+        MERGE (d:Doctor {id: row.id})
+        SET d.nom = row.nom, d.prenom = row.prenom, d.specialite = row.specialite, d.email = row.email
+    """,
+    "doctor.update": """
+        UNWIND $rows AS row
+        MATCH (d:Doctor {id: row.id})
+        SET d += row.fields
+    """,
+    "doctor.delete": """
+        UNWIND $rows AS row
+        MATCH (d:Doctor {id: row.id})
+        DETACH DELETE d
+    """,
+    "doctor.approved": """
+        UNWIND $rows AS row
+        MERGE (a:Admin {id: row.admin_id})
+        WITH a, row
+        MATCH (d:Doctor {id: row.id})
+        MERGE (a)-[r:APPROVED]->(d)
+        SET r.at = datetime(row.at)
+    """,
+    "doctor_request.rejected": """
+        UNWIND $rows AS row
+        MERGE (a:Admin {id: row.admin_id})
+        MERGE (d:RejectedDoctor {request_id: row.id})
+        SET d.email = row.email, d.nom = row.nom, d.prenom = row.prenom
+        MERGE (a)-[r:REJECTED]->(d)
+        SET r.at = datetime(row.at), r.reason = row.reason
+    """,
+    "patient.create": """
+        UNWIND $rows AS row
+        MERGE (p:Patient {id: row.id})
+        SET p.nom = row.nom, p.prenom = row.prenom, p.email = row.email
+    """,
+    "patient.update": """
+        UNWIND $rows AS row
+        MATCH (p:Patient {id: row.id})
+        SET p += row.fields
+    """,
+    "patient.delete": """
+        UNWIND $rows AS row
+        MATCH (p:Patient {id: row.id})
+        DETACH DELETE p
+    """,
+    "consultation.status": """
+        UNWIND $rows AS row
+        MATCH (c:Consultation {id: row.id})
+        SET c.etat = row.etat
+    """,
+}
+
+_settings = {
+    "enabled": True,
+    "batch_size": 500,
+    "poll_interval": 0.2,
+    "max_attempts": 10,
+    "wait_timeout": 5.0,
+}
+_wake = threading.Event()
+
+
+class OutboxTimeout(RuntimeError):
+    """Les écritures Neo4j attendues ne sont pas appliquées dans le délai (worker en retard)"""
+
+
+_worker = {"thread": None, "stop": None}
+_worker_lock = threading.Lock()
+
+
+def configure_outbox(enabled=None, batch_size=None, poll_interval=None, max_attempts=None, wait_timeout=None):
+    if enabled is not None:
+        _settings["enabled"] = enabled
+    if batch_size:
+        _settings["batch_size"] = batch_size
+    if poll_interval:
+        _settings["poll_interval"] = poll_interval
+    if max_attempts:
+        _settings["max_attempts"] = max_attempts
+    if wait_timeout is not None:
+        _settings["wait_timeout"] = wait_timeout
+
+
+def outbox():
+    return db_services.mongo.db.outbox
+
+
+def entity_key(entity, entity_id):
+    return f"{entity}:{entity_id}"
+
+
+def transactions_supported():
+    # Replica set ou mongos ; standalone, topologie pas encore découverte et stand-ins : événements embarqués
+    description = getattr(db_services.mongo.cx, "topology_description", None)
+    return description is not None and description.topology_type_name in (
+        "ReplicaSetWithPrimary", "Sharded", "LoadBalanced")
+
+
+# ---------------------- Écriture ----------------------
+
+def outbox_event(op, entity_id, **data):
+    """Écriture Neo4j à rejouer, à passer à insert_entity / update_entity / delete_entity ;
+    `op` est une clé de SYNC_OPERATIONS"""
+    if op not in SYNC_OPERATIONS:
+        raise KeyError(f"Opération de synchronisation inconnue: {op}")
+    now = datetime.utcnow()
+    return {
+        "_id": ObjectId(),
+        "op": op,
+        "key": entity_key(op.split(".", 1)[0], entity_id),
+        "entity_id": entity_id,
+        "data": data,
+        "status": PENDING,
+        "attempts": 0,
+        "created_at": now,
+        "next_attempt_at": now,
+    }
+
+
+def insert_entity(collection, document, *events):
+    """insert_one du document et de ses événements en une seule étape"""
+    if not _settings["enabled"] or not events:
+        result = collection.insert_one(document)
+    elif transactions_supported():
+        result = _in_transaction(lambda session: collection.insert_one(document, session=session), events)
+    else:
+        result = collection.insert_one({**document, OUTBOX_FIELD: list(events)})
+        _promote(collection, result.inserted_id, events)
+    _written(events)
+    return result
+
+
+def update_entity(collection, query, update, *events):
+    """update_one (query sur _id) et ses événements en une seule étape ; rien n'est émis si aucun document ne correspond"""
+    if not _settings["enabled"] or not events:
+        result = collection.update_one(query, update)
+    elif transactions_supported():
+        result = _in_transaction(lambda session: collection.update_one(query, update, session=session), events)
+    else:
+        result = collection.update_one(query, {**update, "$push": {OUTBOX_FIELD: {"$each": list(events)}}})
+        if result.matched_count:
+            _promote(collection, query["_id"], events)
+    if result.matched_count:
+        _written(events)
+    return result
+
+
+def delete_entity(collection, query, *events):
+    """delete_one et ses événements en une seule étape"""
+    if not _settings["enabled"] or not events:
+        result = collection.delete_one(query)
+    elif transactions_supported():
+        result = _in_transaction(lambda session: collection.delete_one(query, session=session), events)
+    else:
+        # Plus de document pour porter l'événement : outbox d'abord, le worker n'applique
+        # la suppression qu'une fois le document absent
+        _insert_events(events)
+        result = collection.delete_one(query)
+    _written(events)
+    return result
+
+
+def _in_transaction(write, events):
+    def run(session):
+        result = write(session)
+        outbox().insert_many(list(events), session=session)
+        return result
+
+    with db_services.mongo.cx.start_session() as session:
+        return session.with_transaction(run)
+
+
+def _insert_events(events):
+    try:
+        outbox().insert_many(list(events), ordered=False)
+    except BulkWriteError as e:
+        # Déjà recopiés (collect_embedded) : seuls les doublons sont ignorés
+        if any(error["code"] != DUPLICATE_KEY for error in e.details["writeErrors"]):
+            raise
+
+
+def _promote(collection, doc_id, events):
+    # Copie dans l'outbox, puis retrait du document
+    _insert_events(events)
+    collection.update_one({"_id": doc_id}, {"$pull": {OUTBOX_FIELD: {"_id": {"$in": [e["_id"] for e in events]}}}})
+
+
+def _written(events):
+    # Outbox désactivée : écriture Neo4j synchrone, comme avant
+    if not events:
+        return
+    if not _settings["enabled"]:
+        apply_events(events)
+        _invalidate_caches(events)
+        return
+    if has_request_context():
+        g.setdefault("outbox_keys", set()).update(event["key"] for event in events)
+    _wake.set()
+
+
+def _sync_tx(tx, runs):
+    for op, rows in runs:
+        tx.run(SYNC_OPERATIONS[op], rows=rows).consume()
+
+
+def apply_events(events):
+    # Événements consécutifs de même type regroupés en une requête UNWIND, le tout dans une transaction
+    runs = []
+    for event in events:
+        row = {**event["data"], "id": event["entity_id"]}
+        if runs and runs[-1][0] == event["op"]:
+            runs[-1][1].append(row)
+        else:
+            runs.append((event["op"], [row]))
+
+    with db_services.neo4j_driver.session() as session:
+        session.execute_write(_sync_tx, runs)
+
+
+def _invalidate_caches(events):
+    # Caches d'entités et versions (ETag) des lectures dont Neo4j vient de changer
+    for event in events:
+        entity = event["key"].split(":", 1)[0]
+        if entity == "doctor":
+            doctor_cache.invalidate(event["entity_id"])
+        elif entity == "patient":
+            patient_cache.invalidate(event["entity_id"])
+            # Suppression d'un patient : le panel de ses docteurs change aussi
+            doctor_cache.invalidate(*event["data"].get("doctor_ids", []))
+        elif event["op"] == "consultation.status":
+            consultations_changed(event["data"].get("doctor_id"), event["data"].get("patient_id"))
+        if event["op"] in ("doctor.delete", "patient.delete"):
+            # Consultations détachées de leur docteur ou patient : toutes les listes
+            consultations_changed()
+
+
+# ---------------------- Worker ----------------------
+
+def _record_failure(event, error):
+    attempts = event["attempts"] + 1
+    update = {"attempts": attempts, "last_error": str(error)}
+    if attempts >= _settings["max_attempts"]:
+        # Laissé dans l'outbox pour analyse ; les événements suivants de l'entité ne sont plus bloqués
+        update["status"] = FAILED
+        logger.error("Outbox: abandon de %s %s après %s essais: %s", event["op"], event["key"], attempts, error)
+    else:
+        update["next_attempt_at"] = datetime.utcnow() + timedelta(seconds=min(0.5 * 2 ** attempts, 60))
+    outbox().update_one({"_id": event["_id"]}, {"$set": update})
+
+
+def _apply_one_by_one(events):
+    # Lot refusé : on isole les événements fautifs sans bloquer les autres entités
+    done, blocked = [], set()
+    for event in events:
+        if event["key"] in blocked:
+            continue
+        try:
+            apply_events([event])
+            done.append(event)
+        except (ServiceUnavailable, SessionExpired):
+            raise
+        except Exception as e:
+            blocked.add(event["key"])
+            _record_failure(event, e)
+    return done
+
+
+def drain_once():
+    """Rejoue un lot d'événements en attente ; retourne le nombre d'événements appliqués"""
+    now = datetime.utcnow()
+    events = list(outbox().find({"status": PENDING}).sort("_id", ASCENDING).limit(_settings["batch_size"]))
+    waiting = _unapplied_deletes(events, now)
+
+    # Un événement en attente de reprise bloque les suivants de la même entité
+    ready, blocked = [], set()
+    for event in events:
+        if event["key"] in blocked or event["next_attempt_at"] > now or event["_id"] in waiting:
+            blocked.add(event["key"])
+            continue
+        ready.append(event)
+    if not ready:
+        return 0
+
+    try:
+        apply_events(ready)
+        done = ready
+    except (ServiceUnavailable, SessionExpired):
+        raise
+    except Exception as e:
+        logger.warning("Outbox: lot de %s événements refusé (%s), reprise un par un", len(ready), e)
+        done = _apply_one_by_one(ready)
+
+    if done:
+        outbox().delete_many({"_id": {"$in": [event["_id"] for event in done]}})
+        _invalidate_caches(done)
+    return len(done)
+
+
+def _unapplied_deletes(events, now):
+    """_id des suppressions dont le document existe encore (écrites avant lui, sans transaction) ;
+    trop anciennes, la suppression Mongo n'a pas eu lieu : l'événement est abandonné"""
+    deletes = [event for event in events if event["op"] in DELETE_OPS]
+    if not deletes or transactions_supported():
+        return set()
+
+    waiting, abandoned = set(), []
+    for name in set(DELETE_OPS[event["op"]] for event in deletes):
+        batch = [event for event in deletes if DELETE_OPS[event["op"]] == name]
+        alive = {str(doc["_id"]) for doc in db_services.mongo.db[name].find(
+            {"_id": {"$in": [ObjectId(event["entity_id"]) for event in batch]}}, {"_id": 1})}
+        for event in batch:
+            if event["entity_id"] not in alive:
+                continue
+            if event["created_at"] < now - ORPHAN_DELAY:
+                abandoned.append(event)
+            else:
+                waiting.add(event["_id"])
+
+    if abandoned:
+        logger.warning("Outbox: %s suppressions abandonnées, documents toujours présents dans Mongo", len(abandoned))
+        outbox().delete_many({"_id": {"$in": [event["_id"] for event in abandoned]}})
+        waiting.update(event["_id"] for event in abandoned)
+    return waiting
+
+
+def collect_embedded():
+    """Recopie dans l'outbox les événements restés dans leur document (requête interrompue
+    entre l'écriture et la copie) ; retourne leur nombre"""
+    cutoff = datetime.utcnow() - ORPHAN_DELAY
+    count = 0
+    for name in EMBEDDED_COLLECTIONS:
+        collection = db_services.mongo.db[name]
+        query = {f"{OUTBOX_FIELD}.created_at": {"$lt": cutoff}}
+        for doc in collection.find(query, {OUTBOX_FIELD: 1}).limit(_settings["batch_size"]):
+            events = [event for event in doc[OUTBOX_FIELD] if event["created_at"] < cutoff]
+            _promote(collection, doc["_id"], events)
+            count += len(events)
+    return count
+
+
+def _acquire_lease(owner):
+    now = datetime.utcnow()
+    try:
+        db_services.mongo.db.outbox_state.find_one_and_update(
+            {"_id": "lease", "$or": [{"owner": owner}, {"expires_at": {"$lt": now}}]},
+            {"$set": {"owner": owner, "expires_at": now + timedelta(seconds=LEASE_TTL)}},
+            upsert=True
+        )
+        return True
+    except DuplicateKeyError:
+        # Bail détenu par un autre processus
+        return False
+
+
+def _run_worker(stop):
+    owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+    lease_until = 0
+    next_collect = 0
+    backoff = _settings["poll_interval"]
+
+    while not stop.is_set():
+        try:
+            # Renouvelé à mi-parcours pour ne jamais expirer pendant un lot
+            if time.monotonic() > lease_until - LEASE_TTL / 2:
+                lease_until = time.monotonic() + LEASE_TTL if _acquire_lease(owner) else 0
+            if not lease_until:
+                stop.wait(LEASE_TTL / 2)
+                continue
+
+            if time.monotonic() >= next_collect:
+                collect_embedded()
+                next_collect = time.monotonic() + ORPHAN_DELAY.total_seconds() / 2
+
+            if drain_once():
+                backoff = _settings["poll_interval"]
+                continue
+        except Exception:
+            logger.exception("Outbox: synchronisation Neo4j interrompue, nouvel essai dans %ss", backoff)
+            stop.wait(backoff)
+            backoff = min(backoff * 2, 30)
+            continue
+
+        _wake.wait(_settings["poll_interval"])
+        _wake.clear()
+
+
+def start_sync_worker():
+    # Appelé à chaque requête (app.py) : idempotent
+    if not _settings["enabled"] or _worker["thread"] is not None:
+        return
+    with _worker_lock:
+        if _worker["thread"] is not None:
+            return
+        _worker["stop"] = threading.Event()
+        _worker["thread"] = threading.Thread(
+            target=_run_worker, args=(_worker["stop"],), name="outbox-sync", daemon=True
+        )
+        _worker["thread"].start()
+
+
+def stop_sync_worker(timeout=5):
+    if _worker["thread"] is None:
+        return
+    _worker["stop"].set()
+    _wake.set()
+    _worker["thread"].join(timeout)
+    _worker["thread"] = None
+
+
+# ---------------------- Lecture de ses propres écritures ----------------------
+
+def wait_for_sync(*keys, timeout=None):
+    """Attend que les événements en attente de ces entités soient appliqués dans Neo4j"""
+    if not _settings["enabled"] or not keys:
+        return True
+
+    deadline = time.monotonic() + (_settings["wait_timeout"] if timeout is None else timeout)
+    query = {"key": {"$in": list(keys)}, "status": PENDING}
+    delay = 0.01
+    _wake.set()
+    while outbox().find_one(query, {"_id": 1}) is not None:
+        if time.monotonic() >= deadline:
+            return False
+        time.sleep(delay)
+        delay = min(delay * 2, 0.1)
+    return True
+
+
+def require_sync(*keys, timeout=None):
+    # Pour les écritures qui ont besoin des noeuds Neo4j de ces entités
+    if not wait_for_sync(*keys, timeout=timeout):
+        raise OutboxTimeout("Synchronisation en cours, réessayez dans quelques instants")
+
+
+def wait_for_request_writes(timeout=None):
+    # Entités écrites pendant la requête courante (voir _written)
+    keys = g.pop("outbox_keys", None) if has_request_context() else None
+    return wait_for_sync(*keys, timeout=timeout) if keys else True
+
+
+def read_your_writes(f):
+    """Décorateur de route : la réponse n'est renvoyée qu'une fois Neo4j à jour"""
+
+    @wraps(f)
+    def wrapper(*args, **kwargs):
+        response = f(*args, **kwargs)
+        wait_for_request_writes()
+        return response
+
+    return wrapper
@@ -4,19 +4,31 @@ from BackEnd.Constantes import specialites
 from BackEnd.Modules.Consultation import Consultation
 from BackEnd.Modules.Patient import Patient
 from BackEnd.Services.AuthService import hash_password
-from BackEnd.Services.db import mongo, neo4j_driver
+from BackEnd.Services.IdentityService import (
+    insert_with_identity,
+    update_identity,
+    unregister_identity
+)
+from BackEnd.Services.db import mongo, neo4j_driver, chunked
+from BackEnd.Services.pagination import find_page, iter_documents
+from BackEnd.Services.ScheduleIndex import schedule_index, FREEING_STATES
+from BackEnd.Services.cache import read_through, doctor_cache, patient_cache
+from BackEnd.Services.OutboxService import (
+    delete_entity,
+    entity_key,
+    outbox_event,
+    require_sync,
+    update_entity
+)
+from BackEnd.Services.versions import entities_changed, consultations_changed
+from BackEnd.Services.projection import mongo_projection, wants
+from BackEnd.Services.TokenService import revoke_user
+
+# Durée fixe d'une consultation ; borne aussi la fenêtre de recherche des conflits
+CONSULTATION_DURATION = timedelta(hours=1)
 
 
 def create_patient(data):
-    email = data.get("email")
-
-    # Check if email is unique in both patients and doctors collections
-    existing_patient = mongo.db.patients.find_one({"email": email})
-    existing_doctor = mongo.db.doctors.find_one({"email": email})
-
-    if existing_patient or existing_doctor:
-        raise ValueError("Cet email est déjà utilisé par un autre utilisateur.")
-
     # Validate required fields
     required_fields = ["nom", "prenom", "email", "mot_de_passe", "date_naissance"]
     for field in required_fields:
@@ -31,27 +43,37 @@ def create_patient(data):
     # Remove any relationship fields that might be in the data
     patient_dict.pop('doctor_id', None)
 
-    result = mongo.db.patients.insert_one(patient_dict)
-    patient_id = str(result.inserted_id)
-
-    # Neo4j - store the patient node
-    with neo4j_driver.session() as session:
-        session.run(
-            "CREATE (p:Patient {id: $id, nom: $nom, prenom: $prenom, email: $email})",
-            id=patient_id,
-            nom=data["nom"],
-            prenom=data["prenom"],
-            email=data["email"]
-        )
+    # Email uniqueness is enforced by the identities index;
+    # the Neo4j patient node is written with the document and replayed by the outbox worker
+    patient_id = str(ObjectId())
+    insert_with_identity(
+        mongo.db.patients, {**patient_dict, "_id": ObjectId(patient_id)}, "patient", patient_dict["mot_de_passe"],
+        events=[outbox_event("patient.create", patient_id, nom=data["nom"], prenom=data["prenom"], email=data["email"])]
+    )
+    entities_changed("patient", patient_id)
 
     return patient_id
 
 
+# Requêtes partagées avec AsyncService (mode ASGI)
+PATIENT_DOCTOR_ID = (
+    "MATCH (p:Patient {id: $id})-[:EST_SUIVI_PAR]->(d:Doctor) "
+    "RETURN d.id as doctor_id"
+)
+PATIENTS_DOCTOR_IDS = (
+    "UNWIND $ids AS pid "
+    "MATCH (p:Patient {id: pid})-[:EST_SUIVI_PAR]->(d:Doctor) "
+    "RETURN p.id as patient_id, d.id as doctor_id"
+)
+
+
+@read_through(patient_cache)
 def get_patient(patient_id):
     if not ObjectId.is_valid(patient_id):
         raise ValueError("ID patient invalide")
 
-    pat = mongo.db.patients.find_one({"_id": ObjectId(patient_id)})
+    # Document complet sans les secrets : c'est lui que garde le cache
+    pat = mongo.db.patients.find_one({"_id": ObjectId(patient_id)}, mongo_projection("patient"))
     if not pat:
         raise ValueError("Patient non trouvé")
 
@@ -59,11 +81,7 @@ def get_patient(patient_id):
 
     # If you need relationship data, fetch it from Neo4j
     with neo4j_driver.session() as session:
-        result = session.run(
-            "MATCH (p:Patient {id: $id})-[:EST_SUIVI_PAR]->(d:Doctor) "
-            "RETURN d.id as doctor_id",
-            id=patient_id
-        )
+        result = session.run(PATIENT_DOCTOR_ID, id=patient_id)
         doctor_data = result.single()
         if doctor_data:
             pat["doctor_id"] = doctor_data["doctor_id"]
@@ -71,6 +89,24 @@ def get_patient(patient_id):
     return pat
 
 
+def get_patients_bulk(patient_ids, fields=None):
+    # Hydrate many patients with one $in query per batch plus the bulk doctor resolver
+    object_ids = [ObjectId(pid) for pid in patient_ids if ObjectId.is_valid(pid)]
+
+    pats = {}
+    projection = mongo_projection("patient", fields)
+    for ids in chunked(object_ids):
+        for pat in mongo.db.patients.find({"_id": {"$in": ids}}, projection):
+            pat["_id"] = str(pat["_id"])
+            pats[pat["_id"]] = pat
+
+    if wants(fields, "doctor_id"):
+        add_doctor_ids(list(pats.values()))
+
+    # Keep the order of the requested ids, skipping unknown ones
+    return [pats[str(pid)] for pid in patient_ids if str(pid) in pats]
+
+
 def update_patient(patient_id, data):
     if not ObjectId.is_valid(patient_id):
         raise ValueError("ID patient invalide")
@@ -80,37 +116,21 @@ def update_patient(patient_id, data):
     if not existing_patient:
         raise ValueError("Patient non trouvé")
 
-    # If email is being updated, check for uniqueness
-    if "email" in data:
-        existing_with_email = mongo.db.patients.find_one({
-            "email": data["email"],
-            "_id": {"$ne": ObjectId(patient_id)}
-        })
-        if existing_with_email:
-            raise ValueError("Cet email est déjà utilisé par un autre patient.")
-
     # MongoDB - update only patient attributes
     if "mot_de_passe" in data:
         data["mot_de_passe"] = hash_password(data["mot_de_passe"])
 
+    # Email uniqueness is enforced by the identities index
+    update_identity(patient_id, email=data.get("email"), password_hash=data.get("mot_de_passe"))
+
     # Remove relationship fields if they were accidentally included
     data.pop('doctor_id', None)
 
-    mongo.db.patients.update_one({"_id": ObjectId(patient_id)}, {"$set": data})
-
-    # Neo4j - update patient node properties
-    if any(field in data for field in ['nom', 'prenom', 'email']):
-        with neo4j_driver.session() as session:
-            session.run(
-                "MATCH (p:Patient {id: $id}) "
-                "SET p.nom = COALESCE($nom, p.nom), "
-                "p.prenom = COALESCE($prenom, p.prenom), "
-                "p.email = COALESCE($email, p.email)",
-                id=patient_id,
-                nom=data.get("nom"),
-                prenom=data.get("prenom"),
-                email=data.get("email")
-            )
+    # Neo4j - update patient node properties, with the MongoDB update
+    fields_to_update = {k: v for k, v in data.items() if k in ['nom', 'prenom', 'email'] and v is not None}
+    events = [outbox_event("patient.update", patient_id, fields=fields_to_update)] if fields_to_update else []
+    update_entity(mongo.db.patients, {"_id": ObjectId(patient_id)}, {"$set": data}, *events)
+    patient_cache.invalidate(patient_id)
 
     return get_patient(patient_id)
 
@@ -124,37 +144,58 @@ def delete_patient(patient_id):
     if not existing_patient:
         raise ValueError("Patient non trouvé")
 
-    # MongoDB - delete patient document
-    mongo.db.patients.delete_one({"_id": ObjectId(patient_id)})
-
-    # Neo4j - Delete patient and all related nodes/relationships
-    with neo4j_driver.session() as session:
-        session.run(
-            "MATCH (p:Patient {id: $id}) "
-            "DETACH DELETE p",
-            id=patient_id
-        )
+    # MongoDB - delete patient document, with the Neo4j delete of the patient and its relationships
+    # The doctor's panel changes too: its cache entry is dropped once the delete is applied
+    doctor_ids = list(get_doctor_ids_for_patients([patient_id]).values())
+    delete_entity(mongo.db.patients, {"_id": ObjectId(patient_id)},
+                  outbox_event("patient.delete", patient_id, doctor_ids=doctor_ids))
+    unregister_identity(patient_id)
+    revoke_user(patient_id)
+    patient_cache.invalidate(patient_id)
+    doctor_cache.invalidate(*doctor_ids)
 
     return True
 
 
-def list_patients():
-    pats = mongo.db.patients.find()
+def list_patients(limit=None, after=None, fields=None):
+    pats, next_cursor = find_page(
+        mongo.db.patients, limit=limit, after=after, projection=mongo_projection("patient", fields)
+    )
     patients_list = [{**pat, "_id": str(pat["_id"])} for pat in pats]
 
-    # If you need relationship data for each patient, fetch from Neo4j
+    # Relationship data for the current page, resolved in bulk from Neo4j
+    if wants(fields, "doctor_id"):
+        add_doctor_ids(patients_list)
+
+    return patients_list, next_cursor
+
+
+def iter_patients(after=None, fields=None):
+    # Streaming variant of list_patients: enrich and yield one batch at a time
+    documents = iter_documents(mongo.db.patients, after=after, projection=mongo_projection("patient", fields))
+    for pats in chunked(documents):
+        patients_list = [{**pat, "_id": str(pat["_id"])} for pat in pats]
+        if wants(fields, "doctor_id"):
+            add_doctor_ids(patients_list)
+        yield from patients_list
+
+
+def add_doctor_ids(patients_list):
+    doctor_ids = get_doctor_ids_for_patients([patient["_id"] for patient in patients_list])
+    for patient in patients_list:
+        if patient["_id"] in doctor_ids:
+            patient["doctor_id"] = doctor_ids[patient["_id"]]
+
+
+def get_doctor_ids_for_patients(patient_ids):
+    # Map patient id -> doctor id (EST_SUIVI_PAR), one UNWIND query per batch of ids
+    doctor_ids = {}
     with neo4j_driver.session() as session:
-        for patient in patients_list:
-            result = session.run(
-                "MATCH (p:Patient {id: $id})-[:EST_SUIVI_PAR]->(d:Doctor) "
-                "RETURN d.id as doctor_id",
-                id=patient["_id"]
-            )
-            doctor_data = result.single()
-            if doctor_data:
-                patient["doctor_id"] = doctor_data["doctor_id"]
+        for ids in chunked(patient_ids):
+            result = session.run(PATIENTS_DOCTOR_IDS, ids=ids)
+            doctor_ids.update({record["patient_id"]: record["doctor_id"] for record in result})
 
-    return patients_list
+    return doctor_ids
 
 
 def assign_patient_to_doctor(patient_id, doctor_id):
@@ -164,25 +205,29 @@ def assign_patient_to_doctor(patient_id, doctor_id):
         raise ValueError("ID docteur invalide")
 
     # Check if patient exists
-    patient = mongo.db.patients.find_one({"_id": ObjectId(patient_id)})
+    patient = mongo.db.patients.find_one({"_id": ObjectId(patient_id)}, {"_id": 1})
     if not patient:
         raise ValueError("Patient non trouvé")
 
     # Check if doctor exists
-    doctor = mongo.db.doctors.find_one({"_id": ObjectId(doctor_id)})
+    doctor = mongo.db.doctors.find_one({"_id": ObjectId(doctor_id)}, {"_id": 1})
     if not doctor:
         raise ValueError("Docteur non trouvé")
 
     # No need to update MongoDB - relationships are stored in Neo4j only
+    # Both nodes may still be waiting in the outbox
+    require_sync(entity_key("patient", patient_id), entity_key("doctor", doctor_id))
 
     # Neo4j - handle the relationship
     with neo4j_driver.session() as session:
         # Remove any existing EST_SUIVI_PAR relationship first
-        session.run(
-            "MATCH (p:Patient {id: $patient_id})-[r:EST_SUIVI_PAR]->() "
-            "DELETE r",
+        result = session.run(
+            "MATCH (p:Patient {id: $patient_id})-[r:EST_SUIVI_PAR]->(d) "
+            "DELETE r "
+            "RETURN d.id as doctor_id",
             patient_id=patient_id
         )
+        previous_doctor_ids = [record["doctor_id"] for record in result]
 
         # Create new EST_SUIVI_PAR relationship
         session.run(
@@ -192,25 +237,96 @@ def assign_patient_to_doctor(patient_id, doctor_id):
             doctor_id=doctor_id
         )
 
+    patient_cache.invalidate(patient_id)
+    doctor_cache.invalidate(doctor_id, *previous_doctor_ids)
+
     return True
 
 
+def book_consultation_tx(tx, consultation_id, patient_id, doctor_id, start_time, end_time, etat, description):
+    # Only consultations starting less than one duration before ours can overlap:
+    # the start_time range index keeps this check independent of the history size
+    window_start = (datetime.fromisoformat(start_time) - CONSULTATION_DURATION).isoformat()
+
+    # Existence check + write locks on both nodes (always doctor first, then patient),
+    # so concurrent bookings for the same doctor or patient are serialized until commit
+    record = tx.run(
+        """
+        OPTIONAL MATCH (d:Doctor {id: $doctor_id})
+        OPTIONAL MATCH (p:Patient {id: $patient_id})
+        FOREACH (n IN [x IN [d, p] WHERE x IS NOT NULL] | SET n._lock = true REMOVE n._lock)
+        RETURN d IS NOT NULL AS doctor_exists, p IS NOT NULL AS patient_exists
+        """,
+        doctor_id=doctor_id,
+        patient_id=patient_id
+    ).single()
+    if not record["patient_exists"]:
+        raise ValueError("Patient non trouvé")
+    if not record["doctor_exists"]:
+        raise ValueError("Docteur non trouvé")
+
+    # Doctor and patient availability checks
+    record = tx.run(
+        """
+        CALL {
+            MATCH (c:Consultation)
+            WHERE c.start_time > datetime($window_start) AND c.start_time < datetime($end_time)
+            MATCH (:Doctor {id: $doctor_id})-[:A_CONSULTATION]->(c)
+            WHERE NOT c.etat IN $freeing AND datetime($start_time) < c.end_time
+            RETURN count(c) > 0 AS doctor_conflict
+        }
+        CALL {
+            MATCH (c:Consultation)
+            WHERE c.start_time > datetime($window_start) AND c.start_time < datetime($end_time)
+            MATCH (:Patient {id: $patient_id})-[:A_CONSULTATION]->(c)
+            WHERE NOT c.etat IN $freeing AND datetime($start_time) < c.end_time
+            RETURN count(c) > 0 AS patient_conflict
+        }
+        RETURN doctor_conflict, patient_conflict
+        """,
+        doctor_id=doctor_id,
+        patient_id=patient_id,
+        start_time=start_time,
+        end_time=end_time,
+        window_start=window_start,
+        freeing=list(FREEING_STATES)
+    ).single()
+    if record["doctor_conflict"]:
+        raise ValueError("Le docteur a déjà une consultation prévue pendant cette période")
+    if record["patient_conflict"]:
+        raise ValueError("Le patient a déjà une consultation prévue pendant cette période")
+
+    # Create relationships in Neo4j with proper datetime objects
+    tx.run(
+        """
+        MATCH (p:Patient {id: $patient_id}), (d:Doctor {id: $doctor_id})
+        CREATE (c:Consultation {
+            id: $consultation_id,
+            start_time: datetime($start_time),
+            end_time: datetime($end_time),
+            etat: $etat,
+            description: $description,
+            mongo_id: $consultation_id
+        })
+        CREATE (p)-[:A_CONSULTATION]->(c)
+        CREATE (d)-[:A_CONSULTATION]->(c)
+        """,
+        patient_id=patient_id,
+        doctor_id=doctor_id,
+        consultation_id=consultation_id,
+        start_time=start_time,
+        end_time=end_time,
+        etat=etat,
+        description=description
+    )
+
+
 def create_consultation(patient_id, doctor_id, date, etat="prévue", description=None):
     if not ObjectId.is_valid(patient_id):
         raise ValueError("ID patient invalide")
     if not ObjectId.is_valid(doctor_id):
         raise ValueError("ID docteur invalide")
 
-    # Check if patient exists
-    patient = mongo.db.patients.find_one({"_id": ObjectId(patient_id)})
-    if not patient:
-        raise ValueError("Patient non trouvé")
-
-    # Check if doctor exists
-    doctor = mongo.db.doctors.find_one({"_id": ObjectId(doctor_id)})
-    if not doctor:
-        raise ValueError("Docteur non trouvé")
-
     # Parse and validate date
     try:
         # Parse input string to datetime
@@ -219,7 +335,7 @@ def create_consultation(patient_id, doctor_id, date, etat="prévue", description
             raise ValueError("La date de consultation ne peut pas être dans le passé")
 
         # Calculate end time (assuming 1 hour consultation by default)
-        end_time = consultation_date + timedelta(hours=1)
+        end_time = consultation_date + CONSULTATION_DURATION
 
         # ISO formats for Neo4j
         iso_start = consultation_date.isoformat()
@@ -230,74 +346,67 @@ def create_consultation(patient_id, doctor_id, date, etat="prévue", description
     except ValueError:
         raise ValueError("Format de date invalide. Utilisez le format YYYY-MM-DD HH:MM")
 
-    # Check for scheduling conflicts in Neo4j
-    with neo4j_driver.session() as session:
-        # Doctor availability check
-        result = session.run(
-            """
-            MATCH (d:Doctor {id: $doctor_id})-[:A_CONSULTATION]->(c:Consultation)
-            WHERE c.etat <> 'annulée' AND 
-                  datetime($start_time) < datetime(c.end_time) AND
-                  datetime($end_time) > datetime(c.start_time)
-            RETURN count(c) > 0 as has_conflict
-            """,
-            doctor_id=doctor_id,
-            start_time=iso_start,
-            end_time=iso_end
-        )
-        if result.single()["has_conflict"]:
-            raise ValueError("Le docteur a déjà une consultation prévue pendant cette période")
+    # Fast path: reject from the in-memory schedule index
+    check_schedule_index(doctor_id, patient_id, consultation_date, end_time)
 
-        # Patient availability check
-        result = session.run(
-            """
-            MATCH (p:Patient {id: $patient_id})-[:A_CONSULTATION]->(c:Consultation)
-            WHERE c.etat <> 'annulée' AND 
-                  datetime($start_time) < datetime(c.end_time) AND
-                  datetime($end_time) > datetime(c.start_time)
-            RETURN count(c) > 0 as has_conflict
-            """,
-            patient_id=patient_id,
-            start_time=iso_start,
-            end_time=iso_end
+    # Existence, conflict check and creation in a single Neo4j write transaction
+    # (a patient or doctor created just before may still be waiting in the outbox)
+    require_sync(entity_key("patient", patient_id), entity_key("doctor", doctor_id))
+    consultation_id = str(ObjectId())
+    with neo4j_driver.session() as session:
+        session.execute_write(
+            book_consultation_tx,
+            consultation_id,
+            patient_id,
+            doctor_id,
+            iso_start,
+            iso_end,
+            etat,
+            description
         )
-        if result.single()["has_conflict"]:
-            raise ValueError("Le patient a déjà une consultation prévue pendant cette période")
 
     # Create in MongoDB - store both string and datetime formats
     consultation_data = {
+        "_id": ObjectId(consultation_id),
         "date_str": mongo_date_str,  # String version for display
         "date": consultation_date,  # Datetime object for queries
         "etat": etat,
         "description": description,
         "created_at": datetime.now()
     }
-    result = mongo.db.consultations.insert_one(consultation_data)
-    consultation_id = str(result.inserted_id)
+    try:
+        mongo.db.consultations.insert_one(consultation_data)
+    except Exception:
+        # Undo the booking so the slot is not held by a consultation without document
+        with neo4j_driver.session() as session:
+            session.run("MATCH (c:Consultation {id: $id}) DETACH DELETE c", id=consultation_id)
+        raise
 
-    # Create relationships in Neo4j with proper datetime objects
+    schedule_index.add(consultation_id, doctor_id, patient_id, consultation_date, end_time)
+    consultations_changed(doctor_id, patient_id)
+
+    return consultation_id
+
+
+def check_schedule_index(doctor_id, patient_id, start, end):
+    doctor_conflicts, patient_conflicts = schedule_index.conflicts(doctor_id, patient_id, start, end)
+    if not doctor_conflicts and not patient_conflicts:
+        return
+
+    # Another worker may have cancelled the conflicting consultation: confirm before rejecting
     with neo4j_driver.session() as session:
-        session.run(
-            """
-            MATCH (p:Patient {id: $patient_id}), (d:Doctor {id: $doctor_id})
-            CREATE (c:Consultation {
-                id: $consultation_id,
-                start_time: datetime($start_time),
-                end_time: datetime($end_time),
-                etat: $etat,
-                description: $description,
-                mongo_id: $consultation_id  
-            })
-            CREATE (p)-[:A_CONSULTATION]->(c)
-            CREATE (d)-[:A_CONSULTATION]->(c)
-            """,
-            patient_id=patient_id,
-            doctor_id=doctor_id,
-            consultation_id=consultation_id,
-            start_time=iso_start,
-            end_time=iso_end,
-            etat=etat,
-            description=description
+        result = session.run(
+            "MATCH (c:Consultation) WHERE c.id IN $ids AND NOT c.etat IN $freeing "
+            "RETURN c.id as consultation_id",
+            ids=doctor_conflicts + patient_conflicts,
+            freeing=list(FREEING_STATES)
         )
+        active = {record["consultation_id"] for record in result}
+
+    for consultation_id in set(doctor_conflicts + patient_conflicts) - active:
+        schedule_index.remove(consultation_id)
 
-    return consultation_id
\ No newline at end of file
+    if active & set(doctor_conflicts):
+        raise ValueError("Le docteur a déjà une consultation prévue pendant cette période")
+    if active & set(patient_conflicts):
+        raise ValueError("Le patient a déjà une consultation prévue pendant cette période")
@@ -0,0 +1,119 @@
+# services/ScheduleIndex.py
+# Index en mémoire des créneaux occupés (consultations futures non annulées),
+# par docteur et par patient, pour répondre aux tests de chevauchement en O(log n).
+# L'index est propre au processus : avec plusieurs workers il ignore les réservations
+# des autres, ce n'est qu'un filtre rapide ; la transaction Neo4j reste la vérification.
+
+import threading
+from bisect import bisect_left, insort
+from datetime import datetime, timedelta
+
+from BackEnd.Services import db as db_services
+
+# États qui libèrent le créneau (même règle que les requêtes Cypher)
+FREEING_STATES = {"annulée"}
+
+
+class IntervalSet:
+    """Intervalles [start, end) triés par début ; ils peuvent se chevaucher (imports)"""
+
+    def __init__(self):
+        self.items = []  # (start, end, consultation_id)
+        self.longest = timedelta(0)  # durée maximale, borne la fenêtre de recherche
+
+    def add(self, start, end, consultation_id):
+        insort(self.items, (start, end, consultation_id))
+        self.longest = max(self.longest, end - start)
+
+    def remove(self, start, end, consultation_id):
+        i = bisect_left(self.items, (start, end, consultation_id))
+        if i < len(self.items) and self.items[i] == (start, end, consultation_id):
+            del self.items[i]
+
+    def prune(self, now):
+        # Drop the ended intervals at the head (sorted by start; a longer one still running stops the scan)
+        i = 0
+        while i < len(self.items) and self.items[i][1] <= now:
+            i += 1
+        if i:
+            del self.items[:i]
+
+    def overlapping(self, start, end):
+        # Candidates start in [start - longest, end): same window as the Cypher conflict check
+        first = bisect_left(self.items, (start - self.longest,))
+        last = bisect_left(self.items, (end,))
+        return [consultation_id for _, item_end, consultation_id in self.items[first:last] if item_end > start]
+
+
+class ScheduleIndex:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.doctors = {}
+        self.patients = {}
+        self.consultations = {}  # consultation_id -> (doctor_id, patient_id, start, end)
+
+    def rebuild(self):
+        # Reload all future non-cancelled consultations from Neo4j
+        with db_services.neo4j_driver.session() as session:
+            result = session.run("""
+                MATCH (d:Doctor)-[:A_CONSULTATION]->(c:Consultation)<-[:A_CONSULTATION]-(p:Patient)
+                WHERE c.end_time > datetime() AND NOT c.etat IN $freeing
+                RETURN c.id AS consultation_id, d.id AS doctor_id, p.id AS patient_id,
+                       c.start_time AS start_time, c.end_time AS end_time
+            """, freeing=list(FREEING_STATES))
+            records = [(record["consultation_id"], record["doctor_id"], record["patient_id"],
+                        _to_naive(record["start_time"]), _to_naive(record["end_time"]))
+                       for record in result]
+
+        with self.lock:
+            self.doctors, self.patients, self.consultations = {}, {}, {}
+            for consultation_id, doctor_id, patient_id, start, end in records:
+                self._add(consultation_id, doctor_id, patient_id, start, end)
+
+        return len(records)
+
+    def add(self, consultation_id, doctor_id, patient_id, start, end):
+        with self.lock:
+            self._add(consultation_id, doctor_id, patient_id, start, end)
+
+    def _add(self, consultation_id, doctor_id, patient_id, start, end):
+        if consultation_id in self.consultations:
+            return
+        self.consultations[consultation_id] = (doctor_id, patient_id, start, end)
+        self.doctors.setdefault(doctor_id, IntervalSet()).add(start, end, consultation_id)
+        self.patients.setdefault(patient_id, IntervalSet()).add(start, end, consultation_id)
+
+    def remove(self, consultation_id):
+        with self.lock:
+            entry = self.consultations.pop(consultation_id, None)
+            if not entry:
+                return
+            doctor_id, patient_id, start, end = entry
+            self.doctors[doctor_id].remove(start, end, consultation_id)
+            self.patients[patient_id].remove(start, end, consultation_id)
+
+    def update_status(self, consultation_id, new_status):
+        if new_status in FREEING_STATES:
+            self.remove(consultation_id)
+
+    def conflicts(self, doctor_id, patient_id, start, end):
+        # Returns (doctor conflicts, patient conflicts) as lists of consultation ids
+        now = datetime.now()
+        with self.lock:
+            doctor_set = self.doctors.get(doctor_id)
+            patient_set = self.patients.get(patient_id)
+            for interval_set in (doctor_set, patient_set):
+                if interval_set:
+                    interval_set.prune(now)
+            return (doctor_set.overlapping(start, end) if doctor_set else [],
+                    patient_set.overlapping(start, end) if patient_set else [])
+
+
+def _to_naive(value):
+    # neo4j DateTime -> naive datetime (dates are stored without timezone semantics)
+    if hasattr(value, "to_native"):
+        value = value.to_native()
+    return value.replace(tzinfo=None)
+
+
+schedule_index = ScheduleIndex()
@@ -0,0 +1,143 @@
+# services/SchemaService.py
+# Création idempotente des index Mongo et des contraintes/index Neo4j
+# utilisés par les requêtes de DocteurService et PatientServices.
+
+from pymongo import ASCENDING
+
+from BackEnd.Services import db as db_services
+from BackEnd.Services.IdentityService import ensure_identity_indexes
+
+# (collection, clés, options)
+MONGO_INDEXES = [
+    ("patients", [("email", ASCENDING)], {"name": "email"}),
+    ("doctors", [("email", ASCENDING)], {"name": "email"}),
+    ("doctors", [("specialite", ASCENDING)], {"name": "specialite"}),
+    ("admins", [("email", ASCENDING)], {"name": "email"}),
+    ("pending_doctors", [("email", ASCENDING)], {"name": "email"}),
+    ("consultations", [("etat", ASCENDING), ("date", ASCENDING)], {"name": "etat_date"}),
+    ("consultations", [("date", ASCENDING)], {"name": "date"}),
+    ("outbox", [("status", ASCENDING), ("_id", ASCENDING)], {"name": "status_id"}),
+    # Événements embarqués sans transaction (OutboxService.collect_embedded)
+    *((name, [("_outbox.created_at", ASCENDING)], {"name": "outbox_created_at", "sparse": True})
+      for name in ("doctors", "patients", "consultations", "rejected_doctors")),
+    ("outbox", [("key", ASCENDING), ("status", ASCENDING)], {"name": "key_status"}),
+    ("revoked_tokens", [("expires_at", ASCENDING)], {"name": "expires_at", "expireAfterSeconds": 0}),
+]
+
+# Toutes les instructions sont en IF NOT EXISTS : les rejouer ne change rien
+NEO4J_SCHEMA = [
+    ("doctor_id_unique",
+     "CREATE CONSTRAINT doctor_id_unique IF NOT EXISTS FOR (d:Doctor) REQUIRE d.id IS UNIQUE"),
+    ("patient_id_unique",
+     "CREATE CONSTRAINT patient_id_unique IF NOT EXISTS FOR (p:Patient) REQUIRE p.id IS UNIQUE"),
+    ("consultation_id_unique",
+     "CREATE CONSTRAINT consultation_id_unique IF NOT EXISTS FOR (c:Consultation) REQUIRE c.id IS UNIQUE"),
+    ("admin_id_unique",
+     "CREATE CONSTRAINT admin_id_unique IF NOT EXISTS FOR (a:Admin) REQUIRE a.id IS UNIQUE"),
+    ("consultation_mongo_id",
+     "CREATE INDEX consultation_mongo_id IF NOT EXISTS FOR (c:Consultation) ON (c.mongo_id)"),
+    ("consultation_etat",
+     "CREATE INDEX consultation_etat IF NOT EXISTS FOR (c:Consultation) ON (c.etat)"),
+    ("consultation_start_time",
+     "CREATE INDEX consultation_start_time IF NOT EXISTS FOR (c:Consultation) ON (c.start_time)"),
+    ("doctor_email",
+     "CREATE INDEX doctor_email IF NOT EXISTS FOR (d:Doctor) ON (d.email)"),
+    ("doctor_specialite",
+     "CREATE INDEX doctor_specialite IF NOT EXISTS FOR (d:Doctor) ON (d.specialite)"),
+    ("rejected_doctor_request_id",
+     "CREATE INDEX rejected_doctor_request_id IF NOT EXISTS FOR (d:RejectedDoctor) ON (d.request_id)"),
+]
+
+# Requêtes chaudes dont le plan doit utiliser un index
+CYPHER_PLAN_CHECKS = [
+    ("doctor by id", "MATCH (d:Doctor {id: $id}) RETURN d", {"id": ""}),
+    ("patient by id", "MATCH (p:Patient {id: $id}) RETURN p", {"id": ""}),
+    ("consultation by id", "MATCH (c:Consultation {id: $id}) RETURN c", {"id": ""}),
+    ("consultation by mongo_id", "MATCH (c:Consultation {mongo_id: $id}) RETURN c", {"id": ""}),
+    ("doctors by specialite", "MATCH (d:Doctor {specialite: $s}) RETURN d", {"s": ""}),
+]
+
+MONGO_PLAN_CHECKS = [
+    ("identities by email", "identities", {"email": ""}),
+    ("patients by email", "patients", {"email": ""}),
+    ("doctors by email", "doctors", {"email": ""}),
+    ("consultations by etat", "consultations", {"etat": "demandée"}),
+]
+
+INDEX_OPERATORS = ("NodeIndexSeek", "NodeUniqueIndexSeek", "NodeIndexScan",
+                   "NodeIndexContainsScan", "NodeIndexEndsWithScan", "NodeIndexSeekByRange",
+                   "NodeUniqueIndexSeekByRange")
+SCAN_OPERATORS = ("AllNodesScan", "NodeByLabelScan")
+
+
+def _neo4j_schema_names(session):
+    names = {record["name"] for record in session.run("SHOW CONSTRAINTS YIELD name RETURN name")}
+    names |= {record["name"] for record in session.run("SHOW INDEXES YIELD name RETURN name")}
+    return names
+
+
+def bootstrap_schema():
+    # Retourne {"mongo": [...], "neo4j": [...]} avec ce qui a été créé
+    report = {"mongo": [], "neo4j": []}
+
+    ensure_identity_indexes()
+    for collection_name, keys, options in MONGO_INDEXES:
+        collection = db_services.mongo.db[collection_name]
+        if options["name"] not in collection.index_information():
+            collection.create_index(keys, **options)
+            report["mongo"].append(f"{collection_name}.{options['name']}")
+
+    with db_services.neo4j_driver.session() as session:
+        existing = _neo4j_schema_names(session)
+        for name, statement in NEO4J_SCHEMA:
+            if name not in existing:
+                session.run(statement).consume()
+                report["neo4j"].append(name)
+
+    return report
+
+
+def _plan_operators(plan):
+    operators = [plan.get("operatorType", "").split("@")[0]]
+    for child in plan.get("children", []):
+        operators.extend(_plan_operators(child))
+    return operators
+
+
+def _mongo_plan_stages(plan):
+    stages = [plan.get("stage")]
+    if "inputStage" in plan:
+        stages.extend(_mongo_plan_stages(plan["inputStage"]))
+    for child in plan.get("inputStages", []):
+        stages.extend(_mongo_plan_stages(child))
+    return stages
+
+
+def explain_queries():
+    # Vérifie via EXPLAIN que les requêtes chaudes passent par un index
+    results = []
+
+    with db_services.neo4j_driver.session() as session:
+        for label, query, params in CYPHER_PLAN_CHECKS:
+            plan = session.run("EXPLAIN " + query, params).consume().plan or {}
+            operators = _plan_operators(plan)
+            results.append({
+                "store": "neo4j",
+                "query": label,
+                "uses_index": any(op in INDEX_OPERATORS for op in operators),
+                "full_scan": any(op in SCAN_OPERATORS for op in operators),
+                "plan": operators,
+            })
+
+    for label, collection_name, query in MONGO_PLAN_CHECKS:
+        explain = db_services.mongo.db[collection_name].find(query).explain()
+        stages = _mongo_plan_stages(explain.get("queryPlanner", {}).get("winningPlan", {}))
+        results.append({
+            "store": "mongo",
+            "query": label,
+            "uses_index": "IXSCAN" in stages,
+            "full_scan": "COLLSCAN" in stages,
+            "plan": stages,
+        })
+
+    return results
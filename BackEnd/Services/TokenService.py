@@ -0,0 +1,254 @@
+# services/TokenService.py
+# Jetons signés (format JWT, HS256) émis au login : accès court (id + rôle), refresh long.
+# Un jeton d'accès est vérifié localement (HMAC, expiration, cache de révocation en mémoire) :
+# l'autorisation ne fait aucun aller-retour en base. Seul /auth/refresh relit l'identité
+# (compte supprimé, mot de passe changé) et la liste des refresh révoqués.
+
+import base64
+import hashlib
+import hmac
+import json
+import logging
+import secrets
+import threading
+import time
+from datetime import datetime, timezone
+
+from BackEnd.Services import db as db_services
+from BackEnd.Services.IdentityService import find_identity_by_user_id, USER_COLLECTIONS
+
+logger = logging.getLogger(__name__)
+
+ACCESS = "access"
+REFRESH = "refresh"
+
+_settings = {
+    "secret": None,
+    "access_ttl": 900,
+    "refresh_ttl": 7 * 24 * 3600,
+    "required": True,
+}
+
+_HEADER = base64.urlsafe_b64encode(json.dumps({"alg": "HS256", "typ": "JWT"}).encode()).rstrip(b"=")
+
+
+class InvalidToken(ValueError):
+    """Jeton absent, mal formé, mal signé, expiré ou révoqué"""
+
+
+class Principal:
+    __slots__ = ("user_id", "role", "claims")
+
+    def __init__(self, claims):
+        self.user_id = claims["sub"]
+        self.role = claims["role"]
+        self.claims = claims
+
+
+def configure_tokens(secret=None, access_ttl=None, refresh_ttl=None, required=None, allow_random_secret=False):
+    if required is not None:
+        _settings["required"] = required
+    if secret:
+        _settings["secret"] = secret.encode()
+    elif _settings["secret"] is None:
+        # Clé propre au processus : jetons invalides entre workers et après redémarrage
+        if _settings["required"] and not allow_random_secret:
+            raise RuntimeError("AUTH_TOKEN_SECRET manquant : clé de signature partagée par tous les workers requise "
+                               "(AUTH_ALLOW_RANDOM_SECRET=true pour le développement et les tests)")
+        logger.warning("AUTH_TOKEN_SECRET non défini : clé de signature aléatoire pour ce processus")
+        _settings["secret"] = secrets.token_bytes(32)
+    if access_ttl is not None:
+        _settings["access_ttl"] = access_ttl
+    if refresh_ttl is not None:
+        _settings["refresh_ttl"] = refresh_ttl
+
+
+def auth_required():
+    return _settings["required"]
+
+
+def _b64encode(data):
+    return base64.urlsafe_b64encode(data).rstrip(b"=")
+
+
+def _b64decode(data):
+    return base64.urlsafe_b64decode(data + b"=" * (-len(data) % 4))
+
+
+def _sign(signing_input):
+    if _settings["secret"] is None:
+        raise RuntimeError("configure_tokens() doit être appelé avant de signer ou vérifier un jeton")
+    return hmac.new(_settings["secret"], signing_input, hashlib.sha256).digest()
+
+
+def encode_token(claims):
+    signing_input = _HEADER + b"." + _b64encode(json.dumps(claims, separators=(",", ":")).encode())
+    return (signing_input + b"." + _b64encode(_sign(signing_input))).decode()
+
+
+def decode_token(token, expected_type=ACCESS):
+    """Claims d'un jeton valide du type attendu ; InvalidToken sinon"""
+    try:
+        signing_input, _, signature = token.encode().rpartition(b".")
+        header, _, payload = signing_input.partition(b".")
+        if header != _HEADER or not hmac.compare_digest(_b64decode(signature), _sign(signing_input)):
+            raise InvalidToken("Jeton invalide")
+        claims = json.loads(_b64decode(payload))
+    except (ValueError, TypeError, UnicodeError):
+        raise InvalidToken("Jeton invalide")
+
+    if claims.get("typ") != expected_type:
+        raise InvalidToken("Type de jeton invalide")
+    if claims.get("exp", 0) < time.time():
+        raise InvalidToken("Jeton expiré")
+    if revocations.is_revoked(claims):
+        raise InvalidToken("Jeton révoqué")
+    return claims
+
+
+def password_fingerprint(password_hash):
+    # Change avec le mot de passe : les refresh émis avant un changement sont refusés
+    return hashlib.sha256((password_hash or "").encode()).hexdigest()[:16]
+
+
+def issue_tokens(user_id, role, password_hash=None):
+    now = int(time.time())
+    common = {"sub": str(user_id), "role": role, "iat": now}
+    access = {**common, "typ": ACCESS, "exp": now + _settings["access_ttl"], "jti": secrets.token_hex(8)}
+    refresh = {**common, "typ": REFRESH, "exp": now + _settings["refresh_ttl"], "jti": secrets.token_hex(8),
+               "pwd": password_fingerprint(password_hash)}
+    return {
+        "access_token": encode_token(access),
+        "refresh_token": encode_token(refresh),
+        "token_type": "Bearer",
+        "expires_in": _settings["access_ttl"],
+    }
+
+
+def refresh_tokens(refresh_token):
+    """Nouveau couple de jetons ; le refresh présenté est révoqué (rotation)"""
+    claims = decode_token(refresh_token, REFRESH)
+    if revoked_tokens().find_one({"_id": claims["jti"]}, {"_id": 1}):
+        raise InvalidToken("Jeton révoqué")
+
+    identity = find_identity_by_user_id(claims["sub"])
+    if (not identity or identity["role"] not in USER_COLLECTIONS
+            or password_fingerprint(identity.get("mot_de_passe")) != claims.get("pwd")):
+        raise InvalidToken("Jeton révoqué")
+
+    revoke_token(claims)
+    return issue_tokens(claims["sub"], identity["role"], identity.get("mot_de_passe"))
+
+
+# ---------------------- Révocation ----------------------
+
+class RevocationCache:
+    """Jetons révoqués (jti) et utilisateurs révoqués avant une date, gardés jusqu'à expiration"""
+
+    def __init__(self, max_entries=10000):
+        self.max_entries = max_entries
+        self.tokens = {}  # jti -> exp
+        self.users = {}  # user_id -> (révoqué avant, exp)
+        self.lock = threading.Lock()
+
+    def _purge(self, now):
+        # Copies modifiées puis remplacées : is_revoked lit sans verrou
+        self.tokens = {jti: exp for jti, exp in self.tokens.items() if exp >= now}
+        self.users = {user_id: entry for user_id, entry in self.users.items() if entry[1] >= now}
+
+    def revoke_token(self, jti, exp):
+        with self.lock:
+            if len(self.tokens) >= self.max_entries:
+                self._purge(time.time())
+            self.tokens[jti] = exp
+
+    def revoke_user(self, user_id):
+        # Jetons d'accès déjà émis refusés jusqu'à leur expiration ; les refresh le sont par
+        # relecture de l'identité
+        now = time.time()
+        with self.lock:
+            if len(self.users) >= self.max_entries:
+                self._purge(now)
+            self.users[str(user_id)] = (now, now + _settings["access_ttl"])
+
+    def is_revoked(self, claims):
+        # Lectures de dict sans verrou : chemin de chaque requête
+        if claims.get("jti") in self.tokens:
+            return True
+        user = self.users.get(claims.get("sub"))
+        return user is not None and claims.get("iat", 0) < user[0]
+
+    def clear(self):
+        with self.lock:
+            self.tokens.clear()
+            self.users.clear()
+
+
+revocations = RevocationCache()
+
+
+def revoked_tokens():
+    return db_services.mongo.db.revoked_tokens
+
+
+def revoke_token(claims):
+    revocations.revoke_token(claims["jti"], claims["exp"])
+    if claims["typ"] == REFRESH:
+        # Partagé entre workers ; l'index TTL supprime l'entrée à l'expiration du jeton
+        revoked_tokens().update_one(
+            {"_id": claims["jti"]},
+            {"$set": {"expires_at": datetime.fromtimestamp(claims["exp"], tz=timezone.utc)}},
+            upsert=True
+        )
+
+
+def revoke_user(user_id):
+    revocations.revoke_user(user_id)
+
+
+# ---------------------- Autorisation ----------------------
+
+def principal_from_header(authorization):
+    """Principal du header Authorization (None sans jeton) ; InvalidToken si le jeton est refusé"""
+    if not authorization:
+        return None
+    scheme, _, token = authorization.partition(" ")
+    if scheme.lower() != "bearer" or not token:
+        raise InvalidToken("Header Authorization invalide")
+    return Principal(decode_token(token.strip()))
+
+
+def check_access(principal, roles=(), owner_role=None, owner_id=None):
+    """None si l'accès est permis, sinon (message, statut). L'admin a accès à tout."""
+    if not _settings["required"]:
+        return None
+    if principal is None:
+        return "Authentification requise", 401
+    if principal.role == "admin" or principal.role in roles:
+        return None
+    if owner_role is not None and principal.role == owner_role and principal.user_id == owner_id:
+        return None
+    return "Accès refusé", 403
+
+
+# Règles déclarées sur les vues ; vérifiées par le before_request de chaque blueprint
+
+def public(view):
+    """Vue accessible sans jeton (inscription, demande de compte)"""
+    view.auth_public = True
+    return view
+
+
+def allow(*roles):
+    """Rôles autorisés en plus du propriétaire de la ressource et de l'admin"""
+    def decorator(view):
+        view.auth_roles = roles
+        return view
+
+    return decorator
+
+
+def view_access(view, principal, owner_role=None, owner_id=None):
+    if view is None or getattr(view, "auth_public", False):
+        return None
+    return check_access(principal, getattr(view, "auth_roles", ()), owner_role, owner_id)
@@ -0,0 +1,172 @@
+# services/cache.py
+# Cache read-through (LRU + TTL) devant get_doctor / get_patient.
+# En mémoire par défaut ; backend Redis optionnel pour partager le cache entre workers.
+
+import copy
+import pickle
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+
+from BackEnd.Services.versions import entities_changed
+
+
+class MemoryBackend:
+    blocking = False
+
+    def __init__(self, max_entries=10000, ttl=60):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.entries = OrderedDict()  # key -> (expires_at, value)
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        # Returns (found, value, evicted)
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return False, None, 0
+            if entry[0] < time.monotonic():
+                del self.entries[key]
+                return False, None, 1
+            self.entries.move_to_end(key)
+            return True, entry[1], 0
+
+    def set(self, key, value):
+        evicted = 0
+        with self.lock:
+            self.entries[key] = (time.monotonic() + self.ttl, value)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+                evicted += 1
+        return evicted
+
+    def delete(self, key):
+        with self.lock:
+            self.entries.pop(key, None)
+
+    def clear(self, prefix):
+        with self.lock:
+            for key in [key for key in self.entries if key.startswith(prefix)]:
+                del self.entries[key]
+
+    def size(self):
+        return len(self.entries)
+
+
+class RedisBackend:
+    # Shared between workers; Redis handles expiry and eviction (maxmemory-policy).
+    # Synchronous client: the ASGI mode calls it off the event loop (AsyncService)
+    blocking = True
+
+    def __init__(self, url, ttl=60):
+        try:
+            import redis
+        except ImportError:
+            raise RuntimeError("CACHE_BACKEND=redis nécessite le paquet 'redis'")
+        self.client = redis.Redis.from_url(url)
+        self.ttl = ttl
+
+    def get(self, key):
+        raw = self.client.get(key)
+        if raw is None:
+            return False, None, 0
+        return True, pickle.loads(raw), 0
+
+    def set(self, key, value):
+        self.client.set(key, pickle.dumps(value), ex=max(int(self.ttl), 1))
+        return 0
+
+    def delete(self, key):
+        self.client.delete(key)
+
+    def clear(self, prefix):
+        # Only this cache's keys: the ETag versions (cabinet:version:*) share the database
+        for key in self.client.scan_iter(match=f"{prefix}*"):
+            self.client.delete(key)
+
+    def size(self):
+        return None
+
+
+class EntityCache:
+    def __init__(self, namespace, backend=None):
+        self.namespace = namespace
+        self.backend = backend or MemoryBackend()
+        # Counters are updated from every request thread
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @property
+    def blocking(self):
+        return self.backend.blocking
+
+    @property
+    def prefix(self):
+        return f"cabinet:{self.namespace}:"
+
+    def _key(self, entity_id):
+        return f"{self.prefix}{entity_id}"
+
+    def _count(self, hits=0, misses=0, evictions=0):
+        with self.lock:
+            self.hits += hits
+            self.misses += misses
+            self.evictions += evictions
+
+    def get(self, entity_id):
+        found, value, evicted = self.backend.get(self._key(entity_id))
+        self._count(hits=int(found), misses=int(not found), evictions=evicted)
+        return copy.deepcopy(value) if found else None
+
+    def set(self, entity_id, value):
+        self._count(evictions=self.backend.set(self._key(entity_id), copy.deepcopy(value)))
+
+    def invalidate(self, *entity_ids):
+        # Appelé à chaque écriture de l'entité : sa version (ETag) change aussi
+        entities_changed(self.namespace, *entity_ids)
+        for entity_id in entity_ids:
+            if entity_id:
+                self.backend.delete(self._key(entity_id))
+
+    def clear(self):
+        self.backend.clear(self.prefix)
+
+    def stats(self):
+        with self.lock:
+            counters = {"hits": self.hits, "misses": self.misses, "evictions": self.evictions}
+        return {**counters, "size": self.backend.size()}
+
+
+def read_through(cache):
+    # Décorateur pour les fonctions get_xxx(entity_id)
+    def decorator(fn):
+        @wraps(fn)
+        def wrapper(entity_id):
+            cached = cache.get(entity_id)
+            if cached is not None:
+                return cached
+            value = fn(entity_id)
+            if value is not None:
+                cache.set(entity_id, value)
+            return value
+
+        return wrapper
+
+    return decorator
+
+
+doctor_cache = EntityCache("doctor")
+patient_cache = EntityCache("patient")
+
+
+def configure_caches(max_entries=10000, ttl=60, backend="memory", redis_url=None):
+    for cache in (doctor_cache, patient_cache):
+        if backend == "redis":
+            cache.backend = RedisBackend(redis_url, ttl=ttl)
+        else:
+            cache.backend = MemoryBackend(max_entries=max_entries, ttl=ttl)
@@ -0,0 +1,86 @@
+# services/compression.py
+# Compression gzip / brotli des réponses volumineuses selon Accept-Encoding.
+# Brotli nécessite le paquet optionnel 'brotli' ; sans lui, gzip uniquement.
+# Les réponses en flux (NDJSON, export) ne sont pas compressées.
+
+import gzip
+
+COMPRESSIBLE_MIMETYPES = {"application/json", "text/csv", "text/plain", "text/html"}
+
+_settings = {
+    "enabled": True,
+    "min_size": 1024,
+    "gzip_level": 6,
+    "brotli_quality": 4,
+}
+
+
+def configure_compression(enabled=None, min_size=None, gzip_level=None, brotli_quality=None):
+    if enabled is not None:
+        _settings["enabled"] = enabled
+    if min_size is not None:
+        _settings["min_size"] = min_size
+    if gzip_level is not None:
+        _settings["gzip_level"] = gzip_level
+    if brotli_quality is not None:
+        _settings["brotli_quality"] = brotli_quality
+
+
+def _brotli():
+    try:
+        import brotli
+    except ImportError:
+        return None
+    return brotli
+
+
+def choose_encoding(accept_encodings):
+    # Qualité la plus haute parmi les encodages disponibles ; brotli à qualité égale
+    candidates = [("br", accept_encodings["br"])] if _brotli() else []
+    candidates.append(("gzip", accept_encodings["gzip"]))
+    encoding, quality = max(candidates, key=lambda candidate: candidate[1])
+    return encoding if quality > 0 else None
+
+
+def _negotiate(response, req):
+    # Encodage à appliquer, ou None ; Vary posé dès que la réponse pourrait être compressée
+    if not _settings["enabled"]:
+        return None
+    if response.status_code < 200 or response.status_code in (204, 304):
+        return None
+    if "Content-Encoding" in response.headers or response.mimetype not in COMPRESSIBLE_MIMETYPES:
+        return None
+
+    response.vary.add("Accept-Encoding")
+    if response.content_length is not None and response.content_length < _settings["min_size"]:
+        return None
+    return choose_encoding(req.accept_encodings)
+
+
+def _encode(data, encoding):
+    if encoding == "br":
+        return _brotli().compress(data, quality=_settings["brotli_quality"])
+    return gzip.compress(data, compresslevel=_settings["gzip_level"])
+
+
+def compress_response(response, req):
+    if response.direct_passthrough or response.is_streamed:
+        return response
+    encoding = _negotiate(response, req)
+    if encoding is not None:
+        response.set_data(_encode(response.get_data(), encoding))
+        response.headers["Content-Encoding"] = encoding
+    return response
+
+
+async def compress_async_response(response, req):
+    # Quart (asgi.py) : corps lu de façon asynchrone ; seuls les corps en mémoire sont compressés
+    from quart.wrappers.response import DataBody
+
+    if not isinstance(response.response, DataBody):
+        return response
+    encoding = _negotiate(response, req)
+    if encoding is not None:
+        response.set_data(_encode(await response.get_data(), encoding))
+        response.headers["Content-Encoding"] = encoding
+    return response
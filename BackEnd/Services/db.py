@@ -1,7 +1,26 @@
 # services/db.py
 
+from itertools import islice
+
 from flask_pymongo import PyMongo
 from neo4j import GraphDatabase
 
 mongo = None
 neo4j_driver = None
+
+# Mode ASGI (asgi.py) : base Mongo asynchrone et driver neo4j.AsyncGraphDatabase
+async_mongo_db = None
+async_neo4j_driver = None
+
+# Taille max des listes d'ids envoyées en une seule requête (UNWIND / $in)
+BATCH_SIZE = 1000
+
+
+def chunked(items, size=BATCH_SIZE):
+    """Découpe une liste (ou un itérable, ex. un curseur Mongo) en tranches de `size` éléments"""
+    iterator = iter(items)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
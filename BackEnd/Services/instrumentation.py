@@ -0,0 +1,355 @@
+# services/instrumentation.py
+# Opérations Mongo et requêtes Cypher comptées et chronométrées par requête HTTP.
+# Mongo : CommandListener du client (une commande envoyée = un aller-retour, getMore compris).
+# Neo4j : driver enveloppé, chaque run (session ou transaction) est mesuré jusqu'à la
+# consommation de son résultat. Les requêtes lentes alimentent services/slow_queries.py.
+# Totaux exposés dans Server-Timing / X-DB-Queries et une ligne de log JSON ; une même
+# requête exécutée plus de N fois dans une requête HTTP est signalée comme N+1.
+
+import contextvars
+import json
+import logging
+import re
+import time
+from collections import Counter
+
+from pymongo import monitoring
+
+from BackEnd.Services.metrics import neo4j_session_closed, neo4j_session_opened
+from BackEnd.Services.slow_queries import is_slow, normalize_cypher, record_slow_query, shape
+
+logger = logging.getLogger(__name__)
+
+STORES = ("mongo", "neo4j")
+
+_settings = {
+    "enabled": True,
+    "n_plus_one_threshold": 10,
+}
+
+# Statistiques de la requête HTTP en cours (None hors requête : worker outbox, CLI)
+_current = contextvars.ContextVar("db_request_stats", default=None)
+
+
+def configure_instrumentation(enabled=None, n_plus_one_threshold=None):
+    if enabled is not None:
+        _settings["enabled"] = enabled
+    if n_plus_one_threshold is not None:
+        _settings["n_plus_one_threshold"] = n_plus_one_threshold
+
+
+def normalize_statement(statement):
+    return re.sub(r"\s+", " ", statement).strip()
+
+
+class RequestStats:
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.counts = Counter()
+        self.durations = Counter()  # secondes par store
+        self.statements = Counter()  # (store, requête) -> exécutions
+        self.pending = {}  # commandes Mongo en vol
+
+    def record(self, store, statement, duration):
+        self.counts[store] += 1
+        self.durations[store] += duration
+        self.statements[(store, statement)] += 1
+
+    def repeated(self, threshold=None):
+        threshold = _settings["n_plus_one_threshold"] if threshold is None else threshold
+        return [
+            {"store": store, "statement": statement, "count": count}
+            for (store, statement), count in self.statements.most_common()
+            if count > threshold
+        ]
+
+    def headers(self):
+        total_ms = (time.perf_counter() - self.started) * 1000
+        timings = [
+            f'{store};dur={self.durations[store] * 1000:.2f};desc="{self.counts[store]} queries"'
+            for store in STORES
+        ]
+        timings.append(f"app;dur={total_ms:.2f}")
+        return {
+            "Server-Timing": ", ".join(timings),
+            "X-DB-Queries": ", ".join(f"{store}={self.counts[store]}" for store in STORES),
+        }
+
+    def summary(self):
+        return {
+            "duration_ms": round((time.perf_counter() - self.started) * 1000, 2),
+            **{store: {"count": self.counts[store], "ms": round(self.durations[store] * 1000, 2)}
+               for store in STORES},
+        }
+
+
+def start_request_stats():
+    stats = RequestStats() if _settings["enabled"] else None
+    _current.set(stats)
+    return stats
+
+
+def current_request_stats():
+    return _current.get()
+
+
+def finish_request_stats(stats, **fields):
+    """Ligne de log JSON de la requête ; WARNING si un motif N+1 est détecté"""
+    _current.set(None)
+    repeated = stats.repeated()
+    line = {**fields, **stats.summary()}
+    if repeated:
+        line["n_plus_one"] = repeated
+        logger.warning("db_stats %s", json.dumps(line, ensure_ascii=False))
+    else:
+        logger.info("db_stats %s", json.dumps(line, ensure_ascii=False))
+
+
+# ---------------------- Mongo ----------------------
+
+# Champs de protocole ignorés dans la forme d'une commande
+MONGO_META_FIELDS = {"lsid", "$db", "$clusterTime", "$readPreference", "txnNumber", "readConcern",
+                     "writeConcern", "startTransaction", "autocommit", "apiVersion"}
+
+
+def _mongo_rows(reply):
+    cursor = reply.get("cursor")
+    if isinstance(cursor, dict):
+        return len(cursor.get("firstBatch", cursor.get("nextBatch", [])))
+    return reply.get("n")
+
+
+class MongoCommandStats(monitoring.CommandListener):
+    # Appelé dans le thread (ou la tâche) qui exécute la commande : le contexte de la requête est visible
+    def __init__(self):
+        self.pending = {}  # request_id -> (stats, libellé, commande)
+
+    def started(self, event):
+        target = event.command.get(event.command_name)
+        if not isinstance(target, str):
+            target = event.command.get("collection", "")
+        label = f"{event.command_name} {target}".strip()
+        self.pending[event.request_id] = (_current.get(), label, event.command)
+
+    def succeeded(self, event):
+        self._finish(event, event.reply)
+
+    def failed(self, event):
+        self._finish(event, {})
+
+    def _finish(self, event, reply):
+        stats, label, command = self.pending.pop(event.request_id, (None, event.command_name, {}))
+        duration = event.duration_micros / 1e6
+        if stats is not None:
+            stats.record("mongo", label, duration)
+        if is_slow(duration):
+            params = {key: value for key, value in command.items()
+                      if key != event.command_name and key not in MONGO_META_FIELDS}
+            statement = f"{label} {json.dumps(shape(params, sizes=False), sort_keys=True)}"
+            record_slow_query("mongo", statement, params, duration, _mongo_rows(reply))
+
+
+# ---------------------- Neo4j ----------------------
+
+class _TimedResult:
+    # Résultat Cypher chronométré jusqu'à sa consommation complète, lignes comptées au passage
+    def __init__(self, result, on_done):
+        self.result = result
+        self.on_done = on_done
+        self.rows = 0
+        self.done = False
+
+    def finish(self):
+        if not self.done:
+            self.done = True
+            self.on_done(self.rows)
+
+    def __iter__(self):
+        for record in self.result:
+            self.rows += 1
+            yield record
+        self.finish()
+
+    def single(self, *args, **kwargs):
+        record = self.result.single(*args, **kwargs)
+        self.rows += record is not None
+        self.finish()
+        return record
+
+    def _all(self, method, *args, **kwargs):
+        rows = getattr(self.result, method)(*args, **kwargs)
+        self.rows += len(rows)
+        self.finish()
+        return rows
+
+    def data(self, *args, **kwargs):
+        return self._all("data", *args, **kwargs)
+
+    def values(self, *args, **kwargs):
+        return self._all("values", *args, **kwargs)
+
+    def value(self, *args, **kwargs):
+        return self._all("value", *args, **kwargs)
+
+    def consume(self):
+        summary = self.result.consume()
+        self.finish()
+        return summary
+
+    def __getattr__(self, name):
+        return getattr(self.result, name)
+
+
+class _InstrumentedRunner:
+    # Session ou transaction : chaque run() est mesuré jusqu'à la consommation de son résultat
+    def __init__(self, target):
+        self.target = target
+        self.results = []
+
+    result_class = _TimedResult
+
+    def run(self, query, *args, **kwargs):
+        started = time.perf_counter()
+        return self._timed(self.target.run(query, *args, **kwargs), started, query, args, kwargs)
+
+    def _timed(self, result, started, query, args, kwargs):
+        stats = _current.get()
+        text = str(query)
+        params = {**(args[0] if args and isinstance(args[0], dict) else {}), **kwargs}
+
+        def on_done(rows):
+            duration = time.perf_counter() - started
+            if stats is not None:
+                stats.record("neo4j", normalize_statement(text), duration)
+            if is_slow(duration):
+                record_slow_query("neo4j", normalize_cypher(text), params, duration, rows)
+
+        timed = self.result_class(result, on_done)
+        self.results.append(timed)
+        return timed
+
+    def finish_results(self):
+        # Résultats non lus à la fermeture : mesurés jusque-là
+        for result in self.results:
+            result.finish()
+        self.results = []
+
+    def __getattr__(self, name):
+        return getattr(self.target, name)
+
+
+class _InstrumentedSession(_InstrumentedRunner):
+    def __enter__(self):
+        self.target.__enter__()
+        neo4j_session_opened()
+        return self
+
+    def __exit__(self, *exc):
+        self.finish_results()
+        neo4j_session_closed()
+        return self.target.__exit__(*exc)
+
+    def _transaction(self, name, work, *args, **kwargs):
+        def instrumented_work(tx, *a, **k):
+            runner = _InstrumentedRunner(tx)
+            try:
+                return work(runner, *a, **k)
+            finally:
+                runner.finish_results()
+
+        return getattr(self.target, name)(instrumented_work, *args, **kwargs)
+
+    def execute_write(self, work, *args, **kwargs):
+        return self._transaction("execute_write", work, *args, **kwargs)
+
+    def execute_read(self, work, *args, **kwargs):
+        return self._transaction("execute_read", work, *args, **kwargs)
+
+    def write_transaction(self, work, *args, **kwargs):
+        return self._transaction("write_transaction", work, *args, **kwargs)
+
+    def read_transaction(self, work, *args, **kwargs):
+        return self._transaction("read_transaction", work, *args, **kwargs)
+
+
+class InstrumentedDriver:
+    """Enveloppe du driver Neo4j partagé ; le reste de l'API est délégué tel quel"""
+
+    def __init__(self, driver):
+        self.driver = driver
+
+    def session(self, **kwargs):
+        return _InstrumentedSession(self.driver.session(**kwargs))
+
+    def __getattr__(self, name):
+        return getattr(self.driver, name)
+
+
+# ---------------------- Neo4j asynchrone (mode ASGI) ----------------------
+
+class _AsyncTimedResult(_TimedResult):
+    async def __aiter__(self):
+        async for record in self.result:
+            self.rows += 1
+            yield record
+        self.finish()
+
+    async def single(self, *args, **kwargs):
+        record = await self.result.single(*args, **kwargs)
+        self.rows += record is not None
+        self.finish()
+        return record
+
+    async def _all(self, method, *args, **kwargs):
+        rows = await getattr(self.result, method)(*args, **kwargs)
+        self.rows += len(rows)
+        self.finish()
+        return rows
+
+    async def consume(self):
+        summary = await self.result.consume()
+        self.finish()
+        return summary
+
+
+class _AsyncInstrumentedRunner(_InstrumentedRunner):
+    result_class = _AsyncTimedResult
+
+    async def run(self, query, *args, **kwargs):
+        started = time.perf_counter()
+        return self._timed(await self.target.run(query, *args, **kwargs), started, query, args, kwargs)
+
+
+class _AsyncInstrumentedSession(_AsyncInstrumentedRunner):
+    async def __aenter__(self):
+        await self.target.__aenter__()
+        neo4j_session_opened()
+        return self
+
+    async def __aexit__(self, *exc):
+        self.finish_results()
+        neo4j_session_closed()
+        return await self.target.__aexit__(*exc)
+
+    async def _transaction(self, name, work, *args, **kwargs):
+        async def instrumented_work(tx, *a, **k):
+            runner = _AsyncInstrumentedRunner(tx)
+            try:
+                return await work(runner, *a, **k)
+            finally:
+                runner.finish_results()
+
+        return await getattr(self.target, name)(instrumented_work, *args, **kwargs)
+
+    async def execute_write(self, work, *args, **kwargs):
+        return await self._transaction("execute_write", work, *args, **kwargs)
+
+    async def execute_read(self, work, *args, **kwargs):
+        return await self._transaction("execute_read", work, *args, **kwargs)
+
+
+class AsyncInstrumentedDriver(InstrumentedDriver):
+    """Même enveloppe pour neo4j.AsyncGraphDatabase.driver(...) (asgi.py)"""
+
+    def session(self, **kwargs):
+        return _AsyncInstrumentedSession(self.driver.session(**kwargs))
@@ -0,0 +1,278 @@
+# services/metrics.py
+# Métriques au format texte Prometheus (/metrics) : latence par route (histogramme), requêtes
+# en cours, erreurs par statut, temps passé dans Mongo/Neo4j, pools de connexions, caches.
+# Enregistrement sans verrou : chaque thread écrit dans son propre fragment ; les fragments
+# ne sont additionnés qu'à la lecture de /metrics (ceux des threads terminés sont alors repliés).
+# Les valeurs sont propres au processus : un worker = une cible de scrape.
+
+import threading
+import weakref
+from bisect import bisect_left
+
+from pymongo import monitoring
+
+from BackEnd.Services.cache import doctor_cache, patient_cache
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Secondes (bornes "le" inclusives)
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Au-delà, les fragments des threads terminés sont repliés dès l'enregistrement d'un nouveau thread
+MAX_SHARDS = 256
+
+METRICS = {
+    "http_requests_total": ("counter", "Requêtes HTTP traitées"),
+    "http_request_errors_total": ("counter", "Réponses HTTP en erreur (statut >= 400)"),
+    "http_request_duration_seconds": ("histogram", "Latence des requêtes HTTP jusqu'aux en-têtes"),
+    "http_requests_in_flight": ("gauge", "Requêtes HTTP en cours"),
+    "db_queries_total": ("counter", "Opérations Mongo et requêtes Cypher par route"),
+    "db_duration_seconds_total": ("counter", "Temps passé dans Mongo et Neo4j par route"),
+    "mongo_pool_connections": ("gauge", "Connexions du pool Mongo (open, checked_out)"),
+    "mongo_pool_checkout_failures_total": ("counter", "Échecs d'obtention d'une connexion Mongo"),
+    "mongo_pool_max_size": ("gauge", "Taille maximale du pool Mongo par serveur"),
+    "neo4j_sessions_active": ("gauge", "Sessions Neo4j ouvertes (une connexion du pool chacune)"),
+    "cache_requests_total": ("counter", "Lectures des caches d'entités"),
+    "cache_hit_ratio": ("gauge", "Part des lectures servies par le cache"),
+    "cache_evictions_total": ("counter", "Entrées évincées des caches"),
+    "cache_entries": ("gauge", "Entrées en cache (cache mémoire uniquement)"),
+}
+
+
+class _Shard:
+    def __init__(self, thread=None):
+        self.thread = weakref.ref(thread) if thread is not None else None
+        self.values = {}  # (nom, labels) -> valeur (compteurs et jauges)
+        self.histograms = {}  # (nom, labels) -> [compte par tranche..., +Inf, somme, total]
+
+    def alive(self):
+        thread = self.thread() if self.thread is not None else None
+        return thread is not None and thread.is_alive()
+
+    def merge_into(self, values, histograms):
+        for key, value in self.values.copy().items():
+            values[key] = values.get(key, 0) + value
+        for key, buckets in self.histograms.copy().items():
+            total = histograms.get(key)
+            if total is None:
+                histograms[key] = list(buckets)
+            else:
+                for i, count in enumerate(buckets):
+                    total[i] += count
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self.local = threading.local()
+        self.lock = threading.Lock()  # enregistrement d'un thread et lecture uniquement
+        self.shards = []
+        self.retired = _Shard()
+        self.collectors = []
+
+    def _shard(self):
+        shard = getattr(self.local, "shard", None)
+        if shard is None:
+            shard = self.local.shard = _Shard(threading.current_thread())
+            with self.lock:
+                if len(self.shards) >= MAX_SHARDS:
+                    self._fold()
+                self.shards.append(shard)
+        return shard
+
+    def _fold(self):
+        alive = []
+        for shard in self.shards:
+            if shard.alive():
+                alive.append(shard)
+            else:
+                shard.merge_into(self.retired.values, self.retired.histograms)
+        self.shards = alive
+
+    def inc(self, name, labels=(), amount=1):
+        values = self._shard().values
+        key = (name, labels)
+        values[key] = values.get(key, 0) + amount
+
+    def observe(self, name, labels, value):
+        histograms = self._shard().histograms
+        key = (name, labels)
+        buckets = histograms.get(key)
+        if buckets is None:
+            buckets = histograms[key] = [0] * (len(LATENCY_BUCKETS) + 3)
+        buckets[bisect_left(LATENCY_BUCKETS, value)] += 1
+        buckets[-2] += value
+        buckets[-1] += 1
+
+    def add_collector(self, collector):
+        # collector() -> [(nom, labels, valeur)] calculés à la lecture
+        self.collectors.append(collector)
+
+    def snapshot(self):
+        with self.lock:
+            self._fold()
+            values = dict(self.retired.values)
+            histograms = {key: list(buckets) for key, buckets in self.retired.histograms.items()}
+            for shard in self.shards:
+                shard.merge_into(values, histograms)
+        for collector in self.collectors:
+            for name, labels, value in collector():
+                values[(name, labels)] = value
+        return values, histograms
+
+
+registry = MetricsRegistry()
+
+_settings = {"enabled": True}
+
+
+def configure_metrics(enabled=None):
+    if enabled is not None:
+        _settings["enabled"] = enabled
+
+
+def metrics_enabled():
+    return _settings["enabled"]
+
+
+# ---------------------- Requêtes HTTP ----------------------
+
+def request_started(route):
+    registry.inc("http_requests_in_flight", (("route", route),))
+
+
+def request_finished(route):
+    # teardown_request : appelé même si la vue a levé une exception
+    registry.inc("http_requests_in_flight", (("route", route),), -1)
+
+
+def record_request(method, route, blueprint, status, duration, db_stats=None):
+    labels = (("method", method), ("route", route), ("blueprint", blueprint))
+    registry.observe("http_request_duration_seconds", labels, duration)
+    registry.inc("http_requests_total", labels + (("status", str(status)),))
+    if status >= 400:
+        registry.inc("http_request_errors_total", labels + (("status", str(status)),))
+    if db_stats is not None:
+        for store in ("mongo", "neo4j"):
+            store_labels = (("route", route), ("store", store))
+            registry.inc("db_queries_total", store_labels, db_stats.counts[store])
+            registry.inc("db_duration_seconds_total", store_labels, db_stats.durations[store])
+
+
+# ---------------------- Pools de connexions ----------------------
+
+class MongoPoolMetrics(monitoring.ConnectionPoolListener):
+    def pool_created(self, event):
+        pass
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        pass
+
+    def pool_closed(self, event):
+        pass
+
+    def connection_created(self, event):
+        registry.inc("mongo_pool_connections", (("state", "open"),))
+
+    def connection_ready(self, event):
+        pass
+
+    def connection_closed(self, event):
+        registry.inc("mongo_pool_connections", (("state", "open"),), -1)
+
+    def connection_check_out_started(self, event):
+        pass
+
+    def connection_check_out_failed(self, event):
+        registry.inc("mongo_pool_checkout_failures_total", (("reason", str(event.reason)),))
+
+    def connection_checked_out(self, event):
+        registry.inc("mongo_pool_connections", (("state", "checked_out"),))
+
+    def connection_checked_in(self, event):
+        registry.inc("mongo_pool_connections", (("state", "checked_out"),), -1)
+
+
+def neo4j_session_opened():
+    registry.inc("neo4j_sessions_active")
+
+
+def neo4j_session_closed():
+    registry.inc("neo4j_sessions_active", (), -1)
+
+
+def watch_mongo_pool(client):
+    # Clients sans options de pool (doubles de test) : pas de jauge plutôt qu'un /metrics en erreur
+    pool_options = getattr(getattr(client, "options", None), "pool_options", None)
+    if pool_options is None:
+        return
+    registry.add_collector(lambda: [("mongo_pool_max_size", (), pool_options.max_pool_size)])
+
+
+# ---------------------- Caches ----------------------
+
+def _cache_metrics():
+    samples = []
+    for cache in (doctor_cache, patient_cache):
+        stats = cache.stats()
+        labels = (("cache", cache.namespace),)
+        reads = stats["hits"] + stats["misses"]
+        samples += [
+            ("cache_requests_total", labels + (("result", "hit"),), stats["hits"]),
+            ("cache_requests_total", labels + (("result", "miss"),), stats["misses"]),
+            ("cache_hit_ratio", labels, stats["hits"] / reads if reads else 0),
+            ("cache_evictions_total", labels, stats["evictions"]),
+        ]
+        if stats["size"] is not None:
+            samples.append(("cache_entries", labels, stats["size"]))
+    return samples
+
+
+registry.add_collector(_cache_metrics)
+
+
+# ---------------------- Exposition ----------------------
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(labels):
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape(value)}"' for key, value in labels) + "}"
+
+
+def _format_value(value):
+    if isinstance(value, float):
+        return repr(value)
+    return str(value)
+
+
+def render_metrics():
+    values, histograms = registry.snapshot()
+    series = {}
+    for (name, labels), value in values.items():
+        series.setdefault(name, []).append((labels, value))
+    for (name, labels), buckets in histograms.items():
+        series.setdefault(name, []).append((labels, buckets))
+
+    lines = []
+    for name, (kind, help_text) in METRICS.items():
+        if name not in series:
+            continue
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} {kind}")
+        for labels, value in sorted(series[name], key=lambda item: item[0]):
+            if kind != "histogram":
+                lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+                continue
+            cumulative = 0
+            for bound, count in zip((*LATENCY_BUCKETS, "+Inf"), value):
+                cumulative += count
+                lines.append(f"{name}_bucket{_format_labels(labels + (('le', bound),))} {cumulative}")
+            lines.append(f"{name}_sum{_format_labels(labels)} {_format_value(value[-2])}")
+            lines.append(f"{name}_count{_format_labels(labels)} {value[-1]}")
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,54 @@
+# services/pagination.py
+# Pagination par curseur (keyset) sur _id pour les listings
+
+from bson import ObjectId
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 500
+
+
+def parse_page_args(args, config=None):
+    # Lit limit/after depuis les query params, borné par PAGE_SIZE_MAX
+    config = config or {}
+    default_size = config.get("PAGE_SIZE_DEFAULT", DEFAULT_PAGE_SIZE)
+    max_size = config.get("PAGE_SIZE_MAX", MAX_PAGE_SIZE)
+
+    try:
+        limit = int(args.get("limit", default_size))
+    except (TypeError, ValueError):
+        raise ValueError("Paramètre limit invalide")
+    if limit < 1:
+        raise ValueError("Paramètre limit invalide")
+
+    after = args.get("after") or None
+    if after is not None and not ObjectId.is_valid(after):
+        raise ValueError("Curseur after invalide")
+
+    return min(limit, max_size), after
+
+
+def _after_query(query, after):
+    query = dict(query or {})
+    if after is not None:
+        query["_id"] = {"$gt": ObjectId(after)}
+    return query
+
+
+def find_page(collection, query=None, limit=None, after=None, projection=None):
+    # Retourne (documents, next_cursor) triés par _id ; next_cursor est None sur la dernière page
+    cursor = collection.find(_after_query(query, after), projection).sort("_id", 1)
+    if limit is None:
+        return list(cursor), None
+
+    # Un document de plus pour savoir s'il existe une page suivante
+    docs = list(cursor.limit(limit + 1))
+    if len(docs) > limit:
+        docs = docs[:limit]
+        return docs, str(docs[-1]["_id"])
+    return docs, None
+
+
+def iter_documents(collection, query=None, after=None, projection=None, batch_size=1000):
+    # Parcourt la collection par lots via le curseur, sans tout charger en mémoire
+    cursor = collection.find(_after_query(query, after), projection).sort("_id", 1)
+    return cursor.batch_size(batch_size)
@@ -0,0 +1,97 @@
+# services/projection.py
+# Champs renvoyés par les lectures : ?fields=nom,prenom,email devient une projection Mongo,
+# seuls ces champs quittent la base ; les enrichissements Neo4j (doctor_id, patient_count...)
+# ne sont calculés que s'ils sont demandés. Sans fields=, les listings utilisent une
+# projection légère, le détail d'une entité tous ses champs ; fields=all pour tout avoir.
+# Les champs secrets ne sortent jamais : exclus de toute projection et retirés de chaque
+# réponse JSON / NDJSON (filet de sécurité pour les lectures hors de ce module).
+
+from flask.json.provider import DefaultJSONProvider
+
+SECRET_FIELDS = frozenset({"mot_de_passe", "password"})
+# Champs techniques des documents, jamais renvoyés non plus (OutboxService.OUTBOX_FIELD)
+HIDDEN_FIELDS = SECRET_FIELDS | {"_outbox"}
+
+ALL_FIELDS = "all"
+
+# Champs publics par type d'entité
+PUBLIC_FIELDS = {
+    "patient": ("nom", "prenom", "email", "tel", "date_naissance", "maladie", "description_maladie",
+                "role", "doctor_id"),
+    "doctor": ("nom", "prenom", "email", "tel", "specialite", "role", "created_at",
+               "patient_ids", "patient_count"),
+    "pending_doctor": ("nom", "prenom", "email", "tel", "specialite", "status", "created_at"),
+    "consultation": ("patient_id", "doctor_id", "date", "date_str", "etat", "description", "created_at"),
+}
+
+# Champs venant de Neo4j : jamais demandés à Mongo
+COMPUTED_FIELDS = {
+    "patient": frozenset({"doctor_id"}),
+    "doctor": frozenset({"patient_ids", "patient_count"}),
+    "pending_doctor": frozenset(),
+    "consultation": frozenset({"patient_id", "doctor_id", "date", "etat", "description"}),
+}
+
+# Projection des listings sans fields= : ce qu'affichent les tableaux (pas de texte libre)
+DEFAULT_LIST_FIELDS = {
+    "patient": ("nom", "prenom", "email", "tel", "date_naissance", "maladie", "doctor_id"),
+    "doctor": ("nom", "prenom", "email", "tel", "specialite", "created_at", "patient_count"),
+    "pending_doctor": ("nom", "prenom", "email", "tel", "specialite", "status", "created_at"),
+    "consultation": ("patient_id", "doctor_id", "date", "date_str", "etat", "description", "created_at"),
+}
+
+
+def parse_fields(args, entity, listing=True):
+    """?fields= -> tuple de champs, ou None pour tous les champs publics"""
+    raw = args.get("fields")
+    if raw is None:
+        return DEFAULT_LIST_FIELDS[entity] if listing else None
+    if raw.strip() == ALL_FIELDS:
+        return None
+
+    fields = tuple(dict.fromkeys(field.strip() for field in raw.split(",") if field.strip()))
+    invalid = [field for field in fields if field not in PUBLIC_FIELDS[entity] and field != "_id"]
+    if not fields or invalid:
+        raise ValueError(
+            f"Paramètre fields invalide. Options valides: {ALL_FIELDS}, {', '.join(PUBLIC_FIELDS[entity])}"
+        )
+    return tuple(field for field in fields if field != "_id")
+
+
+def wants(fields, name):
+    return fields is None or name in fields
+
+
+def mongo_projection(entity, fields=None):
+    # Inclusion des seuls champs stockés dans Mongo ; sinon exclusion des secrets
+    if fields is None:
+        return {field: 0 for field in HIDDEN_FIELDS}
+    projection = {field: 1 for field in fields if field not in COMPUTED_FIELDS[entity]}
+    return projection or {"_id": 1}
+
+
+def select_fields(doc, fields):
+    # Document déjà chargé (cache d'entités) restreint aux champs demandés
+    if fields is None:
+        return strip_secrets(doc)
+    return {key: value for key, value in doc.items() if key == "_id" or key in fields}
+
+
+_CONTAINERS = (dict, list, tuple)
+
+
+def strip_secrets(value):
+    # Copie sans les clés secrètes ; seuls les conteneurs sont parcourus (pas d'appel par valeur)
+    if isinstance(value, dict):
+        return {key: strip_secrets(item) if isinstance(item, _CONTAINERS) else item
+                for key, item in value.items() if key not in HIDDEN_FIELDS}
+    if isinstance(value, (list, tuple)):
+        return [strip_secrets(item) if isinstance(item, _CONTAINERS) else item for item in value]
+    return value
+
+
+class PublicJSONProvider(DefaultJSONProvider):
+    """jsonify : les champs secrets sont retirés de toute réponse (dumps reste intact : corps de requête)"""
+
+    def response(self, *args, **kwargs):
+        return super().response(*strip_secrets(args), **strip_secrets(kwargs))
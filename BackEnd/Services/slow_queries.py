@@ -0,0 +1,154 @@
+# services/slow_queries.py
+# Journal des requêtes lentes (Mongo et Cypher) alimenté par services/instrumentation.py.
+# Au-delà du seuil : texte normalisé, forme des paramètres (jamais les valeurs : données
+# médicales), durée, nombre de lignes et fonction de service appelante. Le log est
+# échantillonné ; le classement en mémoire des pires requêtes est toujours mis à jour.
+
+import json
+import logging
+import random
+import re
+import sys
+import threading
+from datetime import datetime
+
+logger = logging.getLogger(__name__)
+
+_settings = {
+    "enabled": True,
+    "threshold": 0.1,  # secondes
+    "sample_rate": 1.0,
+    "top_n": 50,
+}
+
+# Modules traversés sans être retenus comme appelant
+_INTERNAL_MODULES = {
+    "BackEnd.Services.db",
+    "BackEnd.Services.instrumentation",
+    "BackEnd.Services.slow_queries",
+    "BackEnd.Services.metrics",
+}
+
+MAX_SHAPE_DEPTH = 6
+
+
+def configure_slow_queries(enabled=None, threshold_ms=None, sample_rate=None, top_n=None):
+    if enabled is not None:
+        _settings["enabled"] = enabled
+    if threshold_ms is not None:
+        _settings["threshold"] = threshold_ms / 1000
+    if sample_rate is not None:
+        _settings["sample_rate"] = sample_rate
+    if top_n is not None:
+        _settings["top_n"] = top_n
+
+
+def is_slow(duration):
+    return _settings["enabled"] and duration >= _settings["threshold"]
+
+
+def normalize_cypher(query):
+    # Littéraux éventuellement interpolés remplacés : seul le texte de la requête est conservé
+    query = re.sub(r"'(?:[^'\\]|\\.)*'|\"(?:[^\"\\]|\\.)*\"", "?", query)
+    query = re.sub(r"(?<![\w$])\d+(?:\.\d+)?\b", "?", query)
+    return re.sub(r"\s+", " ", query).strip()
+
+
+def shape(value, sizes=True, depth=0):
+    """Structure d'un paramètre sans ses valeurs : {"_id": {"$in": "list[ObjectId x1000]"}}"""
+    if depth >= MAX_SHAPE_DEPTH:
+        return "..."
+    if isinstance(value, dict):
+        return {str(key): shape(item, sizes, depth + 1) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        if not value:
+            return "list[]"
+        first = value[0]
+        if isinstance(first, (dict, list, tuple)):
+            return {"list": len(value) if sizes else "n", "of": shape(first, sizes, depth + 1)}
+        return f"list[{type(first).__name__} x{len(value)}]" if sizes else f"list[{type(first).__name__}]"
+    if value is None:
+        return "null"
+    return type(value).__name__
+
+
+def find_caller():
+    # Première fonction des services (ou des routes) dans la pile d'appel
+    frame = sys._getframe(1)
+    fallback = None
+    while frame is not None:
+        module = frame.f_globals.get("__name__", "")
+        if frame.f_code.co_name.startswith("<"):
+            # Compréhension ou lambda : la fonction englobante est plus haut dans la pile
+            pass
+        elif module.startswith("BackEnd.Services.") and module not in _INTERNAL_MODULES:
+            return f"{module.rsplit('.', 1)[-1]}.{frame.f_code.co_name}"
+        elif fallback is None and module.startswith(("BackEnd.Routes.", "Routes.")):
+            fallback = f"{module.rsplit('.', 1)[-1]}.{frame.f_code.co_name}"
+        frame = frame.f_back
+    return fallback or "?"
+
+
+class SlowQueryLog:
+    """Pires requêtes par texte normalisé ; borné à 4 x top_n entrées"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.entries = {}
+
+    def add(self, store, statement, params, duration, rows, caller):
+        duration_ms = round(duration * 1000, 2)
+        now = datetime.utcnow().isoformat()
+        with self.lock:
+            entry = self.entries.get((store, statement))
+            if entry is None:
+                if len(self.entries) >= 4 * _settings["top_n"]:
+                    weakest = min(self.entries, key=lambda key: self.entries[key]["max_ms"])
+                    del self.entries[weakest]
+                entry = self.entries[(store, statement)] = {
+                    "store": store, "statement": statement, "count": 0, "total_ms": 0.0, "max_ms": 0.0,
+                }
+            entry["count"] += 1
+            entry["total_ms"] = round(entry["total_ms"] + duration_ms, 2)
+            entry["last_seen"] = now
+            if duration_ms >= entry["max_ms"]:
+                entry.update(max_ms=duration_ms, params=params, rows=rows, caller=caller, worst_at=now)
+
+    def top(self, limit=None, sort="max_ms"):
+        with self.lock:
+            entries = [dict(entry) for entry in self.entries.values()]
+        for entry in entries:
+            entry["mean_ms"] = round(entry["total_ms"] / entry["count"], 2)
+        entries.sort(key=lambda entry: entry[sort], reverse=True)
+        return entries[:limit or _settings["top_n"]]
+
+    def reset(self):
+        with self.lock:
+            self.entries.clear()
+
+
+slow_query_log = SlowQueryLog()
+
+SLOW_QUERY_SORTS = ("max_ms", "total_ms", "mean_ms", "count")
+
+
+def record_slow_query(store, statement, params, duration, rows):
+    """À n'appeler qu'après is_slow(duration) : la forme et l'appelant ne sont calculés qu'ici"""
+    params_shape = shape(params)
+    caller = find_caller()
+    slow_query_log.add(store, statement, params_shape, duration, rows, caller)
+    if random.random() < _settings["sample_rate"]:
+        logger.warning("slow_query %s", json.dumps({
+            "store": store,
+            "statement": statement,
+            "params": params_shape,
+            "duration_ms": round(duration * 1000, 2),
+            "rows": rows,
+            "caller": caller,
+        }, ensure_ascii=False))
+
+
+def top_slow_queries(limit=None, sort="max_ms"):
+    if sort not in SLOW_QUERY_SORTS:
+        raise ValueError(f"Tri invalide. Options valides: {', '.join(SLOW_QUERY_SORTS)}")
+    return slow_query_log.top(limit, sort)
@@ -0,0 +1,22 @@
+# services/streaming.py
+# Réponses NDJSON (une ligne JSON par document) pour les gros listings
+
+from flask import Response, current_app, stream_with_context
+
+from BackEnd.Services.projection import strip_secrets
+
+NDJSON_MIMETYPE = "application/x-ndjson"
+
+
+def wants_ndjson(req):
+    # Opt-in explicite : Accept: application/x-ndjson
+    return req.accept_mimetypes.best_match(["application/json", NDJSON_MIMETYPE]) == NDJSON_MIMETYPE
+
+
+def ndjson_response(documents):
+    # `documents` est un générateur : rien n'est matérialisé côté serveur
+    def generate():
+        for doc in documents:
+            yield current_app.json.dumps(strip_secrets(doc)) + "\n"
+
+    return Response(stream_with_context(generate()), mimetype=NDJSON_MIMETYPE)
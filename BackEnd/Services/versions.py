@@ -0,0 +1,156 @@
+# services/versions.py
+# Compteurs de version par collection ou par entité, incrémentés par les services d'écriture
+# (et par le worker outbox quand Neo4j est mis à jour). Les routes de lecture en dérivent un
+# ETag faible : If-None-Match identique -> 304 sans aucune requête Mongo ni Neo4j.
+#
+# Backend "memory" : compteurs propres au worker ; le jeton inclut une tranche de CACHE_TTL,
+# donc un autre worker qui a écrit est vu au plus tard après CACHE_TTL (comme le cache d'entités).
+# Backend "redis" : compteurs partagés entre workers, exacts.
+
+import hashlib
+import threading
+import time
+import uuid
+from functools import wraps
+
+from flask import current_app, make_response, request
+
+# Collection Mongo listée par /admin/<collection> pour chaque type d'entité
+ENTITY_COLLECTIONS = {"doctor": "doctors", "patient": "patients"}
+
+# Toute liste de consultations : modifications sans docteur/patient connu (suppressions, import)
+ALL_CONSULTATIONS = "consultations"
+
+
+class MemoryVersions:
+    blocking = False
+
+    def __init__(self, ttl=60):
+        self.ttl = ttl
+        self.epoch = uuid.uuid4().hex[:8]
+        self.values = {}
+        self.lock = threading.Lock()
+
+    def bump(self, scopes):
+        with self.lock:
+            for scope in scopes:
+                self.values[scope] = self.values.get(scope, 0) + 1
+
+    def current(self, scopes):
+        token = f"{self.epoch}.{int(time.time() // max(self.ttl, 1))}"
+        return token, [self.values.get(scope, 0) for scope in scopes]
+
+
+class RedisVersions:
+    PREFIX = "cabinet:version:"
+    # Client Redis synchrone : appelé hors de la boucle d'événements en mode ASGI
+    blocking = True
+
+    def __init__(self, url):
+        try:
+            import redis
+        except ImportError:
+            raise RuntimeError("CACHE_BACKEND=redis nécessite le paquet 'redis'")
+        self.client = redis.Redis.from_url(url)
+
+    def bump(self, scopes):
+        pipeline = self.client.pipeline(transaction=False)
+        for scope in scopes:
+            pipeline.incr(self.PREFIX + scope)
+        pipeline.execute()
+
+    def current(self, scopes):
+        # L'époque change si Redis a été vidé : les anciens ETags ne peuvent plus correspondre
+        epoch_key = self.PREFIX + "epoch"
+        values = self.client.mget([epoch_key, *(self.PREFIX + scope for scope in scopes)])
+        if values[0] is None:
+            self.client.set(epoch_key, uuid.uuid4().hex[:8], nx=True)
+            values = self.client.mget([epoch_key, *(self.PREFIX + scope for scope in scopes)])
+        return values[0].decode(), [int(value or 0) for value in values[1:]]
+
+
+versions = MemoryVersions()
+
+
+def configure_versions(backend="memory", redis_url=None, ttl=60):
+    global versions
+    versions = RedisVersions(redis_url) if backend == "redis" else MemoryVersions(ttl=ttl)
+
+
+def bump(*scopes):
+    if scopes:
+        versions.bump(scopes)
+
+
+def entities_changed(entity, *entity_ids):
+    """Une entité a changé : sa version et celle de sa collection"""
+    entity_ids = [entity_id for entity_id in entity_ids if entity_id]
+    if entity_ids:
+        bump(ENTITY_COLLECTIONS[entity], *(f"{entity}:{entity_id}" for entity_id in entity_ids))
+
+
+def consultations_changed(doctor_id=None, patient_id=None):
+    """Listes de consultations concernées ; sans id, toutes les listes"""
+    scopes = [f"consultations:doctor:{doctor_id}"] if doctor_id else []
+    if patient_id:
+        scopes.append(f"consultations:patient:{patient_id}")
+    bump(*(scopes or [ALL_CONSULTATIONS]))
+
+
+# ---------------------- Scopes des routes ----------------------
+
+def collection_scope(name):
+    return lambda **view_args: [name]
+
+
+def entity_scope(entity, arg):
+    return lambda **view_args: [f"{entity}:{view_args[arg]}"]
+
+
+def consultations_scope(entity, arg):
+    return lambda **view_args: [ALL_CONSULTATIONS, f"consultations:{entity}:{view_args[arg]}"]
+
+
+def versions_blocking():
+    return versions.blocking
+
+
+def view_scopes(scope_functions, view_args):
+    return [scope for function in scope_functions for scope in function(**view_args)]
+
+
+def make_etag(scopes, req=None):
+    # Versions lues AVANT la requête en base : une écriture concurrente change l'ETag suivant
+    req = request if req is None else req
+    token, values = versions.current(scopes)
+    # Accept inclus : JSON et NDJSON partagent la même URL
+    key = "|".join([token, req.method, req.full_path, req.headers.get("Accept", ""),
+                    *(f"{s}={v}" for s, v in zip(scopes, values))])
+    return hashlib.sha1(key.encode()).hexdigest()[:20]
+
+
+def set_revalidation(response, etag):
+    response.set_etag(etag, weak=True)
+    response.vary.add("Accept")
+    # Le navigateur garde la réponse mais revalide à chaque fois
+    response.headers["Cache-Control"] = "private, no-cache"
+    return response
+
+
+def conditional_get(*scope_functions):
+    """GET conditionnel : ETag faible dérivé des versions des scopes (fonctions des arguments de la vue)"""
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            etag = make_etag(view_scopes(scope_functions, kwargs))
+            if request.if_none_match.contains_weak(etag):
+                response = current_app.response_class(status=304)
+            else:
+                response = make_response(view(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+            return set_revalidation(response, etag)
+
+        return wrapper
+
+    return decorator
@@ -1,14 +1,43 @@
-from flask import Flask, request, jsonify
+import time
+
+import click
+from flask import Flask, Response, g, request, jsonify
 from flask_pymongo import PyMongo
 from neo4j import GraphDatabase
 from config import Config
-from Services import db as db_services
+from BackEnd.Services import db as db_services
+from BackEnd.Services.instrumentation import (
+    InstrumentedDriver,
+    MongoCommandStats,
+    configure_instrumentation,
+    current_request_stats,
+    finish_request_stats,
+    start_request_stats
+)
+from BackEnd.Services.slow_queries import configure_slow_queries
+from BackEnd.Services.metrics import (
+    PROMETHEUS_CONTENT_TYPE,
+    MongoPoolMetrics,
+    configure_metrics,
+    metrics_enabled,
+    record_request,
+    render_metrics,
+    request_finished,
+    request_started,
+    watch_mongo_pool
+)
 
 from flask_cors import CORS
+from BackEnd.Services.projection import PublicJSONProvider
 app = Flask(__name__)
 app.config.from_object(Config)
-CORS(app, origins=["*"])  # or use "*" to allow all
+app.json = PublicJSONProvider(app)  # aucun champ secret dans les réponses JSON
+CORS(app, origins=["*"], expose_headers=["X-Next-Cursor", "Server-Timing", "X-DB-Queries", "ETag"])  # or use "*" to allow all
+
 
+# `python app.py` : les processus de hachage (forkserver) réimportent ce module sous __mp_main__,
+# sans les tâches de démarrage (schéma, identités, index des créneaux)
+STARTUP_TASKS = __name__ != "__mp_main__"
 
 # Vérification des configs nécessaires
 required_keys = ["MONGO_URI", "NEO4J_URI", "NEO4J_USER", "NEO4J_PASSWORD"]
@@ -16,12 +45,24 @@ for key in required_keys:
     if not app.config.get(key):
         raise RuntimeError(f"Missing required config key: {key}")
 
-# Initialisation des drivers
-mongo = PyMongo(app)
-neo4j = GraphDatabase.driver(
+# Initialisation des drivers (opérations comptées et chronométrées par requête)
+mongo = PyMongo(app, event_listeners=[MongoCommandStats(), MongoPoolMetrics()])
+neo4j = InstrumentedDriver(GraphDatabase.driver(
     app.config["NEO4J_URI"],
     auth=(app.config["NEO4J_USER"], app.config["NEO4J_PASSWORD"])
+))
+configure_instrumentation(
+    enabled=app.config["DB_INSTRUMENTATION_ENABLED"],
+    n_plus_one_threshold=app.config["DB_N_PLUS_ONE_THRESHOLD"]
 )
+configure_metrics(enabled=app.config["METRICS_ENABLED"])
+configure_slow_queries(
+    enabled=app.config["SLOW_QUERY_ENABLED"],
+    threshold_ms=app.config["SLOW_QUERY_THRESHOLD_MS"],
+    sample_rate=app.config["SLOW_QUERY_SAMPLE_RATE"],
+    top_n=app.config["SLOW_QUERY_TOP_N"]
+)
+watch_mongo_pool(mongo.cx)
 
 # Injection dans le service partagé
 db_services.mongo = mongo
@@ -39,6 +80,258 @@ app.register_blueprint(doctor_bp, url_prefix='/doctor')
 app.register_blueprint(patient_bp, url_prefix='/patient')
 app.register_blueprint(admin_bp, url_prefix='/admin')
 
+from BackEnd.Services.IdentityService import build_identities, ensure_identities
+from BackEnd.Services.AuthService import configure_hashing
+from BackEnd.Services.SchemaService import bootstrap_schema, explain_queries
+from BackEnd.Services.ScheduleIndex import schedule_index
+from BackEnd.Services.cache import configure_caches
+from BackEnd.Services.versions import configure_versions
+from BackEnd.Services.compression import compress_response, configure_compression
+from BackEnd.Services.TokenService import InvalidToken, configure_tokens, principal_from_header
+from BackEnd.Services.ImportService import import_file, IMPORT_ENTITIES, IMPORT_BATCH_SIZE
+from BackEnd.Services.ExportService import export_stream, EXPORT_COLUMNS, EXPORT_FORMATS
+from BackEnd.Services.DocteurService import parse_date_range
+from BackEnd.Services.OutboxService import (
+    configure_outbox,
+    start_sync_worker,
+    wait_for_request_writes
+)
+
+# Hachage des mots de passe hors des threads de requête
+configure_hashing(
+    method=app.config["PASSWORD_HASH_METHOD"],
+    workers=app.config["PASSWORD_HASH_WORKERS"],
+    timeout=app.config["PASSWORD_HASH_TIMEOUT"]
+)
+
+# Cache read-through de get_doctor / get_patient
+configure_caches(
+    max_entries=app.config["CACHE_MAX_ENTRIES"],
+    ttl=app.config["CACHE_TTL"],
+    backend=app.config["CACHE_BACKEND"],
+    redis_url=app.config["CACHE_REDIS_URL"]
+)
+
+# Versions des collections/entités pour les ETags (même backend que le cache)
+configure_versions(
+    backend=app.config["CACHE_BACKEND"],
+    redis_url=app.config["CACHE_REDIS_URL"],
+    ttl=app.config["CACHE_TTL"]
+)
+
+configure_compression(
+    enabled=app.config["COMPRESSION_ENABLED"],
+    min_size=app.config["COMPRESSION_MIN_SIZE"],
+    gzip_level=app.config["COMPRESSION_GZIP_LEVEL"],
+    brotli_quality=app.config["COMPRESSION_BROTLI_QUALITY"]
+)
+
+# Jetons d'accès / refresh signés ; chaque blueprint vérifie ses règles d'accès
+configure_tokens(
+    secret=app.config["AUTH_TOKEN_SECRET"],
+    access_ttl=app.config["AUTH_ACCESS_TTL"],
+    refresh_ttl=app.config["AUTH_REFRESH_TTL"],
+    required=app.config["AUTH_REQUIRED"],
+    allow_random_secret=app.config["AUTH_ALLOW_RANDOM_SECRET"]
+)
+
+# Index Mongo / contraintes Neo4j (idempotent)
+if STARTUP_TASKS and app.config["SCHEMA_BOOTSTRAP_ON_STARTUP"]:
+    schema_report = bootstrap_schema()
+    if schema_report["mongo"] or schema_report["neo4j"]:
+        app.logger.info("Schema created: mongo=%s neo4j=%s", schema_report["mongo"], schema_report["neo4j"])
+
+# Index des identités (login, unicité des emails) construit au démarrage s'il est vide
+identities_report = ensure_identities() if STARTUP_TASKS else None
+if identities_report:
+    app.logger.info("Identities built: %s created, %s conflicts",
+                    identities_report["created"], len(identities_report["conflicts"]))
+
+# Écritures Neo4j rejouées depuis l'outbox Mongo par un worker en arrière-plan
+configure_outbox(
+    enabled=app.config["OUTBOX_ENABLED"],
+    batch_size=app.config["OUTBOX_BATCH_SIZE"],
+    poll_interval=app.config["OUTBOX_POLL_INTERVAL"],
+    max_attempts=app.config["OUTBOX_MAX_ATTEMPTS"],
+    wait_timeout=app.config["OUTBOX_WAIT_TIMEOUT"]
+)
+
+
+@app.before_request
+def start_outbox_worker():
+    # Lancé à la première requête servie : pas de worker pour les commandes CLI ni à l'import
+    start_sync_worker()
+
+
+@app.before_request
+def start_request_metrics():
+    if metrics_enabled():
+        # Règle d'URL (ex. /doctor/<string:doctor_id>) : une série par route, pas par id
+        g.metrics_route = request.url_rule.rule if request.url_rule else "<unmatched>"
+        g.metrics_started = time.perf_counter()
+        request_started(g.metrics_route)
+
+
+@app.after_request
+def record_request_metrics(response):
+    # Enregistré en premier : exécuté après les autres after_request
+    if "metrics_route" in g:
+        record_request(
+            request.method,
+            g.metrics_route,
+            request.blueprint or "app",
+            response.status_code,
+            time.perf_counter() - g.metrics_started,
+            current_request_stats()
+        )
+    return response
+
+
+@app.after_request
+def compress(response):
+    # Exécuté juste avant record_request_metrics : après tous les autres after_request
+    return compress_response(response, request)
+
+
+@app.teardown_request
+def finish_request_metrics(exc):
+    if "metrics_route" in g:
+        request_finished(g.metrics_route)
+
+
+@app.before_request
+def start_db_stats():
+    start_request_stats()
+
+
+@app.before_request
+def authenticate_request():
+    # Signature, expiration et révocation vérifiées en mémoire : aucun accès base
+    # Jeton refusé (expiré, mal formé...) : requête anonyme, la règle de la vue décide
+    # (401 sur les vues protégées ; /auth/* et vues @public restent accessibles)
+    try:
+        g.principal = principal_from_header(request.headers.get("Authorization"))
+    except InvalidToken:
+        g.principal = None
+
+
+@app.after_request
+def add_db_stats(response):
+    # Enregistré avant read_your_writes_on_demand : exécuté après lui, l'attente est comptée
+    stats = current_request_stats()
+    if stats is None:
+        return response
+    response.headers.update(stats.headers())
+
+    # Log à la fermeture : les réponses en flux (NDJSON, export) sont comptées jusqu'au bout
+    fields = {"method": request.method, "path": request.path, "endpoint": request.endpoint,
+              "status": response.status_code}
+    response.call_on_close(lambda: finish_request_stats(stats, **fields))
+    return response
+
+
+@app.after_request
+def read_your_writes_on_demand(response):
+    # Le client peut demander à lire ses écritures : réponse envoyée une fois Neo4j à jour
+    if request.headers.get("X-Read-Your-Writes", "").lower() == "true":
+        wait_for_request_writes()
+    return response
+
+
+# Index en mémoire des créneaux occupés, mis à jour ensuite à chaque réservation
+if STARTUP_TASKS:
+    app.logger.info("Schedule index loaded: %s consultations", schedule_index.rebuild())
+
+
+@app.cli.command("init-schema")
+def init_schema_command():
+    """Crée les index Mongo et les contraintes/index Neo4j manquants"""
+    report = bootstrap_schema()
+    print(f"Index Mongo créés: {', '.join(report['mongo']) or 'aucun'}")
+    print(f"Schéma Neo4j créé: {', '.join(report['neo4j']) or 'aucun'}")
+
+
+@app.cli.command("explain-queries")
+def explain_queries_command():
+    """Affiche le plan des requêtes chaudes et signale les scans complets"""
+    for result in explain_queries():
+        status = "OK" if result["uses_index"] and not result["full_scan"] else "SCAN"
+        print(f"[{status}] {result['store']}: {result['query']} -> {' > '.join(result['plan'])}")
+
+
+@app.cli.command("import-data")
+@click.argument("entity", type=click.Choice(IMPORT_ENTITIES))
+@click.argument("path", type=click.Path(exists=True, dir_okay=False))
+@click.option("--format", "fmt", type=click.Choice(["csv", "jsonl"]), help="Déduit de l'extension par défaut")
+@click.option("--batch-size", default=IMPORT_BATCH_SIZE, show_default=True)
+@click.option("--workers", type=int, help="Processus de hachage des mots de passe")
+@click.option("--hash-method", help="Méthode werkzeug pour les mots de passe en clair")
+@click.option("--checkpoint", help="Fichier de reprise (défaut: <path>.checkpoint)")
+@click.option("--errors", "error_path", help="Rapport d'erreurs JSONL (défaut: <path>.errors.jsonl)")
+@click.option("--resume", is_flag=True, help="Reprend après le dernier lot enregistré")
+def import_data_command(entity, path, fmt, batch_size, workers, hash_method, checkpoint, error_path, resume):
+    """Importe en masse des patients, docteurs ou consultations (CSV / JSONL)"""
+    if workers:
+        configure_hashing(workers=workers)
+
+    def progress(state):
+        print(f"{state['done']} lus, {state['imported']} importés, {state['errors']} erreurs")
+
+    report = import_file(
+        entity,
+        path,
+        fmt=fmt,
+        batch_size=batch_size,
+        checkpoint_path=checkpoint or f"{path}.checkpoint",
+        error_path=error_path or f"{path}.errors.jsonl",
+        resume=resume,
+        hash_method=hash_method,
+        progress=progress
+    )
+    print(f"Terminé: {report['imported']} importés, {report['errors']} erreurs")
+
+
+@app.cli.command("export-data")
+@click.argument("kind", type=click.Choice(list(EXPORT_COLUMNS)))
+@click.argument("path", type=click.Path(dir_okay=False, writable=True))
+@click.option("--format", "fmt", type=click.Choice(list(EXPORT_FORMATS)), help="Déduit de l'extension par défaut")
+@click.option("--etat", help="Consultations dans cet état uniquement")
+@click.option("--from", "date_from", help="YYYY-MM-DD ou YYYY-MM-DD HH:MM")
+@click.option("--to", "date_to", help="YYYY-MM-DD (inclus) ou YYYY-MM-DD HH:MM")
+def export_data_command(kind, path, fmt, etat, date_from, date_to):
+    """Exporte les consultations ou les panels en JSONL, CSV ou Parquet"""
+    fmt = fmt or path.rsplit(".", 1)[-1].lower()
+    stats = {}
+    try:
+        start, end = parse_date_range(date_from, date_to)
+        chunks = export_stream(kind, fmt, etat=etat, date_from=start, date_to=end, stats=stats)
+    except ValueError as e:
+        raise click.ClickException(str(e))
+
+    started = time.perf_counter()
+    with open(path, "wb") as f:
+        for chunk in chunks:
+            f.write(chunk)
+    elapsed = time.perf_counter() - started
+    print(f"{stats['rows']} lignes exportées en {elapsed:.1f}s ({stats['rows'] / max(elapsed, 1e-9):.0f} lignes/s)")
+
+
+@app.cli.command("build-identities")
+def build_identities_command():
+    """Construit la collection identities depuis les utilisateurs existants"""
+    report = build_identities()
+    print(f"Identités créées: {report['created']}, déjà présentes: {report['existing']}")
+    for conflict in report["conflicts"]:
+        print(f"Conflit: {conflict['email']} ({conflict['role']} {conflict['user_id']}) "
+              f"déjà utilisé par un {conflict['owner_role']}")
+
+
+@app.route('/metrics')
+def metrics():
+    if not metrics_enabled():
+        return jsonify({"error": "Métriques désactivées"}), 404
+    return Response(render_metrics(), content_type=PROMETHEUS_CONTENT_TYPE)
+
 
 @app.route('/test')
 def test_mongodb():
@@ -0,0 +1,159 @@
+# asgi.py
+# Mode de service asynchrone : uvicorn asgi:application --workers 4 (depuis BackEnd/)
+# Les lectures chaudes (Routes/AsyncRoute.py) sont servies par Quart avec le client Mongo
+# asynchrone et neo4j.AsyncGraphDatabase ; toutes les autres routes sont déléguées à
+# l'application Flask existante, ce qui expose exactement les mêmes URLs.
+# Mêmes crochets que app.py : ETags, compression, statistiques par requête et métriques
+# Prometheus (un /metrics par processus, routes Flask et Quart comprises).
+# Avec CACHE_BACKEND=redis, cache et versions (clients synchrones) passent par un thread :
+# préférer le backend mémoire pour les lectures servies ici.
+
+import time
+
+from asgiref.wsgi import WsgiToAsgi
+from neo4j import AsyncGraphDatabase
+from pymongo import AsyncMongoClient
+from quart import Quart, g, request
+from werkzeug.exceptions import HTTPException
+
+from app import app as flask_app
+from config import Config
+from BackEnd.Services import db as db_services
+from BackEnd.Routes.AsyncRoute import async_doctor_bp, async_patient_bp
+from BackEnd.Services.compression import compress_async_response
+from BackEnd.Services.instrumentation import (
+    AsyncInstrumentedDriver,
+    MongoCommandStats,
+    current_request_stats,
+    finish_request_stats,
+    start_request_stats
+)
+from BackEnd.Services.metrics import (
+    MongoPoolMetrics,
+    metrics_enabled,
+    record_request,
+    request_finished,
+    request_started
+)
+from BackEnd.Services.projection import PublicJSONProvider
+from BackEnd.Services.TokenService import InvalidToken, principal_from_header
+
+quart_app = Quart(__name__)
+quart_app.config.from_object(Config)
+quart_app.json = PublicJSONProvider(quart_app)
+
+quart_app.register_blueprint(async_doctor_bp, url_prefix='/doctor')
+quart_app.register_blueprint(async_patient_bp, url_prefix='/patient')
+
+
+@quart_app.before_serving
+async def connect_async_drivers():
+    client = AsyncMongoClient(quart_app.config["MONGO_URI"],
+                              event_listeners=[MongoCommandStats(), MongoPoolMetrics()])
+    db_services.async_mongo_db = client.get_default_database()
+    db_services.async_neo4j_driver = AsyncInstrumentedDriver(AsyncGraphDatabase.driver(
+        quart_app.config["NEO4J_URI"],
+        auth=(quart_app.config["NEO4J_USER"], quart_app.config["NEO4J_PASSWORD"])
+    ))
+    quart_app.extensions["async_mongo_client"] = client
+
+
+@quart_app.after_serving
+async def close_async_drivers():
+    await db_services.async_neo4j_driver.close()
+    await quart_app.extensions["async_mongo_client"].close()
+
+
+@quart_app.before_request
+async def start_request_metrics():
+    if metrics_enabled():
+        g.metrics_route = request.url_rule.rule if request.url_rule else "<unmatched>"
+        g.metrics_started = time.perf_counter()
+        request_started(g.metrics_route)
+
+
+@quart_app.after_request
+async def record_request_metrics(response):
+    # Enregistré en premier : exécuté après les autres after_request
+    if "metrics_route" in g:
+        record_request(
+            request.method,
+            g.metrics_route,
+            request.blueprint or "app",
+            response.status_code,
+            time.perf_counter() - g.metrics_started,
+            current_request_stats()
+        )
+    return response
+
+
+@quart_app.after_request
+async def compress(response):
+    return await compress_async_response(response, request)
+
+
+@quart_app.teardown_request
+async def finish_request_metrics(exc):
+    if "metrics_route" in g:
+        request_finished(g.metrics_route)
+
+
+@quart_app.before_request
+async def start_db_stats():
+    start_request_stats()
+
+
+@quart_app.before_request
+async def authenticate_request():
+    # Same token check as the Flask app (configured when it was imported)
+    # Jeton refusé (expiré, mal formé...) : requête anonyme, la règle de la vue décide
+    # (401 sur les vues protégées ; /auth/* et vues @public restent accessibles)
+    try:
+        g.principal = principal_from_header(request.headers.get("Authorization"))
+    except InvalidToken:
+        g.principal = None
+
+
+@quart_app.after_request
+async def add_db_stats(response):
+    # Réponses entièrement en mémoire : log écrit tout de suite
+    stats = current_request_stats()
+    if stats is None:
+        return response
+    response.headers.update(stats.headers())
+    finish_request_stats(stats, method=request.method, path=request.path, endpoint=request.endpoint,
+                         status=response.status_code)
+    return response
+
+
+@quart_app.after_request
+async def add_cors_headers(response):
+    # Same policy as CORS(app, origins=["*"], expose_headers=...) on the Flask side;
+    # preflights (OPTIONS) never get here, flask_cors answers them (see is_async_route)
+    response.headers["Access-Control-Allow-Origin"] = "*"
+    response.headers["Access-Control-Expose-Headers"] = "X-Next-Cursor, Server-Timing, X-DB-Queries, ETag"
+    return response
+
+
+wsgi_fallback = WsgiToAsgi(flask_app)
+flask_routes = flask_app.url_map.bind("")
+
+
+def is_async_route(scope):
+    # Resolve with the Flask url map (it knows the static routes such as /doctor/availability),
+    # then serve async only if the same view exists in the async blueprints.
+    # Preflights stay on Flask: flask_cors sends Allow-Methods / Allow-Headers (Authorization...)
+    if scope["method"] == "OPTIONS":
+        return False
+    try:
+        endpoint, _ = flask_routes.match(scope["path"], method=scope["method"])
+    except HTTPException:
+        return False
+    return f"async_{endpoint}" in quart_app.view_functions
+
+
+async def application(scope, receive, send):
+    if scope["type"] == "lifespan" or (scope["type"] == "http" and is_async_route(scope)):
+        await quart_app(scope, receive, send)
+    else:
+        await wsgi_fallback(scope, receive, send)
@@ -0,0 +1,233 @@
+# benchmarks/__main__.py
+"""Benchmark des routes critiques du backend.
+
+Peuple une clinique synthétique, rejoue les routes critiques via le client de test Flask
+et écrit en JSON les percentiles de latence et les allers-retours Mongo/Neo4j par requête,
+puis les vérifications d'acceptation, les exports et la comparaison Flask / Quart sous charge.
+
+    python -m BackEnd.benchmarks [--target standins|containers] [--output results.json] [--compare baseline.json]
+"""
+
+import argparse
+import json
+import os
+import platform
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+for path in (os.path.dirname(BACKEND_DIR), BACKEND_DIR):
+    if path not in sys.path:
+        sys.path.insert(0, path)
+
+from BackEnd.benchmarks import checks  # noqa: E402
+from BackEnd.benchmarks.harness import RoundTrips, freeze_seeded_data, load_app, load_asgi, measure  # noqa: E402
+
+PAGE_LIMIT = 100
+
+
+def scenarios(client, clinic, rng):
+    """(nom, méthode, chemin, fonction(i) -> réponse)"""
+    # Créneaux uniques au-delà des consultations générées : aucun conflit de réservation
+    booking_base = (datetime.now() + timedelta(days=400)).replace(hour=0, minute=0, second=0, microsecond=0)
+
+    def random_patient():
+        return rng.choice(clinic.patient_ids)
+
+    def random_doctor():
+        return rng.choice(clinic.doctor_ids)
+
+    return [
+        ("login", "POST", "/auth/login", lambda i: client.post("/auth/login", json={
+            "email": rng.choice(clinic.patient_emails), "mot_de_passe": clinic.password})),
+        ("list_patients", "GET", "/patient", lambda i: client.get(
+            f"/patient?limit={PAGE_LIMIT}&after={random_patient()}")),
+        ("list_doctors", "GET", "/doctor", lambda i: client.get(f"/doctor?limit={PAGE_LIMIT}")),
+        ("admin_patients", "GET", "/admin/patients", lambda i: client.get(
+            f"/admin/patients?limit={PAGE_LIMIT}&after={random_patient()}")),
+        ("doctor_panel", "GET", "/doctor/<id>/patients", lambda i: client.get(
+            f"/doctor/{random_doctor()}/patients")),
+        ("doctor_consultations", "GET", "/doctor/<id>/consultations", lambda i: client.get(
+            f"/doctor/{random_doctor()}/consultations")),
+        ("patient_consultations", "GET", "/patient/<id>/consultations", lambda i: client.get(
+            f"/patient/{random_patient()}/consultations")),
+        ("booking", "POST", "/patient/<id>/consultations", lambda i: client.post(
+            f"/patient/{random_patient()}/consultations", json={
+                "doctor_id": random_doctor(),
+                "date": (booking_base + timedelta(hours=i)).strftime("%Y-%m-%d %H:%M")})),
+        ("review_doctor", "POST", "/admin/review-doctor/<id>", lambda i: client.post(
+            f"/admin/review-doctor/{clinic.pending_ids[i]}", json={
+                "action": "approve", "admin_id": clinic.admin_id})),
+    ]
+
+
+def run_checks(client, round_trips, clinic):
+    results = {
+        "list_doctors_round_trips": checks.check_list_doctors_round_trips(client, round_trips),
+        "consultation_history_scaling": checks.check_consultation_history_scaling(client, round_trips),
+        "concurrent_booking": checks.check_concurrent_booking(client, clinic),
+        "availability": checks.check_availability(client, round_trips),
+    }
+    return results
+
+
+def measure_exports():
+    from BackEnd.Services.ExportService import check_export_format, export_stream
+
+    results = {}
+    for kind in ("consultations", "panels"):
+        for fmt in ("jsonl", "csv", "parquet"):
+            try:
+                check_export_format(fmt)
+            except ValueError:
+                continue
+            stats, size = {}, 0
+            started = time.perf_counter()
+            for chunk in export_stream(kind, fmt, stats=stats):
+                size += len(chunk)
+            elapsed = time.perf_counter() - started
+            results[f"{kind}.{fmt}"] = {
+                "rows": stats["rows"],
+                "bytes": size,
+                "seconds": round(elapsed, 3),
+                "rows_per_second": round(stats["rows"] / elapsed) if elapsed else None,
+            }
+    return results
+
+
+def compare(results, baseline, threshold):
+    """Routes dont le p50/p95 augmente de plus de `threshold` ou dont les allers-retours augmentent"""
+    regressions = []
+    for name, route in results["routes"].items():
+        before = baseline.get("routes", {}).get(name)
+        if not before:
+            continue
+        for key in ("p50", "p95"):
+            old, new = before["latency_ms"][key], route["latency_ms"][key]
+            if old and new > old * (1 + threshold):
+                regressions.append(f"{name}: {key} {old} ms -> {new} ms")
+        for store in ("mongo", "neo4j"):
+            old, new = before["round_trips"][store], route["round_trips"][store]
+            if new > old:
+                regressions.append(f"{name}: allers-retours {store} {old} -> {new}")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m BackEnd.benchmarks", description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--target", choices=["standins", "containers"], default="standins",
+                        help="standins: bases en mémoire ; containers: bases du .env (vidées, --reset requis)")
+    parser.add_argument("--reset", action="store_true", help="autorise le vidage des bases en mode containers")
+    parser.add_argument("--doctors", type=int, default=100)
+    parser.add_argument("--patients", type=int, default=10000)
+    parser.add_argument("--consultations", type=int, default=100000)
+    parser.add_argument("--iterations", type=int, default=200)
+    parser.add_argument("--warmup", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--only", help="scénarios à exécuter, séparés par des virgules")
+    parser.add_argument("--skip-export", action="store_true")
+    parser.add_argument("--skip-checks", action="store_true", help="ne lance pas les vérifications d'acceptation")
+    parser.add_argument("--skip-serving", action="store_true", help="ne compare pas Flask et Quart sous charge")
+    parser.add_argument("--concurrency", type=int, default=16, help="requêtes en vol pour la comparaison de service")
+    parser.add_argument("--serving-seconds", type=float, default=5.0, help="durée de charge par mode")
+    parser.add_argument("--db-latency-ms", type=float, default=0.0,
+                        help="latence simulée par aller-retour (stand-ins), ex. 1.0")
+    parser.add_argument("--output", help="fichier JSON des résultats (stdout par défaut)")
+    parser.add_argument("--compare", help="résultats de référence : code de sortie 1 en cas de régression")
+    parser.add_argument("--threshold", type=float, default=0.2, help="tolérance de latence pour --compare")
+    args = parser.parse_args(argv)
+
+    if args.target == "containers" and not args.reset:
+        parser.error("--target containers vide les bases configurées : ajoutez --reset")
+
+    round_trips = RoundTrips()
+    app = load_app(args.target, round_trips)
+    quart_app = None if args.skip_serving else load_asgi(args.target, round_trips)
+
+    from BackEnd.Services.ScheduleIndex import schedule_index
+    from BackEnd.Services.TokenService import issue_tokens
+    from BackEnd.benchmarks.seed import reset_databases, seed_clinic
+
+    def progress(stage, count):
+        print(f"seed {stage}: {count}", file=sys.stderr)
+
+    if args.target == "containers":
+        reset_databases()
+    started = time.perf_counter()
+    clinic = seed_clinic(args.doctors, args.patients, args.consultations,
+                         pending=args.warmup + args.iterations, seed=args.seed, progress=progress)
+    seed_seconds = time.perf_counter() - started
+    schedule_index.rebuild()
+    freeze_seeded_data()
+    round_trips.take()
+
+    selected = set(args.only.split(",")) if args.only else None
+    client = app.test_client()
+    # Jeton admin signé comme au login : la vérification fait partie du chemin mesuré
+    access_token = issue_tokens(clinic.admin_id, "admin")["access_token"]
+    client.environ_base["HTTP_AUTHORIZATION"] = f"Bearer {access_token}"
+    rng = random.Random(args.seed)
+    routes = {}
+    for name, method, path, request in scenarios(client, clinic, rng):
+        if selected and name not in selected:
+            continue
+        print(f"bench {name}", file=sys.stderr)
+        routes[name] = {"method": method, "path": path,
+                        **measure(name, request, args.iterations, args.warmup, round_trips)}
+
+    results = {
+        "meta": {
+            "target": args.target,
+            "doctors": args.doctors,
+            "patients": args.patients,
+            "consultations": args.consultations,
+            "iterations": args.iterations,
+            "warmup": args.warmup,
+            "seed": args.seed,
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "timestamp": datetime.utcnow().isoformat(),
+            "seed_seconds": round(seed_seconds, 3),
+        },
+        "routes": routes,
+    }
+    if not args.skip_checks:
+        print("checks", file=sys.stderr)
+        results["checks"] = run_checks(client, round_trips, clinic)
+    if not args.skip_export:
+        results["export"] = measure_exports()
+    if quart_app is not None:
+        from BackEnd.benchmarks.serving import compare_serving
+
+        print("serving", file=sys.stderr)
+        # Latence simulée seulement ici : elle fausserait les allers-retours comparés par --compare
+        round_trips.latency = args.db_latency_ms / 1000 if args.target == "standins" else 0.0
+        results["serving"] = compare_serving(app, quart_app, clinic, access_token, args.concurrency,
+                                             args.serving_seconds, args.seed)
+        round_trips.latency = 0.0
+
+    output = json.dumps(results, indent=2, ensure_ascii=False)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(output + "\n")
+    else:
+        print(output)
+
+    failed = [name for name, check in results.get("checks", {}).items() if not check["passed"]]
+    for name in failed:
+        print(f"CHECK FAILED {name}", file=sys.stderr)
+
+    regressions = []
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            regressions = compare(results, json.load(f), args.threshold)
+        for regression in regressions:
+            print(f"REGRESSION {regression}", file=sys.stderr)
+    return 1 if regressions or failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
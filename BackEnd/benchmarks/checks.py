@@ -0,0 +1,137 @@
+# benchmarks/checks.py
+# Vérifications à critère d'acceptation : chaque check retourne un dict avec "passed",
+# python -m BackEnd.benchmarks sort en code 1 si l'un d'eux échoue.
+
+
+def _round_trips_of(client, round_trips, path):
+    round_trips.take()
+    response = client.get(path)
+    counts = round_trips.take()
+    return response.status_code, {"mongo": counts["mongo"], "neo4j": counts["neo4j"]}
+
+
+def check_list_doctors_round_trips(client, round_trips, page_sizes=(1, 10, 100)):
+    """GET /doctor : même nombre d'allers-retours quelle que soit la taille de la page"""
+    pages = {}
+    for limit in page_sizes:
+        status, counts = _round_trips_of(client, round_trips, f"/doctor?limit={limit}")
+        pages[str(limit)] = {"status": status, **counts}
+
+    distinct = {(page["mongo"], page["neo4j"]) for page in pages.values()}
+    return {
+        "pages": pages,
+        "passed": len(distinct) == 1 and all(page["status"] == 200 for page in pages.values()),
+    }
+
+
+def check_consultation_history_scaling(client, round_trips, sizes=(10, 1000, 10000), iterations=5,
+                                       tolerance=1.5):
+    """GET /doctor/<id>/consultations pour 10 / 1k / 10k consultations : une requête Cypher et
+    un $in Mongo par lot quelle que soit la taille, coût par consultation constant"""
+    from BackEnd.Services.db import BATCH_SIZE
+    from BackEnd.benchmarks.harness import measure
+    from BackEnd.benchmarks.seed import seed_doctor_history
+
+    histories = {}
+    for number, size in enumerate(sizes):
+        doctor_id = seed_doctor_history(900000 + number, size)
+        path = f"/doctor/{doctor_id}/consultations?fields=all"
+        # Réponse complète, sans 304 ni compression
+        result = measure(f"history_{size}", lambda i: client.get(path, headers={"Accept-Encoding": "identity"}),
+                         iterations, 1, round_trips)
+        batches = -(-size // BATCH_SIZE)
+        histories[str(size)] = {
+            "status_codes": result["status_codes"],
+            "latency_ms": result["latency_ms"],
+            "us_per_consultation": round(result["latency_ms"]["p50"] * 1000 / size, 2),
+            "round_trips": result["round_trips"],
+            "bounded": result["round_trips"]["neo4j"] <= 1 and result["round_trips"]["mongo"] <= batches,
+        }
+
+    # Au-delà du surcoût fixe (petites tailles), la latence croît au plus linéairement
+    per_row = [histories[str(size)]["us_per_consultation"] for size in sizes if size >= 1000]
+    return {
+        "sizes": histories,
+        "passed": all(history["bounded"] and history["status_codes"] == {"200": iterations}
+                      for history in histories.values())
+                  and all(later <= earlier * tolerance for earlier, later in zip(per_row, per_row[1:])),
+    }
+
+
+def check_concurrent_booking(client, clinic, threads=16, rounds=5):
+    """POST /patient/<id>/consultations : `threads` patients réservent en même temps le même créneau
+    du même docteur, exactement une réservation aboutit (201), les autres sont refusées (400)"""
+    import threading
+    from datetime import datetime, timedelta
+
+    patient_ids = clinic.patient_ids[:threads]
+    doctor_id = clinic.doctor_ids[0]
+    # Au-delà des créneaux du scénario booking
+    first_slot = (datetime.now() + timedelta(days=700)).replace(hour=9, minute=0, second=0, microsecond=0)
+
+    slots = {}
+    for number in range(rounds):
+        date = (first_slot + timedelta(days=number)).strftime("%Y-%m-%d %H:%M")
+        barrier = threading.Barrier(len(patient_ids))
+        status_codes = []
+
+        def book(patient_id):
+            barrier.wait()
+            response = client.post(f"/patient/{patient_id}/consultations",
+                                   json={"doctor_id": doctor_id, "date": date})
+            status_codes.append(response.status_code)
+
+        workers = [threading.Thread(target=book, args=(patient_id,)) for patient_id in patient_ids]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        slots[date] = {str(code): status_codes.count(code) for code in sorted(set(status_codes))}
+
+    return {
+        "threads": len(patient_ids),
+        "slots": slots,
+        "passed": all(codes == {"201": 1, "400": len(patient_ids) - 1} for codes in slots.values()),
+    }
+
+
+def check_availability(client, round_trips, doctors=300, days=14, iterations=10, target_ms=100):
+    """GET /doctor/availability : `doctors` docteurs d'une spécialité sur `days` jours,
+    p95 sous `target_ms` ms ; avec duration=15, aucun créneau proposé ne déborde de la
+    fermeture une fois réservé (CONSULTATION_DURATION)"""
+    from datetime import datetime, timedelta
+    from BackEnd.Constantes import horaires_consultation, specialites
+    from BackEnd.Services.PatientServices import CONSULTATION_DURATION
+    from BackEnd.benchmarks.harness import freeze_seeded_data, measure
+    from BackEnd.benchmarks.seed import seed_availability
+
+    # Spécialité réservée au check, dans une fenêtre qui commence demain
+    specialite = sorted(specialites)[-1]
+    first_day = (datetime.now() + timedelta(days=1)).replace(hour=0, minute=0, second=0, microsecond=0)
+    seed_availability(doctors, specialite, first_day, days)
+    freeze_seeded_data()
+
+    query = {"specialite": specialite, "from": first_day.strftime("%Y-%m-%d"),
+             "to": (first_day + timedelta(days=days - 1)).strftime("%Y-%m-%d")}
+    result = measure("availability", lambda i: client.get("/doctor/availability", query_string=query,
+                                                          headers={"Accept-Encoding": "identity"}),
+                     iterations, 1, round_trips)
+
+    short = client.get("/doctor/availability", query_string={**query, "duration": 15})
+    closing = horaires_consultation[1]
+    late_slots = sorted({
+        slot for doctor in short.get_json()["doctors"] for slot in doctor["slots"]
+        if datetime.strptime(slot, "%Y-%m-%d %H:%M") + CONSULTATION_DURATION
+        > datetime.strptime(slot[:10], "%Y-%m-%d").replace(hour=closing)
+    }) if short.status_code == 200 else None
+    return {
+        "doctors": doctors,
+        "days": days,
+        "status_codes": result["status_codes"],
+        "latency_ms": result["latency_ms"],
+        "round_trips": result["round_trips"],
+        "target_ms": target_ms,
+        "short_duration_late_slots": late_slots,
+        "passed": result["status_codes"] == {"200": iterations} and result["latency_ms"]["p95"] < target_ms
+                  and late_slots == [],
+    }
@@ -0,0 +1,228 @@
+# benchmarks/harness.py
+# Chargement de l'application sur les stand-ins en mémoire ou sur de vraies bases,
+# comptage des allers-retours par requête et mesure des latences.
+
+import asyncio
+import gc
+import os
+import threading
+import time
+from collections import Counter
+
+from pymongo import monitoring
+
+
+class RoundTrips:
+    """Allers-retours par thread : le worker de l'outbox n'est pas compté dans les requêtes mesurées.
+    latency (secondes, stand-ins seulement) simule le réseau : time.sleep par aller-retour
+    côté synchrone, asyncio.sleep côté asynchrone (voir async_call)"""
+
+    def __init__(self, latency=0.0):
+        self.local = threading.local()
+        self.latency = latency
+
+    def add(self, store):
+        if not hasattr(self.local, "counts"):
+            self.local.counts = Counter()
+        self.local.counts[store] += 1
+        if getattr(self.local, "deferred", None) is not None:
+            self.local.deferred += 1
+        elif self.latency:
+            time.sleep(self.latency)
+
+    async def async_call(self, fn, *args, **kwargs):
+        # Appel du stand-in synchrone sans bloquer la boucle : la latence des
+        # allers-retours effectués est attendue ensuite avec asyncio.sleep
+        self.local.deferred = 0
+        try:
+            result = fn(*args, **kwargs)
+            trips = self.local.deferred
+        finally:
+            self.local.deferred = None
+        if self.latency and trips:
+            await asyncio.sleep(trips * self.latency)
+        return result
+
+    def take(self):
+        counts = getattr(self.local, "counts", Counter())
+        self.local.counts = Counter()
+        return counts
+
+
+class MongoCommandCounter(monitoring.CommandListener):
+    # Une commande envoyée au serveur = un aller-retour (getMore compris)
+    def __init__(self, round_trips):
+        self.round_trips = round_trips
+
+    def started(self, event):
+        self.round_trips.add("mongo")
+
+    def succeeded(self, event):
+        pass
+
+    def failed(self, event):
+        pass
+
+
+class _CountingRunner:
+    def __init__(self, target, round_trips):
+        self.target = target
+        self.round_trips = round_trips
+
+    def run(self, *args, **kwargs):
+        self.round_trips.add("neo4j")
+        return self.target.run(*args, **kwargs)
+
+    def __getattr__(self, name):
+        return getattr(self.target, name)
+
+
+class _CountingSession(_CountingRunner):
+    def __enter__(self):
+        self.target.__enter__()
+        return self
+
+    def __exit__(self, *exc):
+        return self.target.__exit__(*exc)
+
+    def _transaction(self, method, work, *args, **kwargs):
+        return method(lambda tx, *a, **k: work(_CountingRunner(tx, self.round_trips), *a, **k), *args, **kwargs)
+
+    def execute_write(self, work, *args, **kwargs):
+        return self._transaction(self.target.execute_write, work, *args, **kwargs)
+
+    def execute_read(self, work, *args, **kwargs):
+        return self._transaction(self.target.execute_read, work, *args, **kwargs)
+
+    def write_transaction(self, work, *args, **kwargs):
+        return self._transaction(self.target.execute_write, work, *args, **kwargs)
+
+    def read_transaction(self, work, *args, **kwargs):
+        return self._transaction(self.target.execute_read, work, *args, **kwargs)
+
+
+class CountingDriver:
+    """Driver Neo4j réel dont chaque run (session ou transaction) est compté"""
+
+    def __init__(self, driver, round_trips):
+        self.driver = driver
+        self.round_trips = round_trips
+
+    def session(self, **kwargs):
+        return _CountingSession(self.driver.session(**kwargs), self.round_trips)
+
+    def __getattr__(self, name):
+        return getattr(self.driver, name)
+
+
+def load_app(target, round_trips):
+    """Importe app.py avec les drivers de la cible : "standins" (mémoire) ou "containers" (.env)"""
+    import flask_pymongo
+    import neo4j
+
+    # Un seul processus : la clé de signature aléatoire suffit si le .env n'en fixe pas
+    os.environ.setdefault("AUTH_ALLOW_RANDOM_SECRET", "true")
+    if target == "standins":
+        from BackEnd.benchmarks.mongo_standin import FakePyMongo
+        from BackEnd.benchmarks.neo4j_standin import FakeNeo4jDriver
+
+        for key, value in (("MONGO_URI", "mongodb://standin/cabinet"), ("NEO4J_URI", "bolt://standin"),
+                           ("NEO4J_USER", "standin"), ("NEO4J_PASSWORD", "standin")):
+            os.environ[key] = value
+        mongo, driver = FakePyMongo(round_trips), FakeNeo4jDriver(round_trips)
+        flask_pymongo.PyMongo = lambda *args, **kwargs: mongo
+        neo4j.GraphDatabase.driver = lambda *args, **kwargs: driver
+    else:
+        real_pymongo, real_driver = flask_pymongo.PyMongo, neo4j.GraphDatabase.driver
+
+        def counting_pymongo(app=None, *args, **kwargs):
+            if app is None:
+                return real_pymongo(*args, **kwargs)
+            listeners = [*kwargs.pop("event_listeners", []), MongoCommandCounter(round_trips)]
+            return real_pymongo(app, *args, event_listeners=listeners, **kwargs)
+
+        flask_pymongo.PyMongo = counting_pymongo
+        neo4j.GraphDatabase.driver = lambda *args, **kwargs: CountingDriver(real_driver(*args, **kwargs), round_trips)
+
+    import app as app_module
+    return app_module.app
+
+
+def load_asgi(target, round_trips):
+    """Importe asgi.py après load_app : avec les stand-ins, les clients asynchrones
+    lisent les mêmes données en mémoire que l'application Flask"""
+    if target == "standins":
+        import neo4j
+        import pymongo
+
+        from BackEnd.benchmarks.mongo_standin import FakeAsyncMongoClient
+        from BackEnd.Services import db as db_services
+        from BackEnd.benchmarks.neo4j_standin import FakeAsyncNeo4jDriver
+
+        pymongo.AsyncMongoClient = lambda *args, **kwargs: FakeAsyncMongoClient(db_services.mongo.db)
+        neo4j.AsyncGraphDatabase.driver = lambda *args, **kwargs: FakeAsyncNeo4jDriver(
+            _unwrap(db_services.neo4j_driver))
+
+    import asgi
+    return asgi.quart_app
+
+
+def _unwrap(driver):
+    # InstrumentedDriver / CountingDriver -> driver du stand-in
+    while hasattr(driver, "driver"):
+        driver = driver.driver
+    return driver
+
+
+def freeze_seeded_data():
+    """À appeler après le peuplement : avec les stand-ins les données vivent dans ce processus,
+    leurs collectes par le ramasse-miettes ne doivent pas être comptées aux routes mesurées"""
+    gc.collect()
+    gc.freeze()
+
+
+def percentile(sorted_values, fraction):
+    # Rang le plus proche
+    if not sorted_values:
+        return None
+    index = max(0, min(len(sorted_values) - 1, round(fraction * len(sorted_values) + 0.5) - 1))
+    return sorted_values[index]
+
+
+def measure(name, request, iterations, warmup, round_trips):
+    """Exécute request(i) et retourne latences (ms), allers-retours et codes HTTP"""
+    for i in range(warmup):
+        request(i)
+    round_trips.take()
+
+    latencies, statuses = [], Counter()
+    totals = Counter()
+    max_total = 0
+    for i in range(warmup, warmup + iterations):
+        started = time.perf_counter()
+        response = request(i)
+        latencies.append((time.perf_counter() - started) * 1000)
+        counts = round_trips.take()
+        totals.update(counts)
+        max_total = max(max_total, sum(counts.values()))
+        statuses[str(response.status_code)] += 1
+
+    latencies.sort()
+    return {
+        "iterations": iterations,
+        "errors": sum(count for status, count in statuses.items() if not status.startswith("2")),
+        "status_codes": dict(statuses),
+        "latency_ms": {
+            "mean": round(sum(latencies) / len(latencies), 3),
+            "p50": round(percentile(latencies, 0.50), 3),
+            "p90": round(percentile(latencies, 0.90), 3),
+            "p95": round(percentile(latencies, 0.95), 3),
+            "p99": round(percentile(latencies, 0.99), 3),
+            "max": round(latencies[-1], 3),
+        },
+        "round_trips": {
+            "mongo": round(totals["mongo"] / iterations, 2),
+            "neo4j": round(totals["neo4j"] / iterations, 2),
+            "max_per_request": max_total,
+        },
+    }
@@ -0,0 +1,542 @@
+# benchmarks/mongo_standin.py
+# Remplaçant en mémoire de flask_pymongo.PyMongo pour les benchmarks : couvre les opérations
+# utilisées par les services (find/sort/limit, insert/update/delete, index uniques, $in, $gt...),
+# avec recherche par _id, par index et par plage de _id pour garder des coûts réalistes.
+
+import copy
+import threading
+from bisect import bisect_left, bisect_right, insort
+from types import SimpleNamespace
+
+from bson import ObjectId
+from pymongo import ReturnDocument
+from pymongo.errors import BulkWriteError, DuplicateKeyError
+from pymongo.results import DeleteResult, InsertManyResult, InsertOneResult, UpdateResult
+
+DUPLICATE_KEY = 11000
+
+
+def _sort_key(value):
+    # Ordre total sur les _id (ObjectId puis autres types)
+    return (0, value) if isinstance(value, ObjectId) else (1, str(value))
+
+
+def _get(doc, path):
+    value = doc
+    for part in path.split("."):
+        if isinstance(value, list):
+            # Tableau de sous-documents : valeurs du champ dans chaque élément ("_outbox.created_at")
+            values = [item.get(part) for item in value if isinstance(item, dict) and part in item]
+            return values or None
+        if not isinstance(value, dict):
+            return None
+        value = value.get(part)
+    return value
+
+
+def _compare(value, op, arg):
+    try:
+        if op == "$gt":
+            return value is not None and value > arg
+        if op == "$gte":
+            return value is not None and value >= arg
+        if op == "$lt":
+            return value is not None and value < arg
+        if op == "$lte":
+            return value is not None and value <= arg
+    except TypeError:
+        return False
+    raise NotImplementedError(f"Opérateur non supporté par le stand-in Mongo: {op}")
+
+
+def _match_value(value, condition):
+    if isinstance(condition, dict) and condition and all(key.startswith("$") for key in condition):
+        for op, arg in condition.items():
+            if op == "$in":
+                ok = any(v in arg for v in value) if isinstance(value, list) else value in arg
+            elif op == "$nin":
+                ok = value not in arg
+            elif op == "$ne":
+                ok = value != arg
+            elif op == "$eq":
+                ok = value == arg
+            elif op == "$exists":
+                ok = (value is not None) == bool(arg)
+            elif isinstance(value, list):
+                ok = any(_compare(item, op, arg) for item in value)
+            else:
+                ok = _compare(value, op, arg)
+            if not ok:
+                return False
+        return True
+    if isinstance(value, list) and not isinstance(condition, list):
+        return condition in value
+    return value == condition
+
+
+def _prepare(query):
+    # Listes de $in / $nin converties une fois par requête en ensembles (appartenance en O(1))
+    prepared = {}
+    for key, condition in query.items():
+        if key in ("$or", "$and"):
+            prepared[key] = [_prepare(sub) for sub in condition]
+        elif isinstance(condition, dict) and condition.keys() & {"$in", "$nin"}:
+            prepared[key] = {op: _as_set(arg) if op in ("$in", "$nin") else arg for op, arg in condition.items()}
+        else:
+            prepared[key] = condition
+    return prepared
+
+
+def _as_set(values):
+    try:
+        return frozenset(values)
+    except TypeError:
+        return values
+
+
+def matches(doc, query):
+    for key, condition in query.items():
+        if key == "$or":
+            if not any(matches(doc, sub) for sub in condition):
+                return False
+        elif key == "$and":
+            if not all(matches(doc, sub) for sub in condition):
+                return False
+        elif not _match_value(_get(doc, key), condition):
+            return False
+    return True
+
+
+def _project(doc, projection):
+    if not projection:
+        return doc
+    included = {key for key, flag in projection.items() if flag and key != "_id"}
+    if included:
+        result = {key: doc[key] for key in included if key in doc}
+        if projection.get("_id", 1) and "_id" in doc:
+            result["_id"] = doc["_id"]
+        return result
+    return {key: value for key, value in doc.items() if projection.get(key, 1)}
+
+
+def _copy(doc):
+    return {key: copy.deepcopy(value) if isinstance(value, (dict, list)) else value for key, value in doc.items()}
+
+
+class FakeCursor:
+    def __init__(self, collection, query, projection):
+        self.collection = collection
+        self.query = _prepare(query or {})
+        self.projection = projection
+        self._sort = None
+        self._limit = 0
+        self._skip = 0
+
+    def sort(self, key_or_list, direction=None):
+        self._sort = [(key_or_list, direction or 1)] if isinstance(key_or_list, str) else list(key_or_list)
+        return self
+
+    def limit(self, limit):
+        self._limit = limit
+        return self
+
+    def skip(self, skip):
+        self._skip = skip
+        return self
+
+    def batch_size(self, batch_size):
+        return self
+
+    def _documents(self):
+        collection = self.collection
+        with collection.lock:
+            ids, in_id_order = collection.candidates(self.query)
+            wanted = self._skip + self._limit if self._limit else None
+
+            if self._sort in (None, [("_id", 1)]) and in_id_order:
+                # Déjà dans l'ordre des _id : arrêt dès que la limite est atteinte
+                docs = []
+                for doc_id in ids:
+                    doc = collection.docs.get(doc_id)
+                    if doc is not None and matches(doc, self.query):
+                        docs.append(doc)
+                        if wanted is not None and len(docs) >= wanted:
+                            break
+            else:
+                docs = [doc for doc in (collection.docs.get(doc_id) for doc_id in ids)
+                        if doc is not None and matches(doc, self.query)]
+                for key, direction in reversed(self._sort or []):
+                    docs.sort(key=lambda doc: (_get(doc, key) is not None, _sort_key(_get(doc, key))),
+                              reverse=direction < 0)
+
+            docs = docs[self._skip:wanted]
+            return [_project(_copy(doc), self.projection) for doc in docs]
+
+    def __iter__(self):
+        self.collection.round_trips.add("mongo")
+        return iter(self._documents())
+
+    def explain(self):
+        ids, _ = self.collection.candidates(self.query)
+        stage = "COLLSCAN" if len(ids) == len(self.collection.docs) and self.query else "IXSCAN"
+        return {"queryPlanner": {"winningPlan": {"stage": stage}}}
+
+
+class FakeCollection:
+    def __init__(self, name, round_trips):
+        self.name = name
+        self.round_trips = round_trips
+        self.lock = threading.RLock()
+        self.docs = {}
+        self.ids = []  # _id triés (_sort_key)
+        self.indexes = {"_id_": {"key": [("_id", 1)], "unique": True}}
+        self.lookups = {}  # champ -> {valeur: set(_id)} pour le premier champ de chaque index
+        self.uniques = {}  # nom d'index -> {tuple de valeurs: _id}
+
+    # ---------------------- Index ----------------------
+
+    def create_index(self, keys, unique=False, name=None, **kwargs):
+        keys = [(keys, 1)] if isinstance(keys, str) else list(keys)
+        name = name or "_".join(f"{field}_{direction}" for field, direction in keys)
+        with self.lock:
+            if name in self.indexes:
+                return name
+            self.indexes[name] = {"key": keys, "unique": unique}
+            field = keys[0][0]
+            if field != "_id" and field not in self.lookups:
+                self.lookups[field] = {}
+                for doc_id, doc in self.docs.items():
+                    self._lookup_add(field, doc, doc_id)
+            if unique:
+                self.uniques[name] = {}
+                for doc_id, doc in self.docs.items():
+                    self._unique_add(name, doc, doc_id)
+        return name
+
+    def index_information(self):
+        return copy.deepcopy(self.indexes)
+
+    def _unique_value(self, name, doc):
+        return tuple(_get(doc, field) for field, _ in self.indexes[name]["key"])
+
+    def _unique_check(self, name, doc, doc_id):
+        owner = self.uniques[name].get(self._unique_value(name, doc))
+        if owner is not None and owner != doc_id:
+            raise DuplicateKeyError(f"E11000 duplicate key error collection: {self.name} index: {name}",
+                                    DUPLICATE_KEY)
+
+    def _unique_add(self, name, doc, doc_id):
+        self._unique_check(name, doc, doc_id)
+        self.uniques[name][self._unique_value(name, doc)] = doc_id
+
+    def _lookup_add(self, field, doc, doc_id):
+        value = _get(doc, field)
+        for item in value if isinstance(value, list) else [value]:
+            self.lookups[field].setdefault(item, set()).add(doc_id)
+
+    def _lookup_remove(self, field, doc, doc_id):
+        value = _get(doc, field)
+        for item in value if isinstance(value, list) else [value]:
+            ids = self.lookups[field].get(item)
+            if ids:
+                ids.discard(doc_id)
+                if not ids:
+                    del self.lookups[field][item]
+
+    def _index_doc(self, doc):
+        doc_id = doc["_id"]
+        # Toutes les contraintes vérifiées avant la moindre écriture dans les index
+        for name in self.uniques:
+            self._unique_check(name, doc, doc_id)
+        for name in self.uniques:
+            self.uniques[name][self._unique_value(name, doc)] = doc_id
+        for field in self.lookups:
+            self._lookup_add(field, doc, doc_id)
+
+    def _unindex_doc(self, doc):
+        doc_id = doc["_id"]
+        for name in self.uniques:
+            value = self._unique_value(name, doc)
+            if self.uniques[name].get(value) == doc_id:
+                del self.uniques[name][value]
+        for field in self.lookups:
+            self._lookup_remove(field, doc, doc_id)
+
+    def candidates(self, query):
+        """(_id candidats, triés par _id ?) à partir de _id ou d'un champ indexé"""
+        condition = query.get("_id")
+        if condition is not None:
+            if not isinstance(condition, dict):
+                return ([condition] if condition in self.docs else []), True
+            if "$in" in condition:
+                ids = sorted({doc_id for doc_id in condition["$in"] if doc_id in self.docs}, key=_sort_key)
+                return ids, True
+            if condition.keys() & {"$gt", "$gte", "$lt", "$lte"}:
+                start, end = 0, len(self.ids)
+                if "$gt" in condition:
+                    start = bisect_right(self.ids, _sort_key(condition["$gt"]), key=_sort_key)
+                if "$gte" in condition:
+                    start = bisect_left(self.ids, _sort_key(condition["$gte"]), key=_sort_key)
+                if "$lt" in condition:
+                    end = bisect_left(self.ids, _sort_key(condition["$lt"]), key=_sort_key)
+                if "$lte" in condition:
+                    end = bisect_right(self.ids, _sort_key(condition["$lte"]), key=_sort_key)
+                return self.ids[start:end], True
+
+        for field, condition in query.items():
+            lookup = self.lookups.get(field)
+            if lookup is None:
+                continue
+            if not isinstance(condition, dict):
+                return sorted(lookup.get(condition, ()), key=_sort_key), True
+            if "$in" in condition:
+                ids = set()
+                for value in condition["$in"]:
+                    ids |= lookup.get(value, set())
+                return sorted(ids, key=_sort_key), True
+
+        return self.ids, True
+
+    # ---------------------- Lecture ----------------------
+
+    def find(self, query=None, projection=None, **kwargs):
+        return FakeCursor(self, query, projection)
+
+    def find_one(self, query=None, projection=None, **kwargs):
+        if query is not None and not isinstance(query, dict):
+            query = {"_id": query}
+        docs = FakeCursor(self, query, projection).limit(1)
+        self.round_trips.add("mongo")
+        result = docs._documents()
+        return result[0] if result else None
+
+    def count_documents(self, query, **kwargs):
+        self.round_trips.add("mongo")
+        with self.lock:
+            ids, _ = self.candidates(query)
+            return sum(1 for doc_id in ids if doc_id in self.docs and matches(self.docs[doc_id], query))
+
+    def estimated_document_count(self):
+        self.round_trips.add("mongo")
+        return len(self.docs)
+
+    # ---------------------- Écriture ----------------------
+
+    def _insert(self, document):
+        doc = _copy(document)
+        doc.setdefault("_id", ObjectId())
+        document.setdefault("_id", doc["_id"])
+        if doc["_id"] in self.docs:
+            raise DuplicateKeyError(f"E11000 duplicate key error collection: {self.name} index: _id_",
+                                    DUPLICATE_KEY)
+        self._index_doc(doc)
+        self.docs[doc["_id"]] = doc
+        insort(self.ids, doc["_id"], key=_sort_key)
+        return doc["_id"]
+
+    def insert_one(self, document, **kwargs):
+        self.round_trips.add("mongo")
+        with self.lock:
+            return InsertOneResult(self._insert(document), True)
+
+    def insert_many(self, documents, ordered=True, **kwargs):
+        self.round_trips.add("mongo")
+        inserted, errors = [], []
+        with self.lock:
+            for index, document in enumerate(documents):
+                try:
+                    inserted.append(self._insert(document))
+                except DuplicateKeyError as e:
+                    errors.append({"index": index, "code": DUPLICATE_KEY, "errmsg": str(e)})
+                    if ordered:
+                        break
+        if errors:
+            raise BulkWriteError({"writeErrors": errors, "nInserted": len(inserted), "writeConcernErrors": [],
+                                  "nUpserted": 0, "nMatched": 0, "nModified": 0, "nRemoved": 0, "upserted": []})
+        return InsertManyResult(inserted, True)
+
+    def _apply_update(self, doc, update):
+        for op, fields in update.items():
+            if op in ("$set", "$setOnInsert"):
+                for key, value in fields.items():
+                    doc[key] = copy.deepcopy(value)
+            elif op == "$inc":
+                for key, value in fields.items():
+                    doc[key] = doc.get(key, 0) + value
+            elif op == "$unset":
+                for key in fields:
+                    doc.pop(key, None)
+            elif op == "$push":
+                for key, value in fields.items():
+                    items = value["$each"] if isinstance(value, dict) and "$each" in value else [value]
+                    doc[key] = doc.get(key, []) + copy.deepcopy(items)
+            elif op == "$pull":
+                for key, condition in fields.items():
+                    doc[key] = [item for item in doc.get(key, [])
+                                if not (matches(item, _prepare(condition)) if isinstance(condition, dict)
+                                        else item == condition)]
+            else:
+                raise NotImplementedError(f"Opérateur de mise à jour non supporté par le stand-in Mongo: {op}")
+
+    def _update(self, query, update, upsert, many=False):
+        # Retourne (avant, après, upserted_id) du premier document modifié
+        ids, _ = self.candidates(query)
+        matched = [doc_id for doc_id in ids if doc_id in self.docs and matches(self.docs[doc_id], query)]
+        if not many:
+            matched = matched[:1]
+
+        first = None
+        for doc_id in matched:
+            before = self.docs[doc_id]
+            after = _copy(before)
+            self._apply_update(after, {op: fields for op, fields in update.items() if op != "$setOnInsert"})
+            self._unindex_doc(before)
+            try:
+                self._index_doc(after)
+            except DuplicateKeyError:
+                self._index_doc(before)
+                raise
+            self.docs[doc_id] = after
+            first = first or (before, after, None, len(matched))
+
+        if first is None and upsert:
+            doc = {key: value for key, value in query.items()
+                   if not key.startswith("$") and not isinstance(value, dict)}
+            self._apply_update(doc, update)
+            doc_id = self._insert(doc)
+            return None, self.docs[doc_id], doc_id, 0
+        return first or (None, None, None, 0)
+
+    def update_one(self, query, update, upsert=False, **kwargs):
+        self.round_trips.add("mongo")
+        with self.lock:
+            before, after, upserted_id, matched = self._update(query, update, upsert)
+        return UpdateResult({"n": matched or int(upserted_id is not None), "nModified": matched,
+                             "upserted": upserted_id}, True)
+
+    def update_many(self, query, update, upsert=False, **kwargs):
+        self.round_trips.add("mongo")
+        with self.lock:
+            before, after, upserted_id, matched = self._update(query, update, upsert, many=True)
+        return UpdateResult({"n": matched, "nModified": matched, "upserted": upserted_id}, True)
+
+    def find_one_and_update(self, query, update, projection=None, upsert=False,
+                            return_document=ReturnDocument.BEFORE, **kwargs):
+        self.round_trips.add("mongo")
+        with self.lock:
+            before, after, upserted_id, matched = self._update(query, update, upsert)
+        doc = after if return_document == ReturnDocument.AFTER else before
+        return _project(_copy(doc), projection) if doc is not None else None
+
+    def _delete(self, query, many):
+        with self.lock:
+            ids, _ = self.candidates(query)
+            matched = [doc_id for doc_id in ids if doc_id in self.docs and matches(self.docs[doc_id], query)]
+            if not many:
+                matched = matched[:1]
+            for doc_id in matched:
+                self._unindex_doc(self.docs.pop(doc_id))
+                del self.ids[bisect_left(self.ids, _sort_key(doc_id), key=_sort_key)]
+        return DeleteResult({"n": len(matched)}, True)
+
+    def delete_one(self, query, **kwargs):
+        self.round_trips.add("mongo")
+        return self._delete(query, many=False)
+
+    def delete_many(self, query, **kwargs):
+        self.round_trips.add("mongo")
+        return self._delete(query, many=True)
+
+
+class FakeDatabase:
+    def __init__(self, round_trips):
+        self.round_trips = round_trips
+        self.collections = {}
+        self.lock = threading.Lock()
+
+    def __getitem__(self, name):
+        with self.lock:
+            if name not in self.collections:
+                self.collections[name] = FakeCollection(name, self.round_trips)
+            return self.collections[name]
+
+    def __getattr__(self, name):
+        if name.startswith("_"):
+            raise AttributeError(name)
+        return self[name]
+
+    def list_collection_names(self):
+        self.round_trips.add("mongo")
+        return list(self.collections)
+
+
+class FakePyMongo:
+    """Même interface que flask_pymongo.PyMongo : attributs .db et .cx (options du MongoClient comprises)"""
+
+    def __init__(self, round_trips):
+        self.db = FakeDatabase(round_trips)
+        self.cx = self
+        self.options = SimpleNamespace(pool_options=SimpleNamespace(max_pool_size=100))
+
+
+# ---------------------- Client asynchrone (asgi.py) ----------------------
+
+class FakeAsyncCursor:
+    def __init__(self, cursor):
+        self.cursor = cursor
+
+    def __getattr__(self, name):
+        # sort / limit / skip / batch_size : chaînables comme sur le curseur synchrone
+        method = getattr(self.cursor, name)
+
+        def chain(*args, **kwargs):
+            method(*args, **kwargs)
+            return self
+
+        return chain
+
+    async def to_list(self, length=None):
+        documents = await self.cursor.collection.round_trips.async_call(list, self.cursor)
+        return documents if length is None else documents[:length]
+
+
+class FakeAsyncCollection:
+    def __init__(self, collection):
+        self.collection = collection
+
+    def find(self, *args, **kwargs):
+        return FakeAsyncCursor(self.collection.find(*args, **kwargs))
+
+    def __getattr__(self, name):
+        method = getattr(self.collection, name)
+
+        async def call(*args, **kwargs):
+            return await self.collection.round_trips.async_call(method, *args, **kwargs)
+
+        return call
+
+
+class FakeAsyncDatabase:
+    def __init__(self, database):
+        self.database = database
+
+    def __getitem__(self, name):
+        return FakeAsyncCollection(self.database[name])
+
+    def __getattr__(self, name):
+        if name.startswith("_"):
+            raise AttributeError(name)
+        return self[name]
+
+
+class FakeAsyncMongoClient:
+    """Même interface que pymongo.AsyncMongoClient pour asgi.py, sur les données du stand-in synchrone"""
+
+    def __init__(self, database):
+        self.database = database
+
+    def get_default_database(self):
+        return FakeAsyncDatabase(self.database)
+
+    async def close(self):
+        pass
@@ -0,0 +1,462 @@
+# benchmarks/neo4j_standin.py
+# Remplaçant en mémoire du driver Neo4j pour les benchmarks. Il ne comprend pas le Cypher :
+# chaque requête utilisée par les routes mesurées est reconnue par son texte et rejouée sur un
+# graphe en mémoire (index par id, par docteur/patient et par start_time). Une requête inconnue
+# lève NotImplementedError, pour qu'un changement de requête ne passe pas inaperçu.
+
+import re
+import threading
+from bisect import bisect_left, bisect_right, insort
+from datetime import datetime, timedelta
+from functools import lru_cache
+
+EPOCH = datetime(1970, 1, 1)
+
+
+def normalize(query):
+    return " ".join(query.split())
+
+
+def _datetime(value):
+    return datetime.fromisoformat(value) if isinstance(value, str) else value
+
+
+def _epoch_seconds(value):
+    # datetime($iso) sans fuseau est stocké en UTC
+    return (value - EPOCH) // timedelta(seconds=1)
+
+
+class FakeRecord(dict):
+    def data(self):
+        return dict(self)
+
+    def value(self, key=0):
+        return list(self.values())[key] if isinstance(key, int) else self[key]
+
+
+class _Summary:
+    plan = None
+
+
+class FakeResult:
+    def __init__(self, records):
+        self.records = [FakeRecord(record) for record in records]
+
+    def __iter__(self):
+        return iter(self.records)
+
+    def single(self):
+        return self.records[0] if self.records else None
+
+    def data(self):
+        return [record.data() for record in self.records]
+
+    def consume(self):
+        return _Summary()
+
+
+class Graph:
+    def __init__(self):
+        self.lock = threading.RLock()
+        self.doctors = {}
+        self.patients = {}
+        self.admins = {}
+        self.rejected = {}
+        self.doctor_of = {}  # patient -> {docteurs} (EST_SUIVI_PAR)
+        self.panel = {}  # docteur -> {patients}
+        self.consultations = {}  # id -> propriétés + doctor_id / patient_id
+        self.by_doctor = {}  # docteur -> {consultations}
+        self.by_patient = {}  # patient -> {consultations}
+        self.by_start = []  # [(start_time, id)] trié
+        self.approvals = set()
+        self.rejections = set()
+
+    # ---------------------- Mutations ----------------------
+
+    def follow(self, patient_id, doctor_id):
+        if patient_id in self.patients and doctor_id in self.doctors:
+            self.doctor_of.setdefault(patient_id, set()).add(doctor_id)
+            self.panel.setdefault(doctor_id, set()).add(patient_id)
+
+    def unfollow_all(self, patient_id):
+        for doctor_id in self.doctor_of.pop(patient_id, set()):
+            self.panel.get(doctor_id, set()).discard(patient_id)
+
+    def add_consultation(self, props):
+        consultation_id = props["id"]
+        existing = self.consultations.get(consultation_id)
+        if existing:
+            self.remove_consultation(consultation_id)
+        if props.get("start_time") is not None:
+            # c.start_time.epochSeconds / c.end_time.epochSeconds, calculés à l'écriture
+            props["epoch_seconds"] = (_epoch_seconds(props["start_time"]), _epoch_seconds(props["end_time"]))
+        self.consultations[consultation_id] = props
+        self.by_doctor.setdefault(props["doctor_id"], set()).add(consultation_id)
+        self.by_patient.setdefault(props["patient_id"], set()).add(consultation_id)
+        if props.get("start_time") is not None:
+            insort(self.by_start, (props["start_time"], consultation_id))
+
+    def remove_consultation(self, consultation_id):
+        props = self.consultations.pop(consultation_id, None)
+        if not props:
+            return
+        self.by_doctor.get(props["doctor_id"], set()).discard(consultation_id)
+        self.by_patient.get(props["patient_id"], set()).discard(consultation_id)
+        if props.get("start_time") is not None:
+            self.by_start.remove((props["start_time"], consultation_id))
+
+    def delete_doctor(self, doctor_id):
+        self.doctors.pop(doctor_id, None)
+        for patient_id in self.panel.pop(doctor_id, set()):
+            self.doctor_of.get(patient_id, set()).discard(doctor_id)
+        for consultation_id in list(self.by_doctor.pop(doctor_id, set())):
+            self.consultations[consultation_id]["doctor_id"] = None
+
+    def delete_patient(self, patient_id):
+        self.patients.pop(patient_id, None)
+        self.unfollow_all(patient_id)
+        for consultation_id in list(self.by_patient.pop(patient_id, set())):
+            self.consultations[consultation_id]["patient_id"] = None
+
+    # ---------------------- Lectures ----------------------
+
+    def filtered_consultations(self, ids, params):
+        etat = params.get("etat")
+        date_from = _datetime(params.get("date_from"))
+        date_to = _datetime(params.get("date_to"))
+        for consultation_id in ids:
+            c = self.consultations[consultation_id]
+            start = c.get("start_time")
+            if etat is not None and c.get("etat") != etat:
+                continue
+            if date_from is not None and (start is None or start < date_from):
+                continue
+            if date_to is not None and (start is None or start >= date_to):
+                continue
+            yield c
+
+    def starting_from(self, first, before):
+        # Consultations avec first <= start_time < before (index start_time)
+        i = bisect_left(self.by_start, (first,))
+        while i < len(self.by_start) and self.by_start[i][0] < before:
+            yield self.consultations[self.by_start[i][1]]
+            i += 1
+
+    def starting_between(self, after, before):
+        # Consultations avec after < start_time < before (index start_time)
+        i = bisect_right(self.by_start, (after, "\uffff"))
+        while i < len(self.by_start) and self.by_start[i][0] < before:
+            yield self.consultations[self.by_start[i][1]]
+            i += 1
+
+
+# ---------------------- Requêtes reconnues ----------------------
+
+def _consultation_listing(graph, params, query, owner):
+    # get_consultations_by_doctor / get_consultations_by_patient
+    owner_id = params["did"] if owner == "doctor" else params["pid"]
+    ids = (graph.by_doctor if owner == "doctor" else graph.by_patient).get(owner_id, set())
+    consultations = sorted(graph.filtered_consultations(ids, params),
+                           key=lambda c: c.get("start_time") or _datetime(c.get("date")) or datetime.min)
+    if "LIMIT $limit" in query:
+        consultations = consultations[:params["limit"]]
+    other = "patient_id" if owner == "doctor" else "doctor_id"
+    return [{"consultation_id": c["id"], other: c[other], "date": c.get("date"),
+             "etat": c.get("etat"), "description": c.get("description")} for c in consultations]
+
+
+def _booking_lock(graph, params, query):
+    return [{"doctor_exists": params["doctor_id"] in graph.doctors,
+             "patient_exists": params["patient_id"] in graph.patients}]
+
+
+def _booking_conflicts(graph, params, query):
+    start, end = _datetime(params["start_time"]), _datetime(params["end_time"])
+    doctor_conflict = patient_conflict = False
+    for c in graph.starting_between(_datetime(params["window_start"]), end):
+        if c.get("etat") in params["freeing"] or not start < c["end_time"]:
+            continue
+        doctor_conflict = doctor_conflict or c["doctor_id"] == params["doctor_id"]
+        patient_conflict = patient_conflict or c["patient_id"] == params["patient_id"]
+    return [{"doctor_conflict": doctor_conflict, "patient_conflict": patient_conflict}]
+
+
+def _booking_create(graph, params, query):
+    if params["patient_id"] in graph.patients and params["doctor_id"] in graph.doctors:
+        graph.add_consultation({
+            "id": params["consultation_id"],
+            "mongo_id": params["consultation_id"],
+            "start_time": _datetime(params["start_time"]),
+            "end_time": _datetime(params["end_time"]),
+            "etat": params["etat"],
+            "description": params["description"],
+            "doctor_id": params["doctor_id"],
+            "patient_id": params["patient_id"],
+        })
+    return []
+
+
+def _booked_intervals(graph, params, query):
+    ids = set(params["ids"])
+    intervals = {}
+    for c in graph.starting_from(_datetime(params["window_start"]), _datetime(params["end"])):
+        if c.get("etat") not in params["freeing"] and c["doctor_id"] in ids:
+            intervals.setdefault(c["doctor_id"], []).append(list(c["epoch_seconds"]))
+    return [{"doctor_id": doctor_id, "intervals": rows} for doctor_id, rows in intervals.items()]
+
+
+def _schedule_rebuild(graph, params, query):
+    now = datetime.now()
+    return [{"consultation_id": c["id"], "doctor_id": c["doctor_id"], "patient_id": c["patient_id"],
+             "start_time": c["start_time"], "end_time": c["end_time"]}
+            for c in graph.consultations.values()
+            if c.get("end_time") and c["end_time"] > now and c.get("etat") not in params["freeing"]
+            and c["doctor_id"] and c["patient_id"]]
+
+
+def _schedule_confirm(graph, params, query):
+    return [{"consultation_id": cid} for cid in params["ids"]
+            if cid in graph.consultations and graph.consultations[cid].get("etat") not in params["freeing"]]
+
+
+def _export_consultations(graph, params, query):
+    return [{"consultation_id": c["id"], "patient_id": c["patient_id"], "doctor_id": c["doctor_id"],
+             "start_time": c.get("start_time"), "end_time": c.get("end_time"),
+             "etat": c.get("etat"), "description": c.get("description")}
+            for c in graph.filtered_consultations(list(graph.consultations), params)
+            if c["patient_id"] and c["doctor_id"]]
+
+
+def _export_panels(graph, params, query):
+    records = []
+    for patient_id, doctor_ids in graph.doctor_of.items():
+        patient = graph.patients[patient_id]
+        for doctor_id in doctor_ids:
+            doctor = graph.doctors[doctor_id]
+            records.append({"doctor_id": doctor_id, "doctor_nom": doctor.get("nom"),
+                            "doctor_prenom": doctor.get("prenom"), "specialite": doctor.get("specialite"),
+                            "patient_id": patient_id, "patient_nom": patient.get("nom"),
+                            "patient_prenom": patient.get("prenom")})
+    return records
+
+
+def _rows(handler):
+    # Requêtes UNWIND $rows : le handler est appliqué ligne par ligne
+    def run(graph, params, query):
+        for row in params["rows"]:
+            handler(graph, row)
+        return []
+    return run
+
+
+def _set_node(nodes, row, fields):
+    nodes.setdefault(row["id"], {"id": row["id"]}).update({key: row.get(key) for key in fields})
+
+
+def _update_node(nodes, row):
+    if row["id"] in nodes:
+        nodes[row["id"]].update(row["fields"])
+
+
+def _set_status(graph, row):
+    if row["id"] in graph.consultations:
+        graph.consultations[row["id"]]["etat"] = row["etat"]
+
+
+def _import_consultation(graph, row):
+    if row["patient_id"] in graph.patients and row["doctor_id"] in graph.doctors:
+        graph.add_consultation({
+            "id": row["id"], "mongo_id": row["id"],
+            "start_time": _datetime(row["start_time"]), "end_time": _datetime(row["end_time"]),
+            "etat": row["etat"], "description": row["description"],
+            "doctor_id": row["doctor_id"], "patient_id": row["patient_id"],
+        })
+
+
+def _approve(graph, row):
+    graph.admins.setdefault(row["admin_id"], {"id": row["admin_id"]})
+    if row["id"] in graph.doctors:
+        graph.approvals.add((row["admin_id"], row["id"]))
+
+
+def _reject(graph, row):
+    graph.admins.setdefault(row["admin_id"], {"id": row["admin_id"]})
+    graph.rejected[row["id"]] = {key: row.get(key) for key in ("email", "nom", "prenom")}
+    graph.rejections.add((row["admin_id"], row["id"]))
+
+
+@lru_cache(maxsize=None)
+def exact_queries():
+    # Importé au premier appel : les services ne doivent être chargés qu'après l'injection des drivers
+    from BackEnd.Services.ImportService import ASSIGN_DOCTORS, CREATE_CONSULTATIONS
+    from BackEnd.Services.OutboxService import SYNC_OPERATIONS
+
+    return {
+        normalize(SYNC_OPERATIONS["doctor.create"]):
+            _rows(lambda g, row: _set_node(g.doctors, row, ("nom", "prenom", "specialite", "email"))),
+        normalize(SYNC_OPERATIONS["doctor.update"]): _rows(lambda g, row: _update_node(g.doctors, row)),
+        normalize(SYNC_OPERATIONS["doctor.delete"]): _rows(lambda g, row: g.delete_doctor(row["id"])),
+        normalize(SYNC_OPERATIONS["doctor.approved"]): _rows(_approve),
+        normalize(SYNC_OPERATIONS["doctor_request.rejected"]): _rows(_reject),
+        normalize(SYNC_OPERATIONS["patient.create"]):
+            _rows(lambda g, row: _set_node(g.patients, row, ("nom", "prenom", "email"))),
+        normalize(SYNC_OPERATIONS["patient.update"]): _rows(lambda g, row: _update_node(g.patients, row)),
+        normalize(SYNC_OPERATIONS["patient.delete"]): _rows(lambda g, row: g.delete_patient(row["id"])),
+        normalize(SYNC_OPERATIONS["consultation.status"]): _rows(_set_status),
+        normalize(ASSIGN_DOCTORS): _rows(lambda g, row: g.follow(row["patient_id"], row["doctor_id"])),
+        normalize(CREATE_CONSULTATIONS): _rows(_import_consultation),
+    }
+
+# (motif, handler) : premier motif trouvé dans la requête normalisée
+PATTERN_QUERIES = [
+    (r"^SHOW (CONSTRAINTS|INDEXES)", lambda g, p, q: []),
+    (r"^CREATE (CONSTRAINT|INDEX) ", lambda g, p, q: []),
+    (r"WHERE c\.end_time > datetime\(\) AND NOT c\.etat IN \$freeing", _schedule_rebuild),
+    (r"WHERE c\.id IN \$ids AND NOT c\.etat IN \$freeing", _schedule_confirm),
+    (r"^UNWIND \$ids AS did OPTIONAL MATCH \(p:Patient\)-\[:EST_SUIVI_PAR\]->\(d:Doctor \{id: did\}\)",
+     lambda g, p, q: [{"doctor_id": did, "patient_count": len(g.panel.get(did, ()))} for did in p["ids"]]),
+    (r"^UNWIND \$ids AS pid MATCH \(p:Patient \{id: pid\}\)-\[:EST_SUIVI_PAR\]->\(d:Doctor\)",
+     lambda g, p, q: [{"patient_id": pid, "doctor_id": did}
+                      for pid in p["ids"] for did in g.doctor_of.get(pid, ())]),
+    (r"^MATCH \(p:Patient\)-\[:EST_SUIVI_PAR\]->\(d:Doctor \{id: \$id\}\) RETURN p\.id as patient_id",
+     lambda g, p, q: [{"patient_id": pid} for pid in g.panel.get(p["id"], ())]),
+    (r"^MATCH \(p:Patient \{id: \$id\}\)-\[:EST_SUIVI_PAR\]->\(d:Doctor\) RETURN d\.id as doctor_id",
+     lambda g, p, q: [{"doctor_id": did} for did in g.doctor_of.get(p["id"], ())]),
+    (r"^MATCH \(d:Doctor \{id: \$did\}\)-\[:A_CONSULTATION\]->\(c:Consultation\)",
+     lambda g, p, q: _consultation_listing(g, p, q, "doctor")),
+    (r"^MATCH \(p:Patient \{id: \$pid\}\)-\[:A_CONSULTATION\]->\(c:Consultation\)",
+     lambda g, p, q: _consultation_listing(g, p, q, "patient")),
+    (r"^OPTIONAL MATCH \(d:Doctor \{id: \$doctor_id\}\) OPTIONAL MATCH \(p:Patient \{id: \$patient_id\}\) FOREACH",
+     _booking_lock),
+    (r"^CALL \{ MATCH \(c:Consultation\) WHERE c\.start_time > datetime\(\$window_start\)", _booking_conflicts),
+    (r"^MATCH \(p:Patient \{id: \$patient_id\}\), \(d:Doctor \{id: \$doctor_id\}\) CREATE \(c:Consultation",
+     _booking_create),
+    (r"^MATCH \(c:Consultation\) WHERE c\.start_time >= datetime\(\$window_start\) AND c\.start_time < datetime\(\$end\)",
+     _booked_intervals),
+    (r"^MATCH \(d:Doctor \{id: \$doctor_id\}\)-\[:A_CONSULTATION\]->\(c:Consultation \{id: \$cid\}\) RETURN count",
+     lambda g, p, q: [{"owned": g.consultations.get(p["cid"], {}).get("doctor_id") == p["doctor_id"]}]),
+    (r"^MATCH \(p:Patient\)-\[:A_CONSULTATION\]->\(c:Consultation \{mongo_id: \$id\}\)",
+     lambda g, p, q: [{"patient_id": c["patient_id"], "doctor_id": c["doctor_id"]}
+                      for c in [g.consultations.get(p["id"])] if c]),
+    (r"^MATCH \(c:Consultation \{id: \$id\}\) DETACH DELETE c",
+     lambda g, p, q: g.remove_consultation(p["id"]) or []),
+    (r"^MATCH \(c:Consultation\) .*RETURN c\.id as consultation_id, p\.id as patient_id, d\.id as doctor_id",
+     _export_consultations),
+    (r"^MATCH \(p:Patient\)-\[:EST_SUIVI_PAR\]->\(d:Doctor\) RETURN d\.id as doctor_id", _export_panels),
+]
+PATTERN_QUERIES = [(re.compile(pattern), handler) for pattern, handler in PATTERN_QUERIES]
+
+
+class FakeSession:
+    def __init__(self, driver):
+        self.driver = driver
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        pass
+
+    def run(self, query, parameters=None, **kwargs):
+        self.driver.round_trips.add("neo4j")
+        params = {**(parameters or {}), **kwargs}
+        text = normalize(query)
+        graph = self.driver.graph
+
+        handler = exact_queries().get(text)
+        if handler is None:
+            handler = next((h for pattern, h in PATTERN_QUERIES if pattern.search(text)), None)
+        if handler is None:
+            raise NotImplementedError(f"Requête non reconnue par le stand-in Neo4j: {text[:200]}")
+
+        with graph.lock:
+            return FakeResult(handler(graph, params, text))
+
+    # Transactions : la fonction reçoit la session, qui expose la même méthode run ;
+    # le verrou du graphe est tenu jusqu'au commit, comme les verrous d'écriture de Neo4j
+    def execute_write(self, work, *args, **kwargs):
+        with self.driver.graph.lock:
+            return work(self, *args, **kwargs)
+
+    execute_read = execute_write
+    write_transaction = execute_write
+    read_transaction = execute_write
+
+
+class FakeNeo4jDriver:
+    """Même interface que neo4j.GraphDatabase.driver(...) pour les appels des services"""
+
+    def __init__(self, round_trips):
+        self.round_trips = round_trips
+        self.graph = Graph()
+
+    def session(self, **kwargs):
+        return FakeSession(self)
+
+    def verify_connectivity(self):
+        pass
+
+    def close(self):
+        pass
+
+
+# ---------------------- Driver asynchrone (asgi.py) ----------------------
+
+class FakeAsyncResult:
+    def __init__(self, result):
+        self.result = result
+
+    async def __aiter__(self):
+        for record in self.result:
+            yield record
+
+    async def single(self):
+        return self.result.single()
+
+    async def data(self):
+        return self.result.data()
+
+    async def consume(self):
+        return self.result.consume()
+
+
+class FakeAsyncSession:
+    def __init__(self, session):
+        self.session = session
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+    async def close(self):
+        self.session.close()
+
+    async def run(self, query, parameters=None, **kwargs):
+        result = await self.session.driver.round_trips.async_call(self.session.run, query, parameters, **kwargs)
+        return FakeAsyncResult(result)
+
+    async def execute_write(self, work, *args, **kwargs):
+        return await work(self, *args, **kwargs)
+
+    execute_read = execute_write
+
+
+class FakeAsyncNeo4jDriver:
+    """Même interface que neo4j.AsyncGraphDatabase.driver(...) sur le graphe du stand-in synchrone"""
+
+    def __init__(self, driver):
+        self.driver = driver
+
+    def session(self, **kwargs):
+        return FakeAsyncSession(self.driver.session(**kwargs))
+
+    async def verify_connectivity(self):
+        pass
+
+    async def close(self):
+        pass
@@ -0,0 +1,251 @@
+# benchmarks/seed.py
+# Clinique synthétique reproductible (graine fixe) écrite avec les mêmes requêtes que l'import :
+# insert_many dans Mongo, SYNC_OPERATIONS / ASSIGN_DOCTORS / CREATE_CONSULTATIONS dans Neo4j.
+
+import random
+from datetime import datetime, timedelta
+
+from bson import ObjectId
+
+from BackEnd.Constantes import horaires_consultation, jours_ouvres, specialites
+from BackEnd.Services import db as db_services
+from BackEnd.Services.AuthService import hash_password
+from BackEnd.Services.DocteurService import CONSULTATION_STATES
+from BackEnd.Services.IdentityService import PENDING_DOCTOR_ROLE, identities
+from BackEnd.Services.ImportService import ASSIGN_DOCTORS, CREATE_CONSULTATIONS, _write_nodes
+from BackEnd.Services.OutboxService import SYNC_OPERATIONS
+from BackEnd.Services.PatientServices import CONSULTATION_DURATION
+
+SEED_BATCH_SIZE = 5000
+BENCH_PASSWORD = "benchmark-password"
+
+# Collections vidées par --reset (mode containers)
+BENCH_COLLECTIONS = ["identities", "doctors", "patients", "admins", "pending_doctors",
+                     "rejected_doctors", "consultations", "outbox", "outbox_state"]
+
+
+class Clinic:
+    """Ids générés, utilisés par les scénarios"""
+
+    def __init__(self):
+        self.admin_id = None
+        self.doctor_ids = []
+        self.patient_ids = []
+        self.patient_emails = []
+        self.patient_doctor = {}
+        self.pending_ids = []
+        self.password = BENCH_PASSWORD
+
+
+def reset_databases():
+    """Vide les collections et le graphe utilisés par l'application (mode containers uniquement)"""
+    for name in BENCH_COLLECTIONS:
+        db_services.mongo.db[name].delete_many({})
+    with db_services.neo4j_driver.session() as session:
+        session.run("""
+            MATCH (n) CALL { WITH n DETACH DELETE n } IN TRANSACTIONS OF 10000 ROWS
+        """).consume()
+
+
+def _insert_users(collection, role, documents):
+    for chunk in db_services.chunked(documents, SEED_BATCH_SIZE):
+        db_services.mongo.db[collection].insert_many(chunk, ordered=False)
+        identities().insert_many([
+            {"email": doc["email"], "role": role, "user_id": doc["_id"], "mot_de_passe": doc["mot_de_passe"]}
+            for doc in chunk
+        ], ordered=False)
+
+
+def _doctor_document(rng, number, password_hash, now):
+    return {
+        "_id": ObjectId(),
+        "nom": f"Docteur{number}",
+        "prenom": rng.choice(["Amine", "Sara", "Yanis", "Lina", "Karim", "Nadia"]),
+        "email": f"doctor{number}@bench.local",
+        "specialite": rng.choice(sorted(specialites)),
+        "mot_de_passe": password_hash,
+        "tel": f"06{number:08d}",
+        "role": "doctor",
+        "created_at": now,
+    }
+
+
+def _insert_consultations(rows, now):
+    # rows : (patient_id, doctor_id, début, état)
+    documents, node_rows = [], []
+    for patient_id, doctor_id, slot, etat in rows:
+        consultation_id = ObjectId()
+        documents.append({
+            "_id": consultation_id,
+            "date_str": slot.strftime("%Y-%m-%d %H:%M"),
+            "date": slot,
+            "etat": etat,
+            "description": "",
+            "created_at": now,
+        })
+        node_rows.append({
+            "id": str(consultation_id),
+            "patient_id": patient_id,
+            "doctor_id": doctor_id,
+            "start_time": slot.isoformat(),
+            "end_time": (slot + CONSULTATION_DURATION).isoformat(),
+            "etat": etat,
+            "description": "",
+        })
+    db_services.mongo.db.consultations.insert_many(documents, ordered=False)
+    _write_nodes([(CREATE_CONSULTATIONS, node_rows)])
+
+
+def seed_clinic(doctors, patients, consultations, pending, seed=42, progress=None):
+    rng = random.Random(seed)
+    clinic = Clinic()
+    now = datetime.now().replace(second=0, microsecond=0)
+    # Un seul hash pour tous les comptes : le hachage n'est pas ce qu'on mesure ici
+    password_hash = hash_password(BENCH_PASSWORD)
+
+    admin = {"_id": ObjectId(), "nom": "Admin", "prenom": "Bench", "email": "admin@bench.local",
+             "mot_de_passe": password_hash, "role": "admin"}
+    _insert_users("admins", "admin", [admin])
+    clinic.admin_id = str(admin["_id"])
+
+    doctor_docs = [_doctor_document(rng, number, password_hash, now) for number in range(doctors)]
+    _insert_users("doctors", "doctor", doctor_docs)
+    for chunk in db_services.chunked(doctor_docs, SEED_BATCH_SIZE):
+        _write_nodes([(SYNC_OPERATIONS["doctor.create"], [
+            {"id": str(doc["_id"]), **{key: doc[key] for key in ("nom", "prenom", "email", "specialite")}}
+            for doc in chunk
+        ])])
+    clinic.doctor_ids = [str(doc["_id"]) for doc in doctor_docs]
+    if progress:
+        progress("doctors", doctors)
+
+    for start in range(0, patients, SEED_BATCH_SIZE):
+        chunk = []
+        for number in range(start, min(start + SEED_BATCH_SIZE, patients)):
+            chunk.append({
+                "_id": ObjectId(),
+                "nom": f"Patient{number}",
+                "prenom": rng.choice(["Ali", "Emma", "Hugo", "Ines", "Omar", "Zoe"]),
+                "date_naissance": f"{rng.randint(1940, 2015)}-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}",
+                "mot_de_passe": password_hash,
+                "maladie": rng.choice(["Diabète", "Hypertension", "Asthme", "Aucune"]),
+                "description_maladie": "",
+                "email": f"patient{number}@bench.local",
+                "tel": f"07{number:08d}",
+                "role": "patient",
+            })
+        _insert_users("patients", "patient", chunk)
+        assignments = []
+        for doc in chunk:
+            patient_id, doctor_id = str(doc["_id"]), rng.choice(clinic.doctor_ids)
+            clinic.patient_ids.append(patient_id)
+            clinic.patient_emails.append(doc["email"])
+            clinic.patient_doctor[patient_id] = doctor_id
+            assignments.append({"patient_id": patient_id, "doctor_id": doctor_id})
+        _write_nodes([
+            (SYNC_OPERATIONS["patient.create"], [
+                {"id": str(doc["_id"]), **{key: doc[key] for key in ("nom", "prenom", "email")}} for doc in chunk
+            ]),
+            (ASSIGN_DOCTORS, assignments),
+        ])
+        if progress:
+            progress("patients", len(clinic.patient_ids))
+
+    # Consultations sur créneaux horaires (8h-17h) entre -2 ans et +60 jours, surtout chez le docteur du patient
+    first_day = (now - timedelta(days=730)).replace(hour=0, minute=0)
+    for start in range(0, consultations, SEED_BATCH_SIZE):
+        rows = []
+        for _ in range(start, min(start + SEED_BATCH_SIZE, consultations)):
+            patient_id = rng.choice(clinic.patient_ids)
+            doctor_id = clinic.patient_doctor[patient_id] if rng.random() < 0.9 else rng.choice(clinic.doctor_ids)
+            slot = first_day + timedelta(days=rng.randrange(790), hours=rng.randint(8, 17))
+            rows.append((patient_id, doctor_id, slot, rng.choice(CONSULTATION_STATES)))
+        _insert_consultations(rows, now)
+        if progress:
+            progress("consultations", start + len(rows))
+
+    # Demandes d'inscription docteur, consommées par le scénario review-doctor
+    pending_docs = [_doctor_document(rng, doctors + number, password_hash, now) for number in range(pending)]
+    for doc in pending_docs:
+        doc.pop("role")
+        doc["email"] = doc["email"].replace("doctor", "pending")
+        doc["status"] = "pending"
+    _insert_users("pending_doctors", PENDING_DOCTOR_ROLE, pending_docs)
+    clinic.pending_ids = [str(doc["_id"]) for doc in pending_docs]
+
+    return clinic
+
+
+def seed_doctor_history(number, consultations, seed=42):
+    """Docteur (et son patient) avec `consultations` consultations passées ; retourne l'id du docteur"""
+    rng = random.Random(seed + number)
+    now = datetime.now().replace(second=0, microsecond=0)
+    password_hash = hash_password(BENCH_PASSWORD)
+
+    doctor = _doctor_document(rng, number, password_hash, now)
+    doctor["email"] = f"history{number}@bench.local"
+    _insert_users("doctors", "doctor", [doctor])
+    patient = {"_id": ObjectId(), "nom": f"Historique{number}", "prenom": "Bench",
+               "email": f"history-patient{number}@bench.local", "mot_de_passe": password_hash, "role": "patient"}
+    _insert_users("patients", "patient", [patient])
+    doctor_id, patient_id = str(doctor["_id"]), str(patient["_id"])
+    _write_nodes([
+        (SYNC_OPERATIONS["doctor.create"], [
+            {"id": doctor_id, **{key: doctor[key] for key in ("nom", "prenom", "email", "specialite")}}
+        ]),
+        (SYNC_OPERATIONS["patient.create"], [
+            {"id": patient_id, **{key: patient[key] for key in ("nom", "prenom", "email")}}
+        ]),
+        (ASSIGN_DOCTORS, [{"patient_id": patient_id, "doctor_id": doctor_id}]),
+    ])
+
+    # Une consultation par heure ouvrée en remontant dans le passé
+    first_slot = (now - timedelta(days=1)).replace(hour=8, minute=0)
+    slots = (first_slot - timedelta(days=i // 10, hours=-(i % 10)) for i in range(consultations))
+    for chunk in db_services.chunked(slots, SEED_BATCH_SIZE):
+        _insert_consultations([(patient_id, doctor_id, slot, rng.choice(CONSULTATION_STATES)) for slot in chunk], now)
+    return doctor_id
+
+
+def seed_availability(doctors, specialite, first_day, days, per_day=4, seed=42):
+    """`doctors` docteurs de `specialite`, `per_day` consultations par jour ouvré sur `days` jours
+    à partir de `first_day` ; retourne les ids des docteurs"""
+    rng = random.Random(seed)
+    now = datetime.now().replace(second=0, microsecond=0)
+    password_hash = hash_password(BENCH_PASSWORD)
+    opening, closing = horaires_consultation
+
+    doctor_docs = []
+    for number in range(doctors):
+        doctor = _doctor_document(rng, 800000 + number, password_hash, now)
+        doctor["email"] = f"availability{number}@bench.local"
+        doctor["specialite"] = specialite
+        doctor_docs.append(doctor)
+    _insert_users("doctors", "doctor", doctor_docs)
+    patient = {"_id": ObjectId(), "nom": "Disponibilites", "prenom": "Bench",
+               "email": "availability-patient@bench.local", "mot_de_passe": password_hash, "role": "patient"}
+    _insert_users("patients", "patient", [patient])
+    patient_id = str(patient["_id"])
+    doctor_ids = [str(doc["_id"]) for doc in doctor_docs]
+    _write_nodes([
+        (SYNC_OPERATIONS["doctor.create"], [
+            {"id": str(doc["_id"]), **{key: doc[key] for key in ("nom", "prenom", "email", "specialite")}}
+            for doc in doctor_docs
+        ]),
+        (SYNC_OPERATIONS["patient.create"], [
+            {"id": patient_id, **{key: patient[key] for key in ("nom", "prenom", "email")}}
+        ]),
+    ])
+
+    # Créneaux horaires distincts tirés dans les heures d'ouverture de chaque jour ouvré
+    rows = []
+    for doctor_id in doctor_ids:
+        for offset in range(days):
+            day = first_day + timedelta(days=offset)
+            if day.weekday() not in jours_ouvres:
+                continue
+            for hour in rng.sample(range(opening, closing), min(per_day, closing - opening)):
+                rows.append((patient_id, doctor_id, day.replace(hour=hour), "prévue"))
+    for chunk in db_services.chunked(rows, SEED_BATCH_SIZE):
+        _insert_consultations(chunk, now)
+    return doctor_ids
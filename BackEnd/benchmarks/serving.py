@@ -0,0 +1,106 @@
+# benchmarks/serving.py
+# Débit et latence sous charge des lectures chaudes : application Flask (WSGI, un thread
+# par requête en vol) contre asgi.py (Quart, une tâche asyncio par requête en vol).
+# Les deux passent par leur client de test, donc mêmes crochets (ETag, compression,
+# métriques) et même stand-in ; seule la façon d'attendre la base change.
+
+import asyncio
+import random
+import threading
+import time
+from collections import Counter
+
+from BackEnd.benchmarks.harness import percentile
+
+
+def hot_paths(clinic):
+    """Fonctions rng -> chemin des lectures servies par les deux modes"""
+    return [
+        lambda rng: f"/doctor/{rng.choice(clinic.doctor_ids)}",
+        lambda rng: f"/doctor/{rng.choice(clinic.doctor_ids)}/patients",
+        lambda rng: f"/doctor/{rng.choice(clinic.doctor_ids)}/consultations",
+        lambda rng: f"/patient/{rng.choice(clinic.patient_ids)}/consultations",
+    ]
+
+
+def summarize(latencies, statuses, elapsed):
+    latencies.sort()
+    return {
+        "requests": len(latencies),
+        "errors": sum(count for status, count in statuses.items() if not status.startswith("2")),
+        "status_codes": dict(statuses),
+        "rps": round(len(latencies) / elapsed, 1),
+        "latency_ms": {
+            "p50": round(percentile(latencies, 0.50), 3),
+            "p99": round(percentile(latencies, 0.99), 3),
+            "max": round(latencies[-1], 3),
+        },
+    }
+
+
+def run_sync(app, paths, headers, concurrency, seconds, seed):
+    latencies, statuses = [], Counter()
+    lock = threading.Lock()
+    deadline = time.perf_counter() + seconds
+
+    def worker(n):
+        client = app.test_client()
+        rng = random.Random(seed + n)
+        while time.perf_counter() < deadline:
+            path = rng.choice(paths)(rng)
+            started = time.perf_counter()
+            response = client.get(path, headers=headers)
+            elapsed = (time.perf_counter() - started) * 1000
+            with lock:
+                latencies.append(elapsed)
+                statuses[str(response.status_code)] += 1
+
+    started = time.perf_counter()
+    threads = [threading.Thread(target=worker, args=(n,)) for n in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return summarize(latencies, statuses, time.perf_counter() - started)
+
+
+async def _run_async(quart_app, paths, headers, concurrency, seconds, seed):
+    latencies, statuses = [], Counter()
+
+    async with quart_app.test_app() as test_app:
+        deadline = time.perf_counter() + seconds
+
+        async def worker(n):
+            client = test_app.test_client()
+            rng = random.Random(seed + n)
+            while time.perf_counter() < deadline:
+                path = rng.choice(paths)(rng)
+                started = time.perf_counter()
+                response = await client.get(path, headers=headers)
+                await response.get_data()
+                latencies.append((time.perf_counter() - started) * 1000)
+                statuses[str(response.status_code)] += 1
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker(n) for n in range(concurrency)))
+        elapsed = time.perf_counter() - started
+    return summarize(latencies, statuses, elapsed)
+
+
+def run_async(quart_app, paths, headers, concurrency, seconds, seed):
+    return asyncio.run(_run_async(quart_app, paths, headers, concurrency, seconds, seed))
+
+
+def compare_serving(app, quart_app, clinic, access_token, concurrency=16, seconds=5.0, seed=42):
+    """Même charge (concurrency requêtes en vol pendant seconds) sur Flask puis sur Quart"""
+    paths = hot_paths(clinic)
+    headers = {"Authorization": f"Bearer {access_token}", "Accept-Encoding": "gzip"}
+    sync = run_sync(app, paths, headers, concurrency, seconds, seed)
+    async_ = run_async(quart_app, paths, headers, concurrency, seconds, seed)
+    return {
+        "concurrency": concurrency,
+        "seconds": seconds,
+        "sync": sync,
+        "async": async_,
+        "rps_ratio": round(async_["rps"] / sync["rps"], 2) if sync["rps"] else None,
+    }
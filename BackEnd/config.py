@@ -12,3 +12,48 @@ class Config:
     NEO4J_USER = os.getenv("NEO4J_USER")
     NEO4J_PASSWORD = os.getenv("NEO4J_PASSWORD")
     DEBUG = os.getenv("DEBUG", "False").lower() == "true"
+    # Pagination des listings (limit/after)
+    PAGE_SIZE_DEFAULT = int(os.getenv("PAGE_SIZE_DEFAULT", "100"))
+    PAGE_SIZE_MAX = int(os.getenv("PAGE_SIZE_MAX", "500"))
+    # Création des index Mongo / contraintes Neo4j au démarrage
+    SCHEMA_BOOTSTRAP_ON_STARTUP = os.getenv("SCHEMA_BOOTSTRAP_ON_STARTUP", "True").lower() == "true"
+    # Hachage des mots de passe (pool de processus)
+    PASSWORD_HASH_METHOD = os.getenv("PASSWORD_HASH_METHOD", "scrypt:32768:8:1")
+    PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", "2"))
+    PASSWORD_HASH_TIMEOUT = float(os.getenv("PASSWORD_HASH_TIMEOUT", "5"))
+    # Cache des entités docteur/patient ("memory" par worker, ou "redis" partagé)
+    CACHE_BACKEND = os.getenv("CACHE_BACKEND", "memory")
+    CACHE_REDIS_URL = os.getenv("CACHE_REDIS_URL", "redis://localhost:6379/0")
+    CACHE_MAX_ENTRIES = int(os.getenv("CACHE_MAX_ENTRIES", "10000"))
+    CACHE_TTL = float(os.getenv("CACHE_TTL", "60"))
+    # Outbox des écritures Neo4j (worker en arrière-plan) ; False = écriture synchrone
+    OUTBOX_ENABLED = os.getenv("OUTBOX_ENABLED", "True").lower() == "true"
+    OUTBOX_BATCH_SIZE = int(os.getenv("OUTBOX_BATCH_SIZE", "500"))
+    OUTBOX_POLL_INTERVAL = float(os.getenv("OUTBOX_POLL_INTERVAL", "0.2"))
+    OUTBOX_MAX_ATTEMPTS = int(os.getenv("OUTBOX_MAX_ATTEMPTS", "10"))
+    # Attente max pour la lecture de ses propres écritures (en-tête X-Read-Your-Writes)
+    OUTBOX_WAIT_TIMEOUT = float(os.getenv("OUTBOX_WAIT_TIMEOUT", "5"))
+    # Opérations Mongo / requêtes Cypher par requête HTTP (Server-Timing, X-DB-Queries, log db_stats)
+    DB_INSTRUMENTATION_ENABLED = os.getenv("DB_INSTRUMENTATION_ENABLED", "True").lower() == "true"
+    # Même requête exécutée plus de N fois dans une requête HTTP : signalée comme N+1
+    DB_N_PLUS_ONE_THRESHOLD = int(os.getenv("DB_N_PLUS_ONE_THRESHOLD", "10"))
+    # Endpoint /metrics (format Prometheus) et mesures par route
+    METRICS_ENABLED = os.getenv("METRICS_ENABLED", "True").lower() == "true"
+    # Journal des requêtes lentes (Mongo / Cypher) et classement consultable via /admin/slow-queries
+    SLOW_QUERY_ENABLED = os.getenv("SLOW_QUERY_ENABLED", "True").lower() == "true"
+    SLOW_QUERY_THRESHOLD_MS = float(os.getenv("SLOW_QUERY_THRESHOLD_MS", "100"))
+    SLOW_QUERY_SAMPLE_RATE = float(os.getenv("SLOW_QUERY_SAMPLE_RATE", "1.0"))
+    SLOW_QUERY_TOP_N = int(os.getenv("SLOW_QUERY_TOP_N", "50"))
+    # Compression gzip/brotli des réponses (brotli si le paquet 'brotli' est installé)
+    COMPRESSION_ENABLED = os.getenv("COMPRESSION_ENABLED", "True").lower() == "true"
+    COMPRESSION_MIN_SIZE = int(os.getenv("COMPRESSION_MIN_SIZE", "1024"))
+    COMPRESSION_GZIP_LEVEL = int(os.getenv("COMPRESSION_GZIP_LEVEL", "6"))
+    COMPRESSION_BROTLI_QUALITY = int(os.getenv("COMPRESSION_BROTLI_QUALITY", "4"))
+    # Jetons signés (HS256) : clé partagée par tous les workers, durées en secondes
+    AUTH_TOKEN_SECRET = os.getenv("AUTH_TOKEN_SECRET")
+    # Développement / tests uniquement : sans AUTH_TOKEN_SECRET, clé aléatoire par processus
+    AUTH_ALLOW_RANDOM_SECRET = os.getenv("AUTH_ALLOW_RANDOM_SECRET", "False").lower() == "true"
+    AUTH_ACCESS_TTL = int(os.getenv("AUTH_ACCESS_TTL", "900"))
+    AUTH_REFRESH_TTL = int(os.getenv("AUTH_REFRESH_TTL", str(7 * 24 * 3600)))
+    # False : jetons vérifiés s'ils sont présents, mais routes accessibles sans (migration des clients)
+    AUTH_REQUIRED = os.getenv("AUTH_REQUIRED", "True").lower() == "true"
@@ -1,6 +1,6 @@
 import { jsx as _jsx } from "react/jsx-runtime";
 import { createContext, useContext, useState, useEffect } from 'react';
-import { authAPI } from '../services/api';
+import { authAPI, clearTokens, loadTokens, saveTokens } from '../services/api';
 import toast from 'react-hot-toast';
 const AuthContext = createContext(undefined);
 export function useAuth() {
@@ -29,7 +29,8 @@ export function AuthProvider({ children }) {
         try {
             setLoading(true);
             const response = await authAPI.login(email, password);
-            const userData = response.data;
+            const { access_token, refresh_token, token_type, expires_in, ...userData } = response.data;
+            saveTokens({ access_token, refresh_token });
             setUser(userData);
             localStorage.setItem('user', JSON.stringify(userData));
             toast.success(`Bienvenue, ${userData.prenom} ${userData.nom}!`);
@@ -45,6 +46,8 @@ export function AuthProvider({ children }) {
         }
     };
     const logout = () => {
+        authAPI.logout(loadTokens()?.refresh_token).catch(() => { });
+        clearTokens();
         setUser(null);
         localStorage.removeItem('user');
         toast.success('Déconnexion réussie');
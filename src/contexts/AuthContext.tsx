@@ -1,5 +1,5 @@
 import React, { createContext, useContext, useState, useEffect, ReactNode } from 'react'
-import { authAPI } from '../services/api'
+import { authAPI, clearTokens, loadTokens, saveTokens } from '../services/api'
 import toast from 'react-hot-toast'
 
 interface User {
@@ -57,8 +57,9 @@ export function AuthProvider({ children }: AuthProviderProps) {
     try {
       setLoading(true)
       const response = await authAPI.login(email, password)
-      const userData = response.data
-      
+      const { access_token, refresh_token, token_type, expires_in, ...userData } = response.data
+      saveTokens({ access_token, refresh_token })
+
       setUser(userData)
       localStorage.setItem('user', JSON.stringify(userData))
       toast.success(`Bienvenue, ${userData.prenom} ${userData.nom}!`)
@@ -73,6 +74,8 @@ export function AuthProvider({ children }: AuthProviderProps) {
   }
 
   const logout = () => {
+    authAPI.logout(loadTokens()?.refresh_token).catch(() => {})
+    clearTokens()
     setUser(null)
     localStorage.removeItem('user')
     toast.success('Déconnexion réussie')
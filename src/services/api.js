@@ -1,14 +1,69 @@
 import axios from 'axios';
 const API_BASE_URL = '/api';
+
+// Patient tables show the free-text description too (not in the default listing projection)
+const PATIENT_TABLE_FIELDS = 'nom,prenom,email,tel,date_naissance,maladie,description_maladie,doctor_id';
 const api = axios.create({
     baseURL: API_BASE_URL,
     headers: {
         'Content-Type': 'application/json',
     },
 });
+export const loadTokens = () => {
+    try {
+        return JSON.parse(localStorage.getItem('tokens') || 'null');
+    }
+    catch {
+        return null;
+    }
+};
+export const saveTokens = ({ access_token, refresh_token }) => localStorage.setItem('tokens', JSON.stringify({ access_token, refresh_token }));
+export const clearTokens = () => localStorage.removeItem('tokens');
+// Access token on every call
+api.interceptors.request.use((config) => {
+    const tokens = loadTokens();
+    if (tokens) {
+        config.headers.Authorization = `Bearer ${tokens.access_token}`;
+    }
+    return config;
+});
+// Expired access token: one refresh (rotating the refresh token), then the call is replayed
+api.interceptors.response.use(undefined, async (error) => {
+    const original = error.config;
+    const tokens = loadTokens();
+    if (error.response?.status === 401 && tokens && original && !original._retried && !original.url?.startsWith('/auth/')) {
+        original._retried = true;
+        try {
+            const { data } = await axios.post(`${API_BASE_URL}/auth/refresh`, { refresh_token: tokens.refresh_token });
+            saveTokens(data);
+            return api(original);
+        }
+        catch {
+            clearTokens();
+        }
+    }
+    return Promise.reject(error);
+});
+// Listings are paginated (limit/after): follow the cursor until the last page.
+// With `key` the page is an object ({[key]: [...], next_cursor}), otherwise a plain
+// array with the cursor in the X-Next-Cursor header (admin listings).
+const PAGE_SIZE = 500;
+const fetchAllPages = async (url, key, params = {}) => {
+    const rows = [];
+    let after = null;
+    let response;
+    do {
+        response = await api.get(url, { params: { ...params, limit: PAGE_SIZE, ...(after ? { after } : {}) } });
+        rows.push(...(key ? response.data[key] : response.data));
+        after = (key ? response.data.next_cursor : response.headers['x-next-cursor']) || null;
+    } while (after);
+    const data = key ? { ...response.data, count: rows.length, [key]: rows, next_cursor: null } : rows;
+    return { ...response, data };
+};
 // Auth API
 export const authAPI = {
     login: (email, mot_de_passe) => api.post('/auth/login', { email, mot_de_passe }),
+    logout: (refresh_token) => api.post('/auth/logout', { refresh_token }),
 };
 // Patient API
 export const patientAPI = {
@@ -16,7 +71,7 @@ export const patientAPI = {
     get: (id) => api.get(`/patient/${id}`),
     update: (id, data) => api.put(`/patient/${id}`, data),
     delete: (id) => api.delete(`/patient/${id}`),
-    list: () => api.get('/patient'),
+    list: () => fetchAllPages('/patient', 'patients'),
     getConsultations: (id) => api.get(`/patient/${id}/consultations`),
     getDoctor: (id) => api.get(`/patient/${id}/doctor`),
     assignDoctor: (patientId, doctorId) => api.post(`/patient/${patientId}/assign-doctor/${doctorId}`),
@@ -28,8 +83,8 @@ export const doctorAPI = {
     get: (id) => api.get(`/doctor/${id}`),
     update: (id, data) => api.put(`/doctor/${id}`, data),
     delete: (id) => api.delete(`/doctor/${id}`),
-    list: () => api.get('/doctor'),
-    getPatients: (id) => api.get(`/doctor/${id}/patients`),
+    list: () => fetchAllPages('/doctor', 'doctors'),
+    getPatients: (id) => api.get(`/doctor/${id}/patients`, { params: { fields: PATIENT_TABLE_FIELDS } }),
     getConsultations: (id) => api.get(`/doctor/${id}/consultations`),
     getPendingConsultations: (id) => api.get(`/doctor/${id}/consultations/pending`),
     acceptConsultation: (doctorId, consultationId) => api.post(`/doctor/${doctorId}/consultations/${consultationId}/accept`),
@@ -38,9 +93,9 @@ export const doctorAPI = {
 };
 // Admin API
 export const adminAPI = {
-    getAllPatients: () => api.get('/admin/patients'),
-    getAllDoctors: () => api.get('/admin/doctors'),
-    getPendingDoctors: () => api.get('/admin/pending-doctors'),
+    getAllPatients: () => fetchAllPages('/admin/patients', undefined, { fields: PATIENT_TABLE_FIELDS }),
+    getAllDoctors: () => fetchAllPages('/admin/doctors'),
+    getPendingDoctors: () => fetchAllPages('/admin/pending-doctors'),
     reviewDoctor: (doctorId, data) => api.post(`/admin/review-doctor/${doctorId}`, data),
     createAdmin: (data) => api.post('/admin/create-admin', data),
 };
@@ -2,6 +2,9 @@ import axios from 'axios'
 
 const API_BASE_URL = '/api'
 
+// Patient tables show the free-text description too (not in the default listing projection)
+const PATIENT_TABLE_FIELDS = 'nom,prenom,email,tel,date_naissance,maladie,description_maladie,doctor_id'
+
 const api = axios.create({
   baseURL: API_BASE_URL,
   headers: {
@@ -9,10 +12,76 @@ const api = axios.create({
   },
 })
 
+// Signed tokens returned by /auth/login and /auth/refresh
+interface Tokens {
+  access_token: string
+  refresh_token: string
+}
+
+export const loadTokens = (): Tokens | null => {
+  try {
+    return JSON.parse(localStorage.getItem('tokens') || 'null')
+  } catch {
+    return null
+  }
+}
+
+export const saveTokens = ({ access_token, refresh_token }: Tokens) =>
+  localStorage.setItem('tokens', JSON.stringify({ access_token, refresh_token }))
+
+export const clearTokens = () => localStorage.removeItem('tokens')
+
+// Access token on every call, except login/refresh (a stale token must not get in the way)
+const UNAUTHENTICATED_URLS = ['/auth/login', '/auth/refresh']
+
+api.interceptors.request.use((config) => {
+  const tokens = loadTokens()
+  if (tokens && !UNAUTHENTICATED_URLS.includes(config.url || '')) {
+    config.headers.Authorization = `Bearer ${tokens.access_token}`
+  }
+  return config
+})
+
+// Expired access token: one refresh (rotating the refresh token), then the call is replayed
+api.interceptors.response.use(undefined, async (error) => {
+  const original = error.config
+  const tokens = loadTokens()
+  if (error.response?.status === 401 && tokens && original && !original._retried && !original.url?.startsWith('/auth/')) {
+    original._retried = true
+    try {
+      const { data } = await axios.post(`${API_BASE_URL}/auth/refresh`, { refresh_token: tokens.refresh_token })
+      saveTokens(data)
+      return api(original)
+    } catch {
+      clearTokens()
+    }
+  }
+  return Promise.reject(error)
+})
+
+// Listings are paginated (limit/after): follow the cursor until the last page.
+// With `key` the page is an object ({[key]: [...], next_cursor}), otherwise a plain
+// array with the cursor in the X-Next-Cursor header (admin listings).
+const PAGE_SIZE = 500
+
+const fetchAllPages = async (url: string, key?: string, params: Record<string, string> = {}) => {
+  const rows: any[] = []
+  let after: string | null = null
+  let response
+  do {
+    response = await api.get(url, { params: { ...params, limit: PAGE_SIZE, ...(after ? { after } : {}) } })
+    rows.push(...(key ? response.data[key] : response.data))
+    after = (key ? response.data.next_cursor : response.headers['x-next-cursor']) || null
+  } while (after)
+  const data = key ? { ...response.data, count: rows.length, [key]: rows, next_cursor: null } : rows
+  return { ...response, data }
+}
+
 // Auth API
 export const authAPI = {
   login: (email: string, mot_de_passe: string) =>
     api.post('/auth/login', { email, mot_de_passe }),
+  logout: (refresh_token?: string) => api.post('/auth/logout', { refresh_token }),
 }
 
 // Patient API
@@ -21,7 +90,7 @@ export const patientAPI = {
   get: (id: string) => api.get(`/patient/${id}`),
   update: (id: string, data: any) => api.put(`/patient/${id}`, data),
   delete: (id: string) => api.delete(`/patient/${id}`),
-  list: () => api.get('/patient'),
+  list: () => fetchAllPages('/patient', 'patients'),
   getConsultations: (id: string) => api.get(`/patient/${id}/consultations`),
   getDoctor: (id: string) => api.get(`/patient/${id}/doctor`),
   assignDoctor: (patientId: string, doctorId: string) =>
@@ -36,8 +105,8 @@ export const doctorAPI = {
   get: (id: string) => api.get(`/doctor/${id}`),
   update: (id: string, data: any) => api.put(`/doctor/${id}`, data),
   delete: (id: string) => api.delete(`/doctor/${id}`),
-  list: () => api.get('/doctor'),
-  getPatients: (id: string) => api.get(`/doctor/${id}/patients`),
+  list: () => fetchAllPages('/doctor', 'doctors'),
+  getPatients: (id: string) => api.get(`/doctor/${id}/patients`, { params: { fields: PATIENT_TABLE_FIELDS } }),
   getConsultations: (id: string) => api.get(`/doctor/${id}/consultations`),
   getPendingConsultations: (id: string) => api.get(`/doctor/${id}/consultations/pending`),
   acceptConsultation: (doctorId: string, consultationId: string) =>
@@ -49,9 +118,9 @@ export const doctorAPI = {
 
 // Admin API
 export const adminAPI = {
-  getAllPatients: () => api.get('/admin/patients'),
-  getAllDoctors: () => api.get('/admin/doctors'),
-  getPendingDoctors: () => api.get('/admin/pending-doctors'),
+  getAllPatients: () => fetchAllPages('/admin/patients', undefined, { fields: PATIENT_TABLE_FIELDS }),
+  getAllDoctors: () => fetchAllPages('/admin/doctors'),
+  getPendingDoctors: () => fetchAllPages('/admin/pending-doctors'),
   reviewDoctor: (doctorId: string, data: any) =>
     api.post(`/admin/review-doctor/${doctorId}`, data),
   createAdmin: (data: any) => api.post('/admin/create-admin', data),